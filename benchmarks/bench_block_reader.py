@@ -0,0 +1,111 @@
+"""比较文本分块读取方式的峰值内存（RSS）
+
+用法：python benchmarks/bench_block_reader.py [文件大小MB]
+
+每种方式在独立的子进程中运行，避免相互影响：
+- legacy：原来的 read_text_file（file.read() + split）
+- read_text_file：当前 CLI 的 read_text_file（首次打开，建立块偏移索引）
+- stream：只迭代 iter_file_blocks，不保留文本块
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+
+
+def legacy_read_text_file(file_paths):
+    """原实现：一次读入整个文件后分块"""
+    blocks = []
+    for file_path in file_paths:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                content = file.read()
+                file_blocks = [block.strip() for block in content.split('\n\n') if block.strip()]
+                blocks.extend(file_blocks)
+        except UnicodeDecodeError:
+            with open(file_path, 'r', encoding='gbk') as file:
+                content = file.read()
+                file_blocks = [block.strip() for block in content.split('\n\n') if block.strip()]
+                blocks.extend(file_blocks)
+    return blocks if blocks else None
+
+
+def peak_rss_kb():
+    """返回当前进程的峰值 RSS（KB）"""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize // 1024
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def make_sample(path, size_mb):
+    """生成测试文件：中英文混合段落，以空行分隔"""
+    paragraph = ("这是一个用于测试分块读取的段落，包含中文和 English words。\n" * 3) + "\n"
+    data = paragraph.encode('utf-8')
+    with open(path, 'wb') as f:
+        for _ in range(size_mb * 1024 * 1024 // len(data) + 1):
+            f.write(data)
+
+
+def run_variant(variant, path):
+    """在子进程中执行单个读取方式，打印 块数 耗时 峰值RSS"""
+    sys.path.insert(0, SRC)
+    import text_blocks
+    start = time.perf_counter()
+    if variant == 'legacy':
+        count = len(legacy_read_text_file([path]))
+    elif variant == 'read_text_file':
+        import importlib
+        import io
+        import contextlib
+        cli = importlib.import_module('ShitTTS-CLI')
+        with contextlib.redirect_stdout(io.StringIO()):
+            count = len(cli.read_text_file([path]))
+    elif variant == 'stream':
+        count = sum(1 for _ in text_blocks.iter_file_blocks(path))
+    else:
+        count = 0
+    print(count, time.perf_counter() - start, peak_rss_kb())
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sample.txt')
+        make_sample(path, size_mb)
+        print(f"测试文件：{os.path.getsize(path) / (1024 * 1024):.1f} MB")
+        print(f"{'方式':<16} {'块数':>10} {'耗时(s)':>10} {'峰值RSS(MB)':>12} {'增量(MB)':>10}")
+        baseline = None
+        for variant in ['empty', 'legacy', 'read_text_file', 'stream']:
+            out = subprocess.run([sys.executable, __file__, '--variant', variant, path],
+                                 capture_output=True, text=True, check=True, cwd=tmp).stdout.split()
+            count, seconds, rss = int(out[0]), float(out[1]), int(out[2]) / 1024
+            if variant == 'empty':
+                baseline = rss
+                continue
+            print(f"{variant:<16} {count:>10} {seconds:>10.2f} {rss:>12.1f} {rss - baseline:>10.1f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--variant':
+        run_variant(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,109 @@
+"""常驻合成服务的吞吐量和尾延迟
+
+用法：python benchmarks/bench_daemon.py [每个客户端的请求数] [--clients 1 4 16] [--endpoint render|speak]
+
+使用模拟 pyttsx3 驱动（见 fake_driver.py）在本进程中启动 SynthesisDaemon，
+分别用不同数量的并发客户端发送请求，输出每秒请求数、p50/p99 延迟和被拒绝（503）的次数；
+另外与“每次请求都启动一个 CLI 进程”的方式比较单次耗时。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC)
+
+TEXTS = [f"第 {i} 条测试文本，用于测量合成服务的吞吐量。" for i in range(50)]
+
+
+def run_clients(port, clients, requests_per_client, endpoint):
+    """并发发送请求，返回 (延迟列表, 被拒绝次数, 总耗时)"""
+    from tts_daemon import call
+    latencies = []
+    rejected = [0]
+    lock = threading.Lock()
+
+    def client(n):
+        for i in range(requests_per_client):
+            payload = {'text': TEXTS[(n * requests_per_client + i) % len(TEXTS)]}
+            # 延迟从第一次尝试开始计算，包括被拒绝后的等待
+            start = time.perf_counter()
+            while True:
+                status, _, _ = call('POST', f'/{endpoint}', payload, port=port)
+                if status != 503:
+                    break
+                with lock:
+                    rejected[0] += 1
+                time.sleep(0.05)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, rejected[0], time.perf_counter() - start
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def cold_cli_seconds(workdir):
+    """对照：每次都启动 CLI 进程并初始化引擎所需的时间"""
+    script = (
+        "import sys, runpy; sys.path.insert(0, %r); sys.path.insert(0, %r);"
+        "import fake_driver; fake_driver.install();"
+        "sys.argv = ['ShitTTS-CLI.py', 'render', 'in.txt', '-o', 'out', '-j', '1'];"
+        "runpy.run_path(%r, run_name='__main__')"
+    ) % (os.path.dirname(os.path.abspath(__file__)), SRC, os.path.join(SRC, 'ShitTTS-CLI.py'))
+    with open(os.path.join(workdir, 'in.txt'), 'w', encoding='utf-8') as f:
+        f.write(TEXTS[0])
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', script], cwd=workdir, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('requests', nargs='?', type=int, default=50, help='每个客户端的请求数')
+    parser.add_argument('--clients', nargs='+', type=int, default=[1, 4, 16])
+    parser.add_argument('--endpoint', choices=['render', 'speak'], default='render')
+    parser.add_argument('--queue', type=int, default=8, help='服务的最大排队数')
+    args = parser.parse_args()
+
+    import fake_driver
+    fake_driver.install()
+    from tts_daemon import SynthesisDaemon
+    from tts_engine import EngineManager
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        daemon = SynthesisDaemon(EngineManager(), port=0, max_queue=args.queue)
+        daemon.start()
+        threading.Thread(target=daemon.serve_forever, daemon=True).start()
+        port = daemon.address[1]
+
+        print(f"接口：/{args.endpoint}，最大排队数：{args.queue}")
+        print(f"{'客户端':>6} {'请求数':>8} {'RPS':>8} {'p50(ms)':>9} {'p99(ms)':>9} {'503次数':>8}")
+        for clients in args.clients:
+            latencies, rejected, wall = run_clients(port, clients, args.requests, args.endpoint)
+            print(f"{clients:>6} {len(latencies):>8} {len(latencies) / wall:>8.1f} "
+                  f"{percentile(latencies, 50) * 1000:>9.1f} {percentile(latencies, 99) * 1000:>9.1f} {rejected:>8}")
+        daemon.server.shutdown()
+        cold = cold_cli_seconds(workdir)
+        print(f"对照：每次启动 CLI 进程合成一条文本耗时 {cold * 1000:.0f} ms")
+        os.chdir(ROOT)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""音频输出端环形缓冲区的断音（underrun）与填充量压力测试
+
+用法：python benchmarks/bench_sink.py [--buffers 10 20 50 200] [--seconds 4] [--load 0 1 2]
+
+使用模拟 pyttsx3 驱动合成一段音频，经 WavPlayer（软件增益，走 NumPy 分段处理）
+交给按实时速度消费的 NullSink，分别测量不同环形缓冲区大小、不同数量的后台
+CPU 负载线程（与播放线程争抢 GIL，模拟界面重新分块、预渲染等同时进行的工作）下
+每次播放的断音次数，以及缓冲区最低/平均填充量，用来选择 audio_buffer_ms。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+
+def busy(stop):
+    """纯 Python 计算，占用 GIL"""
+    while not stop.is_set():
+        sum(i * i for i in range(20000))
+
+
+def run(path, buffer_ms, load, repeat):
+    from audio_player import WavPlayer
+    from audio_sink import NullSink
+    player = WavPlayer(NullSink(pace=1.0), buffer_ms)
+    stop = threading.Event()
+    threads = [threading.Thread(target=busy, args=(stop,), daemon=True) for _ in range(load)]
+    for thread in threads:
+        thread.start()
+    underruns = []
+    min_fill = []
+    avg_fill = []
+    late = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            player.play(path, gain=0.8)
+            late.append(time.perf_counter() - start)
+            stats = player.last_playback
+            underruns.append(stats['underruns'])
+            if stats['min_fill'] is not None:
+                min_fill.append(stats['min_fill'])
+                avg_fill.append(stats['avg_fill'])
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return underruns, min_fill, avg_fill, late
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--buffers', type=int, nargs='+', default=[10, 20, 50, 200], help="环形缓冲区大小（毫秒）")
+    parser.add_argument('--seconds', type=float, default=4.0, help="每次播放的音频时长（秒）")
+    parser.add_argument('--load', type=int, nargs='+', default=[0, 1, 2], help="后台 CPU 负载线程数")
+    parser.add_argument('--repeat', type=int, default=1, help="每种组合播放的次数")
+    args = parser.parse_args()
+
+    import fake_driver
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'sample.wav')
+        fake_driver.write_wav(path, '测' * int(args.seconds * fake_driver.CHARS_PER_SECOND))
+        print(f"{'缓冲(ms)':>8} {'负载线程':>8} {'平均断音':>8} {'最低填充(ms)':>12} {'平均填充(ms)':>12} {'播放耗时(s)':>11}")
+        for buffer_ms in args.buffers:
+            for load in args.load:
+                underruns, min_fill, avg_fill, late = run(path, buffer_ms, load, args.repeat)
+                low = min(min_fill) * 1000 if min_fill else float('nan')
+                avg = sum(avg_fill) / len(avg_fill) * 1000 if avg_fill else float('nan')
+                print(f"{buffer_ms:>8} {load:>8} {sum(underruns) / len(underruns):>8.1f} {low:>12.1f} {avg:>12.1f} "
+                      f"{sum(late) / len(late):>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
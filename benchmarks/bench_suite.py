@@ -0,0 +1,646 @@
+"""基准测试套件：使用模拟 pyttsx3 驱动，在没有音频设备的机器上测量 CLI 和 GUI 的关键路径
+
+用法：python benchmarks/bench_suite.py [--repeat N] [--size-mb M] [--only 名称 ...]
+                                      [--update-baseline] [--tolerance 0.5]
+
+测量项目（每项在独立的子进程中运行，工作目录为临时目录，不影响本地缓存和配置）：
+- engine_init：创建引擎（pyttsx3.init）的耗时
+- voices：首次枚举语音 / 从 voices_cache.json 加载语音的耗时
+- cli_speech：CLI text_to_speech 的首音延迟（冷启动含引擎创建和语音选择 / 引擎已就绪）
+- cli_read：CLI read_text_file 建立块索引 / 再次打开的耗时
+- gui_split：GUI 文本块模型重新分割全文（split_lines_into_blocks）的耗时
+- gui_page：分页显示大文件时从块索引读取一页（PAGE_BLOCKS 块）的耗时
+- gui_rechunk：在同样大小的文本中间做一次小修改后，文本块模型增量更新的耗时（不含 Tk 控件本身）
+- volume_change：调节音量后朗读已缓存的一块：按新音量重新合成 / 读取原始音量的缓存并用 NumPy 做软件增益
+- silence_trim：合成一块后裁剪首尾静音（读取、检测、重写 WAV）的耗时
+- async_render：AsyncSpeaker.render() 从调用到 future 结束的耗时（结束时文件必须已裁剪完首尾静音）
+- engine_watchdog：直接朗读一句（runAndWait() 在不限时的引擎线程中执行 / 在看门狗的引擎线程中执行），
+  以及驱动卡住时超过期限之后重建引擎并重试完成的耗时
+- gui_queue：GUI 朗读队列从入队到发出第一个声音的延迟
+- gui_full：GUI 朗读 1MB 全文时的首音延迟，以及点击停止到声音停止的延迟
+- gui_navigation：分块朗读时快速连续点击“下一块”，从最后一次点击到目标块开始朗读的延迟
+- gui_startup：GUI 从启动到窗口首次绘制 / 引擎和语音列表加载完成的耗时（没有图形界面时跳过）
+- cli_startup：以 -X importtime 启动 CLI 并执行 :help、:about、:quit，统计导入耗时和进程总耗时；
+  这些命令不应导入 pyttsx3
+
+结果与 baselines.json 中的基线比较：中位数减去噪声余量后仍超过基线 (1 + tolerance) 倍时判为退化；
+BUDGETS 中的指标中位数减去噪声余量后还不能超过固定预算。噪声余量取本次样本中位数绝对偏差的
+NOISE_MADS 倍、基线 p95 与中位数之差两者中较大者，至少 1 毫秒；样本少于 MIN_GATE_SAMPLES 个的指标
+只报告不判定。有指标不达标时先重新运行对应项目，合并两次的样本后仍不达标才返回 1。
+使用 --update-baseline 用本次结果更新基线。
+模拟驱动的各项耗时见 fake_driver.py。
+"""
+import argparse
+import importlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baselines.json')
+# 判断退化时允许的最小绝对差值（秒），避免微秒级指标因噪声误报
+MIN_REGRESSION_SECONDS = 0.001
+# 噪声余量为样本中位数绝对偏差（MAD）的倍数
+NOISE_MADS = 3
+# 判定退化或超出预算至少需要的样本数，样本不足时只报告不判定
+MIN_GATE_SAMPLES = 5
+# 与机器无关的固定预算（秒）
+BUDGETS = {
+    'cli_import': 0.075,
+}
+CLI_SCRIPT = os.path.join(SRC, 'ShitTTS-CLI.py')
+
+SAMPLE_TEXT = "这是一个用于基准测试的段落，包含中文和 English words。"
+
+
+class HeadlessRoot:
+    """代替 Tk 根窗口，忽略 after() 中的界面更新"""
+
+    def after(self, ms, func=None, *args):
+        return None
+
+    def protocol(self, name, func=None):
+        return None
+
+
+class HeadlessLabel:
+    def config(self, **kwargs):
+        return None
+
+
+class HeadlessText:
+    """代替 Text 控件，get() 返回固定文本"""
+
+    def __init__(self, text=''):
+        self.text = text
+
+    def get(self, start, end=None):
+        return self.text
+
+
+class HeadlessVar:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def _setup_child():
+    """子进程初始化：安装模拟驱动并让 src 中的模块可以导入"""
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, SRC)
+    import fake_driver
+    fake_driver.install()
+    return fake_driver
+
+
+def _wait_utterance(fake_driver, count, timeout=10):
+    """等待模拟驱动开始第 count 次朗读，返回开始的时间点"""
+    deadline = time.perf_counter() + timeout
+    while len(fake_driver.utterances) < count:
+        if time.perf_counter() > deadline:
+            raise TimeoutError("等待朗读开始超时")
+        time.sleep(0.0005)
+    return fake_driver.utterances[count - 1]
+
+
+def make_sample(path, size_mb):
+    """生成测试文件：中英文混合段落，以空行分隔"""
+    data = ((SAMPLE_TEXT + "\n") * 3 + "\n").encode('utf-8')
+    with open(path, 'wb') as f:
+        for _ in range(int(size_mb * 1024 * 1024) // len(data) + 1):
+            f.write(data)
+
+
+def bench_engine_init(args):
+    _setup_child()
+    from tts_engine import EngineManager
+    manager = EngineManager()
+    manager.get_engine()
+    return {'engine_init': [manager.stats['init_seconds']]}
+
+
+def bench_voices(args):
+    _setup_child()
+    from tts_engine import EngineManager
+    from voice_registry import VoiceRegistry
+    manager = EngineManager()
+    engine = manager.get_engine()
+    start = time.perf_counter()
+    VoiceRegistry(None).load(lambda: engine)
+    cold = time.perf_counter() - start
+    warm = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        VoiceRegistry(None).load(lambda: engine)
+        warm.append(time.perf_counter() - start)
+    return {'voices_cold': [cold], 'voices_cached': warm}
+
+
+def bench_cli_speech(args):
+    fake_driver = _setup_child()
+    cli = importlib.import_module('ShitTTS-CLI')
+    samples = {'cli_ttfa_cold': [], 'cli_ttfa_warm': []}
+    for i in range(args.repeat + 1):
+        start = time.perf_counter()
+        cli.text_to_speech(SAMPLE_TEXT, 150, 1.0)
+        key = 'cli_ttfa_cold' if i == 0 else 'cli_ttfa_warm'
+        samples[key].append(_wait_utterance(fake_driver, i + 1) - start)
+    return samples
+
+
+def bench_cli_read(args):
+    _setup_child()
+    import contextlib
+    import io
+    from text_blocks import INDEX_DIR
+    cli = importlib.import_module('ShitTTS-CLI')
+    path = os.path.abspath('sample.txt')
+    make_sample(path, args.size_mb)
+    samples = {'cli_read_build': [], 'cli_read_reopen': []}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.repeat):
+            shutil.rmtree(INDEX_DIR, ignore_errors=True)
+            start = time.perf_counter()
+            cli.read_text_file([path])
+            samples['cli_read_build'].append(time.perf_counter() - start)
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            blocks = cli.read_text_file([path])
+            blocks[len(blocks) // 2]
+            samples['cli_read_reopen'].append(time.perf_counter() - start)
+    return samples
+
+
+def bench_gui_split(args):
+    _setup_child()
+    from text_model import split_lines_into_blocks
+    text = ((SAMPLE_TEXT + "\n") * 3 + "\n") * int(args.size_mb * 1024 * 1024 / 300)
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        split_lines_into_blocks(text.split('\n'))
+        samples.append(time.perf_counter() - start)
+    return {'gui_split': samples}
+
+
+def bench_gui_page(args):
+    _setup_child()
+    from paged_viewer import PAGE_BLOCKS
+    from text_blocks import BlockIndex
+    path = os.path.abspath('sample.txt')
+    make_sample(path, args.size_mb)
+    index = BlockIndex.open(path)
+    pages = len(index) // PAGE_BLOCKS
+    samples = []
+    for i in range(args.repeat):
+        # 每次读取不同位置的页，避免只测到同一段缓存
+        start_block = (pages * (i + 1) // (args.repeat + 1)) * PAGE_BLOCKS
+        start = time.perf_counter()
+        index.read_range(start_block, start_block + PAGE_BLOCKS)
+        samples.append(time.perf_counter() - start)
+    return {'gui_page': samples}
+
+
+def bench_gui_rechunk(args):
+    _setup_child()
+    from text_model import TextBlockModel
+
+    class LinesModel(TextBlockModel):
+        """用行列表代替 Text 控件"""
+
+        def __init__(self, lines):
+            self.lines = lines
+            super().__init__(None)
+            self.rebuild()
+
+        def line_count(self):
+            return len(self.lines)
+
+        def read_lines(self, first, last):
+            return self.lines[first - 1:last]
+
+    lines = (((SAMPLE_TEXT + "\n") * 3 + "\n") * int(args.size_mb * 1024 * 1024 / 300)).split('\n')
+    model = LinesModel(lines)
+    samples = []
+    for i in range(args.repeat):
+        line = len(lines) // 2 + i
+        # 交替做不换行的修改和插入空行（拆开一块）的修改
+        start = time.perf_counter()
+        model.on_insert(line, 0 if i % 2 else 1)
+        elapsed = time.perf_counter() - start
+        if i % 2:
+            lines[line - 1] += "增"
+        else:
+            lines.insert(line, "")
+        start = time.perf_counter()
+        model.sync()
+        samples.append(elapsed + time.perf_counter() - start)
+    return {'gui_rechunk': samples}
+
+
+def bench_volume_change(args):
+    _setup_child()
+    import audio_dsp
+    from audio_cache import AudioCache
+    from tts_engine import EngineManager
+    manager = EngineManager(audio_cache=AudioCache(os.path.abspath('audio_cache')))
+    text = (SAMPLE_TEXT + "\n") * 3
+    base = manager.render_cached(text, 150, 1.0)
+    samples = {'volume_rerender': [], 'volume_gain': []}
+    for i in range(args.repeat):
+        volume = 0.5 + i / (2.0 * args.repeat)
+        start = time.perf_counter()
+        manager.render_cached(text, 150, volume)
+        samples['volume_rerender'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        audio = audio_dsp.read_wav(manager.render_cached(text, 150, 1.0))
+        audio_dsp.apply_gain(audio.samples, volume)
+        samples['volume_gain'].append(time.perf_counter() - start)
+    assert os.path.exists(base)
+    return samples
+
+
+def bench_silence_trim(args):
+    fake_driver = _setup_child()
+    import audio_dsp
+    path = os.path.abspath('block.wav')
+    samples = []
+    for _ in range(args.repeat):
+        fake_driver.write_wav(path, (SAMPLE_TEXT + "\n") * 3)
+        start = time.perf_counter()
+        removed = audio_dsp.trim_wav_file(path)
+        samples.append(time.perf_counter() - start)
+        assert removed > 0
+    return {'silence_trim': samples}
+
+
+def bench_async_render(args):
+    _setup_child()
+    import asyncio
+    from async_speaker import AsyncSpeaker
+    from tts_engine import EngineManager
+    text = (SAMPLE_TEXT + "\n") * 3
+    # 对照：同步合成并裁剪首尾静音后的文件大小
+    reference = EngineManager()
+    reference.render(text, os.path.abspath('reference.wav'))
+    assert reference.stats['trimmed_files'] == 1
+    expected = os.path.getsize('reference.wav')
+
+    async def run():
+        speaker = AsyncSpeaker()
+        await speaker.warm()
+        samples = []
+        for i in range(args.repeat):
+            path = os.path.abspath(f'async-{i}.wav')
+            start = time.perf_counter()
+            await speaker.render(text, path)
+            samples.append(time.perf_counter() - start)
+            # future 结束时文件必须已经裁剪完成，不能是驱动刚写完、还要被重写的文件
+            size = os.path.getsize(path)
+            assert size == expected, f"render 返回时文件为 {size} 字节，裁剪后应为 {expected} 字节"
+        await speaker.close()
+        return samples
+
+    return {'async_render': asyncio.run(run())}
+
+
+def bench_engine_watchdog(args):
+    fake_driver = _setup_child()
+    from engine_watchdog import EngineWatchdog
+    from tts_engine import EngineManager
+    # EngineManager 默认启用看门狗，直接执行的对照组关闭它
+    managers = {'run_direct': EngineManager(), 'run_supervised': EngineManager()}
+    managers['run_direct'].watchdog = None
+    for manager in managers.values():
+        manager.acquire(150, 1.0)
+    samples = {'run_direct': [], 'run_supervised': [], 'hang_recovery': []}
+    for _ in range(args.repeat):
+        for metric, manager in managers.items():
+            start = time.perf_counter()
+            manager.speak(SAMPLE_TEXT, 150, 1.0)
+            samples[metric].append(time.perf_counter() - start)
+    # 固定 0.5 秒的期限，每两次调用卡住一次：每次朗读先卡住、超时，再由新的引擎线程和引擎重试
+    deadline = 0.5
+    manager = EngineManager()
+    manager.watchdog = EngineWatchdog(base_seconds=deadline, factor=0.0)
+    manager.acquire(150, 1.0)
+    os.environ['SHITTTS_FAKE_HANG_EVERY'] = '2'
+    for _ in range(args.repeat):
+        fake_driver.calls[0] = 1
+        start = time.perf_counter()
+        manager.speak(SAMPLE_TEXT, 150, 1.0)
+        samples['hang_recovery'].append(time.perf_counter() - start - deadline)
+    assert manager.watchdog.stats['restarts'] == args.repeat
+    return samples
+
+
+def _headless_gui():
+    """不创建窗口，只组装朗读队列、分块按钮和工作线程需要的属性，返回 (app, 工作线程)"""
+    import threading
+    gui = importlib.import_module('ShitTTS-GUI')
+    from chunk_player import ChunkPlayer
+    from speech_scheduler import SpeechScheduler
+    from tts_engine import EngineManager
+    app = gui.VoiceSelector.__new__(gui.VoiceSelector)
+    app.root = HeadlessRoot()
+    app.status_label = HeadlessLabel()
+    app.prev_chunk_button = HeadlessLabel()
+    app.next_chunk_button = HeadlessLabel()
+    app.rate_var = HeadlessVar(150)
+    app.volume_var = HeadlessVar(1.0)
+    app.voices = []
+    app.text_entry = HeadlessText()
+    app.document = None
+    app.speech_queue = SpeechScheduler()
+    app.speech_lock = threading.Lock()
+    app.current_request = None
+    app.preempted = False
+    app.is_speaking = False
+    app.stop_requested = False
+    app.is_chunk_mode = False
+    app.text_blocks = []
+    app.current_block_index = 0
+    app.startup_stats = {}
+    app.engine_manager = EngineManager()
+    app.chunk_player = ChunkPlayer(app.engine_manager)
+    app.engine_manager.get_engine()
+    thread = threading.Thread(target=app.speech_worker, daemon=True)
+    thread.start()
+    return app, thread
+
+
+def bench_gui_queue(args):
+    fake_driver = _setup_child()
+    app, thread = _headless_gui()
+    samples = []
+    for i in range(args.repeat + 1):
+        start = time.perf_counter()
+        app.enqueue_speech(SAMPLE_TEXT, 150, 1.0, None)
+        started = _wait_utterance(fake_driver, i + 1)
+        if i > 0:
+            # 第一次包含语音选择，不计入
+            samples.append(started - start)
+        while app.is_speaking or not app.speech_queue.empty():
+            time.sleep(0.0005)
+    app.speech_queue.close()
+    thread.join(timeout=2)
+    return {'gui_queue_ttfa': samples}
+
+
+def bench_gui_full(args):
+    """朗读 1MB 全文：点击到第一个声音、开始朗读 0.1 秒后点击停止到声音停止"""
+    fake_driver = _setup_child()
+    app, thread = _headless_gui()
+    app.text_entry.text = ((SAMPLE_TEXT + "\n") * 3 + "\n") * (1024 * 1024 // 300)
+    samples = {'gui_full_ttfa': [], 'gui_full_stop': []}
+    for _ in range(args.repeat):
+        count = len(fake_driver.utterances)
+        start = time.perf_counter()
+        app.speak_full()
+        samples['gui_full_ttfa'].append(_wait_utterance(fake_driver, count + 1, timeout=60) - start)
+        time.sleep(0.1)
+        stopped = time.perf_counter()
+        app.stop()
+        while app.is_speaking or not app.speech_queue.empty():
+            time.sleep(0.0005)
+        samples['gui_full_stop'].append(max(fake_driver.finished[-1] - stopped, 0.0))
+    app.speech_queue.close()
+    thread.join(timeout=2)
+    return samples
+
+
+def bench_gui_navigation(args):
+    """每轮从第 1 块开始，每 5 毫秒点击一次“下一块”共 20 次，
+    测量最后一次点击到第 21 块开始朗读的延迟（不应随点击次数增长）"""
+    fake_driver = _setup_child()
+    app, thread = _headless_gui()
+    clicks = 20
+    app.text_blocks = [f"第 {i + 1} 块：{SAMPLE_TEXT}" for i in range(clicks + 1)]
+    app.is_chunk_mode = True
+    samples = []
+    for _ in range(args.repeat):
+        app.current_block_index = 0
+        app.speak_current_chunk()
+        for _ in range(clicks):
+            time.sleep(0.005)
+            app.speak_next_chunk()
+        clicked = time.perf_counter()
+        target = app.text_blocks[-1]
+        deadline = clicked + 10
+        while target not in fake_driver.spoken[-1:]:
+            if time.perf_counter() > deadline:
+                raise TimeoutError("等待目标块开始朗读超时")
+            time.sleep(0.0005)
+        samples.append(fake_driver.utterances[-1] - clicked)
+        app.stop()
+        while app.is_speaking or not app.speech_queue.empty():
+            time.sleep(0.0005)
+    app.speech_queue.close()
+    thread.join(timeout=2)
+    return {'gui_navigation': samples}
+
+
+def bench_gui_startup(args):
+    _setup_child()
+    import tkinter as tk
+    gui = importlib.import_module('ShitTTS-GUI')
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        # 没有图形界面（如 CI 上没有 DISPLAY）
+        return {}
+    app = gui.VoiceSelector(root)
+    stats = app.startup_stats
+
+    def poll():
+        if stats['first_paint_seconds'] is not None and stats['engine_ready_seconds'] is not None:
+            root.after(50, app.quit)
+        else:
+            root.after(5, poll)
+
+    root.after(5, poll)
+    root.mainloop()
+    return {'gui_first_paint': [stats['first_paint_seconds']],
+            'gui_engine_ready': [stats['engine_ready_seconds']]}
+
+
+def bench_cli_startup(args):
+    """不安装模拟驱动：这些命令本来就不应加载语音引擎"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', CLI_SCRIPT],
+                            input=':help\n:about\n:quit\n', capture_output=True, text=True, encoding='utf-8')
+    wall = time.perf_counter() - start
+    modules = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            self_us, _, name = line[len('import time:'):].split('|')
+            if self_us.strip().isdigit():
+                total_us += int(self_us)
+                modules.append(name.strip())
+    if result.returncode != 0 or not modules:
+        raise RuntimeError(f"CLI 启动失败：\n{result.stderr[-2000:]}")
+    loaded = [m for m in modules if m.split('.')[0] == 'pyttsx3']
+    if loaded:
+        raise RuntimeError(f"执行 :help/:about 时导入了 pyttsx3：{', '.join(loaded)}")
+    return {'cli_import': [total_us / 1e6], 'cli_startup': [wall]}
+
+
+BENCHMARKS = {
+    'engine_init': bench_engine_init,
+    'voices': bench_voices,
+    'cli_speech': bench_cli_speech,
+    'cli_read': bench_cli_read,
+    'gui_split': bench_gui_split,
+    'gui_rechunk': bench_gui_rechunk,
+    'gui_page': bench_gui_page,
+    'volume_change': bench_volume_change,
+    'silence_trim': bench_silence_trim,
+    'async_render': bench_async_render,
+    'engine_watchdog': bench_engine_watchdog,
+    'gui_queue': bench_gui_queue,
+    'gui_full': bench_gui_full,
+    'gui_navigation': bench_gui_navigation,
+    'gui_startup': bench_gui_startup,
+    'cli_startup': bench_cli_startup,
+}
+# 每个样本都需要全新进程的项目
+PER_PROCESS = {'engine_init', 'voices', 'gui_startup', 'cli_startup'}
+
+
+def run_child(name, args, workdir):
+    """在子进程中运行一个测量项目，返回 {指标: [样本秒数]}"""
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', name,
+           '--repeat', str(args.repeat), '--size-mb', str(args.size_mb)]
+    result = subprocess.run(cmd, capture_output=True, text=True, cwd=workdir)
+    if result.returncode != 0:
+        raise RuntimeError(f"{name} 运行失败：\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def collect(args, names=None, sources=None):
+    """运行 names 中的项目（默认为 --only 指定的或全部项目），sources 记录每个指标来自哪个项目"""
+    samples = {}
+    for name in names or args.only or BENCHMARKS:
+        runs = args.repeat if name in PER_PROCESS else 1
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as workdir:
+                result = run_child(name, args, workdir)
+            if not result:
+                print(f"{name}：当前环境无法运行，已跳过")
+                break
+            for metric, values in result.items():
+                samples.setdefault(metric, []).extend(values)
+                if sources is not None:
+                    sources[metric] = name
+    return samples
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def load_baselines():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def noise_margin(values, baseline):
+    """本次样本 MAD 的 NOISE_MADS 倍与基线 p95 - 中位数 中较大者，至少 MIN_REGRESSION_SECONDS"""
+    median = statistics.median(values)
+    mad = statistics.median(abs(v - median) for v in values)
+    spread = baseline['p95'] - baseline['median'] if baseline else 0.0
+    return max(NOISE_MADS * mad, spread, MIN_REGRESSION_SECONDS)
+
+
+def report(samples, baselines, tolerance):
+    """打印结果表格，返回退化或超出预算的指标列表"""
+    regressions = []
+    print(f"{'指标':<18} {'中位数(ms)':>11} {'p95(ms)':>10} {'基线(ms)':>10} {'变化':>8}  状态")
+    for metric, values in samples.items():
+        median = statistics.median(values)
+        p95 = percentile(values, 95)
+        baseline = baselines.get(metric)
+        base = baseline['median'] if baseline else None
+        # 减去噪声余量后的中位数，用来判定退化和预算
+        floor = median - noise_margin(values, baseline)
+        gated = len(values) >= MIN_GATE_SAMPLES
+        if base is None:
+            change, status = '', '无基线'
+        else:
+            change = f"{(median / base - 1) * 100:+.0f}%" if base else ''
+            if floor > base * (1 + tolerance):
+                status = '退化' if gated else '偏慢（样本不足，不判定）'
+                if gated:
+                    regressions.append(metric)
+            else:
+                status = '正常'
+        budget = BUDGETS.get(metric)
+        if budget is not None and floor > budget:
+            status = f'超出预算 {budget * 1000:.0f}ms' + ('' if gated else '（样本不足，不判定）')
+            if gated and metric not in regressions:
+                regressions.append(metric)
+        base_text = f"{base * 1000:.2f}" if base is not None else '-'
+        print(f"{metric:<18} {median * 1000:>11.2f} {p95 * 1000:>10.2f} {base_text:>10} {change:>8}  {status}")
+    return regressions
+
+
+def save_baselines(samples):
+    baselines = load_baselines()
+    for metric, values in samples.items():
+        baselines[metric] = {'median': round(statistics.median(values), 6),
+                             'p95': round(percentile(values, 95), 6)}
+    with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ShitTTS 基准测试套件")
+    parser.add_argument('--repeat', type=int, default=5, help="每项的重复次数（默认 5）")
+    parser.add_argument('--size-mb', type=float, default=20, help="分块测试的文本大小（默认 20MB）")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="只运行指定项目")
+    parser.add_argument('--update-baseline', action='store_true', help="用本次结果更新基线")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="允许的相对退化（默认 0.5）")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(BENCHMARKS[args.child](args)))
+        return 0
+
+    sources = {}
+    samples = collect(args, sources=sources)
+    baselines = load_baselines()
+    regressions = report(samples, baselines, args.tolerance)
+    if args.update_baseline:
+        save_baselines(samples)
+        print(f"基线已更新：{BASELINE_FILE}")
+        return 0
+    if regressions:
+        # 偶发的慢样本（其他进程抢占 CPU 等）不应直接判为退化：重新运行一次，合并样本后再判定
+        names = sorted({sources[metric] for metric in regressions})
+        print(f"复测：{', '.join(names)}")
+        for metric, values in collect(args, names).items():
+            samples.setdefault(metric, []).extend(values)
+        regressions = report({m: samples[m] for m in regressions}, baselines, args.tolerance)
+    if regressions:
+        print(f"性能退化或超出预算：{', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
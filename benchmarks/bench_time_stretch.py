@@ -0,0 +1,166 @@
+"""时间伸缩（audio_dsp.time_stretch）与引擎原生语速的音质和 CPU 开销对比
+
+用法：python benchmarks/bench_time_stretch.py [--rates 75 100 200 300] [--base 150] [--seconds 10]
+                                             [--real] [--text 文本]
+
+默认使用合成的类语音信号（变化的基频加谐波、按音节起伏的包络、音节间停顿）：
+“原生语速”的参考信号由同一个生成器按目标语速直接生成（节奏变快、音高不变），
+与伸缩结果逐帧比较对数谱距离（LSD，dB，越小越接近）和估计基频的差异（音分）；
+同时给出直接重采样（音高随语速改变）的 LSD 作为明显失真的参照。
+
+--real 使用本机真实的 pyttsx3 驱动：按各个语速调用 save_to_file 合成，记录合成耗时，
+并把基准语速的合成结果伸缩到同样的语速。真实语音的韵律随语速变化，无法逐帧对齐，
+此时比较长时平均谱的 LSD 和时长比例。
+
+CPU 开销以实时倍率（处理耗时 / 音频时长）表示，越小越好。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import numpy as np  # noqa: E402
+
+import audio_dsp  # noqa: E402
+
+FRAMERATE = 16000
+FRAME = 512
+
+
+def synth_voice(seconds, speed=1.0, framerate=FRAMERATE):
+    """类语音信号：speed 倍的语速下时长为 seconds / speed，音高不随 speed 变化"""
+    t = np.arange(int(seconds / speed * framerate)) / framerate
+    story = t * speed  # 在“原文”中的位置（秒）
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * story) + 15 * np.sin(2 * np.pi * 2.3 * story)
+    phase = 2 * np.pi * np.cumsum(f0) / framerate
+    wave = sum(np.sin(k * phase) / k for k in range(1, 6))
+    # 每秒 4 个音节，每 7 个音节后有一段停顿
+    syllable = np.sin(np.pi * (story * 4 % 1)) ** 2
+    pause = (story * 4 % 7) < 6
+    return audio_dsp.Audio((6000 * wave * syllable * pause).astype(np.int16)[:, None], framerate)
+
+
+def spectrogram(samples):
+    x = samples[:, 0].astype(np.float32)
+    count = len(x) // FRAME
+    frames = x[:count * FRAME].reshape(count, FRAME) * np.hanning(FRAME)
+    return np.abs(np.fft.rfft(frames, axis=1)) + 1e-3
+
+
+def lsd(a, b):
+    """对数谱距离（dB）：只统计参考信号中有声音的帧"""
+    sa, sb = spectrogram(a), spectrogram(b)
+    count = min(len(sa), len(sb))
+    sa, sb = sa[:count], sb[:count]
+    energy = sb.sum(axis=1)
+    voiced = energy > energy.max() * 0.05
+    diff = 20 * np.log10(sa[voiced]) - 20 * np.log10(sb[voiced])
+    return float(np.mean(np.sqrt(np.mean(diff ** 2, axis=1))))
+
+
+def average_spectrum_lsd(a, b):
+    sa, sb = spectrogram(a).mean(axis=0), spectrogram(b).mean(axis=0)
+    diff = 20 * np.log10(sa / sa.sum()) - 20 * np.log10(sb / sb.sum())
+    return float(np.sqrt(np.mean(diff ** 2)))
+
+
+def estimate_pitch(audio):
+    """每帧用自相关估计基频，静音帧为 nan"""
+    x = audio.samples[:, 0].astype(np.float32)
+    lags = np.arange(FRAMERATE // 400, FRAMERATE // 60)
+    pitches = []
+    for start in range(0, len(x) - 2 * FRAME, FRAME):
+        frame = x[start:start + 2 * FRAME]
+        if np.abs(frame).max() < 1000:
+            pitches.append(np.nan)
+            continue
+        corr = np.array([np.dot(frame[:-lag], frame[lag:]) for lag in lags])
+        pitches.append(FRAMERATE / lags[np.argmax(corr)])
+    return np.array(pitches)
+
+
+def pitch_error_cents(audio, reference):
+    """与参考信号逐帧比较估计的基频，返回误差中位数（音分）；两者用同一估计方法，抵消估计误差"""
+    a, b = estimate_pitch(audio), estimate_pitch(reference)
+    count = min(len(a), len(b))
+    errors = np.abs(1200 * np.log2(a[:count] / b[:count]))
+    errors = errors[~np.isnan(errors)]
+    return float(np.median(errors)) if len(errors) else float('nan')
+
+
+def resample(audio, speed):
+    """直接重采样：时长和音高同时改变"""
+    x = audio.samples[:, 0].astype(np.float32)
+    positions = np.arange(0, len(x) - 1, speed)
+    return audio_dsp.Audio(np.interp(positions, np.arange(len(x)), x).astype(np.int16)[:, None],
+                           audio.framerate)
+
+
+def timed_stretch(audio, speed):
+    start = time.perf_counter()
+    result = audio_dsp.time_stretch(audio, speed)
+    return result, time.perf_counter() - start
+
+
+def run_synthetic(args):
+    base = synth_voice(args.seconds)
+    print(f"{'语速':>6} {'倍数':>6} {'伸缩RTF':>9} {'时长误差':>8} {'LSD(dB)':>8} {'重采样LSD':>9} {'音高误差(音分)':>12}")
+    for rate in args.rates:
+        speed = rate / float(args.base)
+        reference = synth_voice(args.seconds, speed)
+        stretched, seconds = timed_stretch(base, speed)
+        error = len(stretched.samples) / float(len(reference.samples)) - 1
+        print(f"{rate:>6} {speed:>6.2f} {seconds / stretched.duration:>9.4f} {error:>+8.2%} "
+              f"{lsd(stretched.samples, reference.samples):>8.2f} "
+              f"{lsd(resample(base, speed).samples, reference.samples):>9.2f} "
+              f"{pitch_error_cents(stretched, reference):>12.1f}")
+
+
+def run_real(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        _run_real(args, workdir)
+
+
+def _run_real(args, workdir):
+    import pyttsx3
+    engine = pyttsx3.init()
+
+    def render(rate):
+        path = os.path.join(workdir, f'{rate}.wav')
+        engine.setProperty('rate', rate)
+        start = time.perf_counter()
+        engine.save_to_file(args.text, path)
+        engine.runAndWait()
+        return audio_dsp.read_wav(path), time.perf_counter() - start
+
+    base, _ = render(args.base)
+    print(f"{'语速':>6} {'原生RTF':>9} {'伸缩RTF':>9} {'时长比':>8} {'平均谱LSD(dB)':>13}")
+    for rate in args.rates:
+        native, native_seconds = render(rate)
+        stretched, seconds = timed_stretch(base, rate / float(args.base))
+        print(f"{rate:>6} {native_seconds / native.duration:>9.4f} {seconds / stretched.duration:>9.4f} "
+              f"{stretched.duration / native.duration:>8.2f} "
+              f"{average_spectrum_lsd(stretched.samples, native.samples):>13.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rates', type=int, nargs='+', default=[75, 100, 200, 300], help="目标语速")
+    parser.add_argument('--base', type=int, default=150, help="基准语速")
+    parser.add_argument('--seconds', type=float, default=10.0, help="合成信号在基准语速下的时长")
+    parser.add_argument('--real', action='store_true', help="使用本机真实的 pyttsx3 驱动")
+    parser.add_argument('--text', default="这是一段用于比较时间伸缩和引擎原生语速的测试文本。" * 5,
+                        help="--real 时合成的文本")
+    args = parser.parse_args()
+    if args.real:
+        run_real(args)
+    else:
+        run_synthetic(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""确定性的模拟 pyttsx3 驱动，用于在没有音频设备的机器（如 CI）上运行基准测试
+
+调用 install() 后，pyttsx3.init() 默认使用本驱动。各项耗时通过环境变量配置，
+子进程会自动继承：
+
+- SHITTTS_FAKE_INIT_MS：创建驱动的耗时，默认 150
+- SHITTTS_FAKE_VOICES：语音数量（一半为中文语音），默认 40
+- SHITTTS_FAKE_VOICE_MS：枚举每个语音的耗时，默认 1
+- SHITTTS_FAKE_FIRST_AUDIO_MS：say() 开始到发出第一个声音的耗时，默认 20
+- SHITTTS_FAKE_PREPARE_US：say() 出声前处理每个字的耗时（微秒），这段时间内不响应 stop()，默认 2
+- SHITTTS_FAKE_RTF：实时倍率，朗读/合成耗时 = 音频时长 × RTF，默认 0.02
+- SHITTTS_FAKE_HANG_EVERY：每 N 次 say()/save_to_file() 卡住一次（不响应 stop()），默认 0 不卡住
+- SHITTTS_FAKE_HANG_MS：卡住的时长，默认 3600000
+
+音频时长按每秒 CHARS_PER_SECOND 个字计算，朗读时每 CHARS_PER_SECOND 个字发出一次 started-word；save_to_file 生成的 WAV 内容只由文本长度决定，
+前后各有一段静音，中间为 440Hz 正弦波。
+"""
+import math
+import os
+import struct
+import sys
+import time
+import types
+import wave
+
+DRIVER_NAME = 'fake'
+CHARS_PER_SECOND = 5
+SAMPLE_RATE = 16000
+LEAD_SILENCE = 0.15
+
+# 每次开始朗读（started-utterance）的时间点，基准测试用来计算首音延迟
+utterances = []
+# 与 utterances 一一对应的朗读文本
+spoken = []
+# 每次朗读结束（finished-utterance）的时间点
+finished = []
+# say() 和 save_to_file() 的调用次数、其中卡住的次数
+calls = [0]
+hangs = [0]
+
+
+def _setting(name, default):
+    return float(os.environ.get(name, default))
+
+
+def audio_seconds(text):
+    """文本对应的模拟音频时长（秒）"""
+    return max(len(text.strip()), 1) / CHARS_PER_SECOND
+
+
+_PERIOD = b''.join(struct.pack('<h', int(8000 * math.sin(2 * math.pi * i / 40))) for i in range(40))
+
+
+def write_wav(path, text):
+    """写入与文本长度对应的 16kHz 单声道 WAV"""
+    total = int(audio_seconds(text) * SAMPLE_RATE)
+    lead = int(LEAD_SILENCE * SAMPLE_RATE)
+    body = max(total - 2 * lead, 0)
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(b'\x00\x00' * lead)
+        w.writeframes((_PERIOD * (body // 40 + 1))[:body * 2])
+        w.writeframes(b'\x00\x00' * lead)
+
+
+class FakeDriver:
+    """按 pyttsx3 驱动接口实现的模拟驱动，所有命令在 startLoop 中同步执行"""
+
+    def __init__(self, proxy):
+        self._proxy = proxy
+        self._stopped = False
+        time.sleep(_setting('SHITTTS_FAKE_INIT_MS', 150) / 1000)
+        self._config = {'rate': 200, 'volume': 1.0, 'voice': None, 'voices': None}
+
+    def _voices(self):
+        """首次查询时才枚举语音，模拟系统扫描语音的耗时"""
+        if self._config['voices'] is None:
+            from pyttsx3.voice import Voice
+            count = int(_setting('SHITTTS_FAKE_VOICES', 40))
+            delay = _setting('SHITTTS_FAKE_VOICE_MS', 1) / 1000
+            voices = []
+            for i in range(count):
+                time.sleep(delay)
+                if i % 2:
+                    voices.append(Voice(f'fake.zh.{i}', f'Chinese (Mandarin) {i}', ['zh-CN'], 'female', 'adult'))
+                else:
+                    voices.append(Voice(f'fake.en.{i}', f'English {i}', ['en-US'], 'male', 'adult'))
+            self._config['voices'] = voices
+            self._config['voice'] = voices[0].id if voices else None
+        return self._config['voices']
+
+    def destroy(self):
+        pass
+
+    def startLoop(self):
+        self._proxy.setBusy(False)
+
+    def endLoop(self):
+        pass
+
+    def iterate(self):
+        self._proxy.setBusy(False)
+        yield
+
+    def _simulate(self, text, words=False):
+        """按实时倍率等待，期间收到 stop() 时提前结束；words 为 True 时按进度发出 started-word"""
+        calls[0] += 1
+        every = int(_setting('SHITTTS_FAKE_HANG_EVERY', 0))
+        if every and calls[0] % every == 0:
+            # 模拟驱动卡在 runAndWait() 中
+            hangs[0] += 1
+            time.sleep(_setting('SHITTTS_FAKE_HANG_MS', 3600000) / 1000)
+        start = time.perf_counter()
+        duration = audio_seconds(text) * _setting('SHITTTS_FAKE_RTF', 0.02)
+        deadline = start + duration
+        location = 0
+        while not self._stopped and time.perf_counter() < deadline:
+            if words and location < len(text):
+                # 第 location 个字对应的时间点
+                due = start + duration * location / max(len(text), 1)
+                if time.perf_counter() >= due:
+                    length = min(CHARS_PER_SECOND, len(text) - location)
+                    self._proxy.notify('started-word', location=location, length=length)
+                    location += length
+                    continue
+            time.sleep(min(0.005, max(deadline - time.perf_counter(), 0)))
+
+    def say(self, text):
+        self._stopped = False
+        self._proxy.setBusy(True)
+        time.sleep(_setting('SHITTTS_FAKE_FIRST_AUDIO_MS', 20) / 1000
+                   + len(text) * _setting('SHITTTS_FAKE_PREPARE_US', 2) / 1e6)
+        utterances.append(time.perf_counter())
+        spoken.append(text)
+        self._proxy.notify('started-utterance')
+        self._simulate(text, words=True)
+        finished.append(time.perf_counter())
+        self._proxy.notify('finished-utterance', completed=not self._stopped)
+        self._proxy.setBusy(False)
+
+    def save_to_file(self, text, filename):
+        self._stopped = False
+        self._proxy.setBusy(True)
+        # 与真实驱动一样，合成到文件时也发出 started-utterance / finished-utterance
+        self._proxy.notify('started-utterance')
+        self._simulate(text)
+        write_wav(filename, text)
+        self._proxy.notify('finished-utterance', completed=not self._stopped)
+        self._proxy.setBusy(False)
+
+    def stop(self):
+        self._stopped = True
+
+    def getProperty(self, name):
+        if name == 'voices':
+            return self._voices()
+        if name not in self._config:
+            raise KeyError(f"unknown property {name}")
+        return self._config[name]
+
+    def setProperty(self, name, value):
+        if name == 'voice':
+            if not any(v.id == value for v in self._voices()):
+                raise ValueError(f"unknown voice {value}")
+        elif name not in self._config:
+            raise KeyError(f"unknown property {name}")
+        self._config[name] = value
+
+
+def install():
+    """注册模拟驱动，并让 pyttsx3.init() 默认使用它"""
+    import pyttsx3.engine
+    module = types.ModuleType(f'pyttsx3.drivers.{DRIVER_NAME}')
+    module.buildDriver = FakeDriver
+    sys.modules[module.__name__] = module
+    pyttsx3.engine.default_engine_by_sys_platform = lambda: DRIVER_NAME
@@ -1,153 +1,239 @@
-import pyttsx3
 import os
-import platform
 import json
 import glob
 import re
+import sys
+import time
+import argparse
+from audio_cache import AudioCache, DEFAULT_BUDGET_MB
+from audio_sink import DEFAULT_BUFFER_MS, create_sink
+from chunk_player import ChunkPlayer, DEFAULT_PREFETCH_DEPTH
+from console import echo, prompt, stream, use_stderr
+from engine_watchdog import create_watchdog
+from metrics import create_recorder
+from text_blocks import BlockIndex, BlockList
+from tts_engine import EngineManager, stretch_rate_setting
+from voice_registry import VoiceRegistry
+
+_ansi_ready = None
+
+def _enable_ansi():
+    """确保终端能处理 ANSI 转义序列（Windows 10 及以上需要开启虚拟终端模式）"""
+    global _ansi_ready
+    if _ansi_ready is None:
+        _ansi_ready = stream().isatty()
+        if _ansi_ready and sys.platform == 'win32':
+            try:
+                import ctypes
+                kernel32 = ctypes.windll.kernel32
+                # STD_ERROR_HANDLE = -12，STD_OUTPUT_HANDLE = -11
+                handle = kernel32.GetStdHandle(-12 if stream() is sys.stderr else -11)
+                mode = ctypes.c_uint32()
+                # ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
+                _ansi_ready = bool(kernel32.GetConsoleMode(handle, ctypes.byref(mode))
+                                   and kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+            except Exception:
+                _ansi_ready = False
+    return _ansi_ready
 
 def clear_screen():
-    """跨平台清屏"""
-    if platform.system() == "Windows":
+    """跨平台清屏：输出 ANSI 转义序列，不再启动 shell 子进程"""
+    out = stream()
+    if _enable_ansi():
+        out.write('\033[2J\033[3J\033[H')
+        out.flush()
+    elif sys.platform == 'win32' and out.isatty():
+        # 旧版 Windows 控制台不支持 ANSI
         os.system('cls')
+
+# 整个程序共用一个长期存在的引擎和语音注册表，避免每块文本都重新初始化
+voice_registry = VoiceRegistry()
+engine_manager = EngineManager(registry=voice_registry)
+# 文件分块朗读时在后台预渲染后面几块
+chunk_player = ChunkPlayer(engine_manager)
+
+def setup_audio_cache(cache_mb):
+    """按配置的容量（MB）启用合成音频缓存，0 表示关闭"""
+    if cache_mb and cache_mb > 0:
+        try:
+            engine_manager.audio_cache = AudioCache(max_bytes=int(cache_mb * 1024 * 1024))
+        except OSError as e:
+            echo(f"创建音频缓存失败：{e}，将直接朗读")
+            engine_manager.audio_cache = None
     else:
-        os.system('clear')
+        engine_manager.audio_cache = None
+
+def setup_audio_sink(spec, buffer_ms=DEFAULT_BUFFER_MS):
+    """配置音频输出端（device、null、stdout、file:<路径>），未配置时用命令行播放器播放"""
+    try:
+        sink = create_sink(spec)
+    except ValueError as e:
+        echo(f"{e}，将使用默认播放方式")
+        sink = None
+    if sink is not None and engine_manager.audio_cache is None:
+        # 输出端播放的是合成好的音频文件
+        echo("音频输出需要启用音频缓存（audio_cache_mb 大于 0），将使用默认播放方式")
+        sink = None
+    engine_manager.player.set_sink(sink, buffer_ms or DEFAULT_BUFFER_MS)
+
+def setup_console(config):
+    """启动时选择提示信息的输出流：音频输出到标准输出时，提示信息改为输出到标准错误"""
+    if config.get('audio_sink') == 'stdout':
+        use_stderr()
+
+def silence_trim_options(options):
+    """配置中的 silence_trim：参数字典（threshold_db、guard_ms）、true 使用默认参数，null 或 false 关闭"""
+    if isinstance(options, dict):
+        return dict(options)
+    return {} if options is True else None
+
+def setup_silence_trim(options):
+    """配置合成后裁剪首尾静音的参数"""
+    engine_manager.silence_trim = silence_trim_options(options)
+
+def setup_engine_watchdog(options):
+    """配置监督 runAndWait() 的看门狗：参数字典（base_seconds、factor、retries）、true 或 null 使用默认参数，false 关闭"""
+    engine_manager.watchdog = create_watchdog(options)
+
+def trim_report(since):
+    """since 为之前的 (裁剪文件数, 累计秒数)，输出此后裁掉的首尾静音时长"""
+    count = engine_manager.stats['trimmed_files'] - since[0]
+    seconds = engine_manager.stats['trimmed_seconds'] - since[1]
+    if count > 0:
+        echo(f"去除首尾静音共节省 {seconds * 1000:.0f} 毫秒（{count} 块，平均每块 {seconds * 1000 / count:.0f} 毫秒）")
+
+def setup_metrics(metrics_dir):
+    """配置了 metrics_dir（或环境变量 SHITTTS_METRICS_DIR）时记录每次朗读的分阶段耗时"""
+    engine_manager.metrics = create_recorder(metrics_dir)
 
 def initialize_engine(rate=150, volume=1.0, voice_id=None):
-    """初始化语音引擎，支持指定 voice_id"""
+    """获取语音引擎，支持指定 voice_id（引擎只创建一次，属性变化时才重新设置）"""
     try:
-        engine = pyttsx3.init()
-        engine.setProperty('rate', rate)
-        engine.setProperty('volume', volume)
-        # 如果指定了 voice_id，尝试使用
-        if voice_id:
-            voices = engine.getProperty('voices')
-            valid_voice = None
-            for voice in voices:
-                if voice.id == voice_id:
-                    valid_voice = voice
-                    break
-            if valid_voice:
-                engine.setProperty('voice', voice_id)
-            else:
-                print(f"警告：未找到指定的语音ID '{voice_id}'，使用默认语音。")
-        else:
-            # 未指定 voice_id 时，优先选择中文语音
-            voices = engine.getProperty('voices')
-            chinese_voice = None
-            for voice in voices:
-                if "Chinese" in voice.name or "Chinese" in voice.id or "Mandarin" in voice.name:
-                    chinese_voice = voice
-                    break
-            if chinese_voice:
-                engine.setProperty('voice', chinese_voice.id)
-            else:
-                print("警告：未找到中文语音，可能使用默认语音。")
-        return engine
+        return engine_manager.acquire(rate, volume, voice_id)
     except Exception as e:
-        print(f"初始化语音引擎失败：{e}")
+        echo(f"初始化语音引擎失败：{e}")
+        engine_manager.reset()
         return None
 
 def text_to_speech(text, rate, volume, voice_id=None):
     """朗读文本，支持指定 voice_id"""
-    engine = initialize_engine(rate, volume, voice_id)
-    if not engine:
+    if not initialize_engine(rate, volume, voice_id):
         return
     try:
-        engine.say(text)
-        engine.runAndWait()
+        engine_manager.speak(text, rate, volume, voice_id)
     except Exception as e:
-        print(f"朗读出错：{e}")
-    finally:
-        try:
-            engine.stop()
-        except:
-            pass
+        # speak 出错时已重置引擎，下次朗读会重新创建
+        echo(f"朗读出错：{e}")
 
-def list_voices():
-    """列出所有可用的语音"""
+def speak_block(blocks, index, rate, volume, voice_id=None):
+    """朗读文件中的一块，播放的同时在后台预渲染后面几块"""
     try:
-        engine = pyttsx3.init()
-        voices = engine.getProperty('voices')
+        chunk_player.speak(blocks[index], rate, volume, voice_id,
+                           upcoming=chunk_player.upcoming(blocks, index))
+    except Exception as e:
+        echo(f"朗读出错：{e}")
+
+def prefetch_block(blocks, index, rate, volume, voice_id=None):
+    """回退或跳转后取消旧的预渲染，改为预渲染目标块"""
+    chunk_player.cancel()
+    chunk_player.prefetch([blocks[index]], rate, volume, voice_id)
+
+def list_voices(refresh=False):
+    """列出所有可用的语音（使用语音注册表缓存，refresh 为 True 时重新枚举）"""
+    try:
+        voices = engine_manager.load_voices(refresh)
         if not voices:
-            print("未检测到任何语音。")
+            echo("未检测到任何语音。")
             return
-        print("\n可用语音列表：")
-        print(f"{'编号':<4} {'名称':<30} {'语言':<15} {'ID'}")
-        print("=" * 80)
+        echo("\n可用语音列表：")
+        echo(f"{'编号':<4} {'名称':<30} {'语言':<15} {'ID'}")
+        echo("=" * 80)
         for i, voice in enumerate(voices):
             lang = ', '.join(voice.languages) if voice.languages else 'Unknown'
-            print(f"{i+1:<4} {voice.name[:29]:<30} {lang:<15} {voice.id}")
-        print("=" * 80)
-        print("使用 ':voice select <编号>' 选择语音")
+            echo(f"{i+1:<4} {voice.name[:29]:<30} {lang:<15} {voice.id}")
+        echo("=" * 80)
+        echo("使用 ':voice select <编号>' 选择语音，':voices refresh' 重新扫描语音")
     except Exception as e:
-        print(f"获取语音列表失败：{e}")
+        echo(f"获取语音列表失败：{e}")
 
 def select_voice_by_index(index):
     """根据编号选择语音"""
     try:
-        engine = pyttsx3.init()
-        voices = engine.getProperty('voices')
+        voices = engine_manager.load_voices()
         if 1 <= index <= len(voices):
             selected = voices[index - 1]
-            print(f"✅ 已选择语音：{selected.name}")
+            echo(f"✅ 已选择语音：{selected.name}")
             return selected.id  # 返回 voice_id
         else:
-            print(f"❌ 编号超出范围，有效范围是 1-{len(voices)}")
+            echo(f"❌ 编号超出范围，有效范围是 1-{len(voices)}")
             return None
     except Exception as e:
-        print(f"选择语音失败：{e}")
+        echo(f"选择语音失败：{e}")
         return None
 
 def read_text_file(file_paths):
-    """读取多个 TXT 文件并按空行分块"""
-    blocks = []
+    """读取多个 TXT 文件并按空行分块
+
+    每个文件建立块偏移索引（保存在 block_index 目录），返回按需读取的块序列；
+    文件未修改时再次打开只加载索引，不再重新扫描。编码根据文件开头自动识别
+    （BOM、UTF-8、GBK/GB18030、UTF-16），整个文件只读取一遍。
+    """
+    blocks = BlockList()
     for file_path in file_paths:
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-                # 以空行分隔文本块
-                file_blocks = [block.strip() for block in content.split('\n\n') if block.strip()]
-                blocks.extend(file_blocks)
-                print(f"已加载文件：{file_path}，包含 {len(file_blocks)} 个文本块")
+            start = time.perf_counter()
+            try:
+                index = BlockIndex.open(file_path)
+            except UnicodeDecodeError:
+                # 开头像 UTF-8/GBK 但后面解码失败，用兼容范围最大的 GB18030 重试
+                index = BlockIndex.open(file_path, encoding='gb18030')
+            blocks.append(index)
+            echo(f"已加载文件：{file_path}，包含 {len(index)} 个文本块"
+                  f"（编码：{index.encoding}，耗时 {time.perf_counter() - start:.2f} 秒）")
         except FileNotFoundError:
-            print(f"错误：文件 '{file_path}' 不存在")
+            echo(f"错误：文件 '{file_path}' 不存在")
         except UnicodeDecodeError:
-            try:
-                # 尝试其他编码
-                with open(file_path, 'r', encoding='gbk') as file:
-                    content = file.read()
-                    file_blocks = [block.strip() for block in content.split('\n\n') if block.strip()]
-                    blocks.extend(file_blocks)
-                    print(f"已加载文件：{file_path}，包含 {len(file_blocks)} 个文本块")
-            except:
-                print(f"读取文件 '{file_path}' 出错：编码问题")
+            echo(f"读取文件 '{file_path}' 出错：编码问题")
         except Exception as e:
-            print(f"读取文件 '{file_path}' 出错：{e}")
+            echo(f"读取文件 '{file_path}' 出错：{e}")
     return blocks if blocks else None
 
 def load_config():
     """加载配置文件"""
     config_file = 'config.json'
-    default_config = {'rate': 150, 'volume': 1.0, 'recent_files': [], 'voice_id': None}
+    default_config = {'rate': 150, 'volume': 1.0, 'recent_files': [], 'voice_id': None,
+                      'audio_cache_mb': DEFAULT_BUDGET_MB, 'prefetch_depth': DEFAULT_PREFETCH_DEPTH,
+                      'metrics_dir': None, 'time_stretch_rate': None, 'silence_trim': {},
+                      'audio_sink': None, 'audio_buffer_ms': DEFAULT_BUFFER_MS, 'engine_watchdog': {}}
     if os.path.exists(config_file):
         try:
             with open(config_file, 'r', encoding='utf-8') as f:
                 config = json.load(f)
                 # 确保兼容旧配置
                 config.setdefault('voice_id', None)
+                config.setdefault('audio_cache_mb', DEFAULT_BUDGET_MB)
+                config.setdefault('prefetch_depth', DEFAULT_PREFETCH_DEPTH)
+                config.setdefault('metrics_dir', None)
+                config.setdefault('time_stretch_rate', None)
+                config.setdefault('silence_trim', {})
+                config.setdefault('audio_sink', None)
+                config.setdefault('audio_buffer_ms', DEFAULT_BUFFER_MS)
+                config.setdefault('engine_watchdog', {})
                 return config
         except Exception as e:
-            print(f"加载配置文件出错：{e}，使用默认设置")
+            echo(f"加载配置文件出错：{e}，使用默认设置")
     return default_config
 
 def save_config(rate, volume, recent_files, voice_id=None):
     """保存配置文件"""
-    config = {'rate': rate, 'volume': volume, 'recent_files': recent_files, 'voice_id': voice_id}
+    # 保留其他配置项（如 audio_cache_mb）
+    config = load_config()
+    config.update({'rate': rate, 'volume': volume, 'recent_files': recent_files, 'voice_id': voice_id})
     try:
         with open('config.json', 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=4)
     except Exception as e:
-        print(f"保存配置文件出错：{e}")
+        echo(f"保存配置文件出错：{e}")
 
 def scan_txt_files():
     """扫描当前目录下的所有txt文件（确保不重复）"""
@@ -166,10 +252,10 @@ def scan_txt_files():
 def display_file_list(txt_files):
     """显示文件列表"""
     if not txt_files:
-        print("当前目录下没有找到txt文件")
+        echo("当前目录下没有找到txt文件")
         return
-    print("\n当前目录下的txt文件:")
-    print("=" * 60)
+    echo("\n当前目录下的txt文件:")
+    echo("=" * 60)
     for i, file in enumerate(txt_files, 1):
         try:
             size = os.path.getsize(file)
@@ -178,16 +264,16 @@ def display_file_list(txt_files):
                 size_str = f"{size/1024:.1f} KB"
             if size > 1024*1024:
                 size_str = f"{size/(1024*1024):.1f} MB"
-            print(f"{i:2d}. {file.ljust(40)} ({size_str})")
+            echo(f"{i:2d}. {file.ljust(40)} ({size_str})")
         except:
-            print(f"{i:2d}. {file}")
-    print("=" * 60)
-    print("使用 ':file <编号>' 命令选择文件")
+            echo(f"{i:2d}. {file}")
+    echo("=" * 60)
+    echo("使用 ':file <编号>' 命令选择文件")
 
 def display_help():
     """显示帮助信息"""
     clear_screen()
-    print("""
+    echo("""
 文本转语音程序 - 使用说明
 ================================
 命令前缀: 所有命令以冒号(:)开头
@@ -205,6 +291,7 @@ def display_help():
     - :manual：切换回手动输入
 - 音色控制：
   - :voices：列出所有可用语音
+  - :voices refresh：重新扫描系统语音
   - :voice select <编号>：选择指定编号的语音
 - 其他命令：
   - :rate <数值>：设置语速（50-300，推荐150）
@@ -218,17 +305,17 @@ def display_help():
 
 def display_text_block(block, index, total, blocks):
     """显示文本块内容及前后块摘要"""
-    print(f"\n=== 第 {index + 1}/{total} 块文本 ===")
-    print(block)
-    print("=" * 40)
+    echo(f"\n=== 第 {index + 1}/{total} 块文本 ===")
+    echo(block)
+    echo("=" * 40)
     if index > 0:
         prev_summary = blocks[index - 1][:50] + ("..." if len(blocks[index - 1]) > 50 else "")
-        print(f"上一块摘要（{index}/{total}）：{prev_summary}")
+        echo(f"上一块摘要（{index}/{total}）：{prev_summary}")
     if index < total - 1:
         next_summary = blocks[index + 1][:50] + ("..." if len(blocks[index + 1]) > 50 else "")
-        print(f"下一块摘要（{index + 2}/{total}）：{next_summary}")
-    print("=" * 40)
-    print("按回车朗读此块，输入 ':back'、':next'、':goto <编号>' 或 ':manual'")
+        echo(f"下一块摘要（{index + 2}/{total}）：{next_summary}")
+    echo("=" * 40)
+    echo("按回车朗读此块，输入 ':back'、':next'、':goto <编号>' 或 ':manual'")
 
 def process_command(user_input, txt_files):
     """处理用户输入的命令"""
@@ -241,22 +328,33 @@ def process_command(user_input, txt_files):
 
 def main():
     config = load_config()
+    setup_console(config)
     rate = config.get('rate', 150)
     volume = config.get('volume', 1.0)
     recent_files = config.get('recent_files', [])
     saved_voice_id = config.get('voice_id', None)  # 从配置加载 voice_id
+    setup_audio_cache(config.get('audio_cache_mb', DEFAULT_BUDGET_MB))
+    chunk_player.prefetch_depth = config.get('prefetch_depth', DEFAULT_PREFETCH_DEPTH)
+    setup_metrics(config.get('metrics_dir'))
+    engine_manager.stretch_base_rate = stretch_rate_setting(config.get('time_stretch_rate'))
+    setup_silence_trim(config.get('silence_trim', {}))
+    setup_engine_watchdog(config.get('engine_watchdog', {}))
+    setup_audio_sink(config.get('audio_sink'), config.get('audio_buffer_ms', DEFAULT_BUFFER_MS))
     file_mode = False
+    # 加载文件时的静音裁剪统计，读完后输出本文档节省的时长
+    trim_since = (0, 0.0)
     text_blocks = []
     current_block_index = 0
-    txt_files = scan_txt_files()
+    # 第一次用编号打开文件或执行 :list 时才扫描当前目录
+    txt_files = None
     clear_screen()
-    print("欢迎使用ShitTTS-CLI文本转语音程序！\n"
+    echo("欢迎使用ShitTTS-CLI文本转语音程序！\n"
           "输入 ':help' 查看使用说明，':quit' 或 ':exit' 退出。\n"
           "输入 ':voices'查看可用音色\n"
           "输入 ':rate <数值>'设置语速（50-300，推荐150）\n"
           "输入 ':volume <数值>'设置音量（0.0-1.0）\n")
     if recent_files:
-        print(f"最近打开的文件：{', '.join(recent_files[-3:])}")
+        echo(f"最近打开的文件：{', '.join(recent_files[-3:])}")
 
     while True:
         try:
@@ -264,19 +362,20 @@ def main():
                 if current_block_index < len(text_blocks):
                     display_text_block(text_blocks[current_block_index], current_block_index, len(text_blocks), text_blocks)
                 else:
-                    print(f"已到达最后一块文本（共 {len(text_blocks)} 块）")
+                    echo(f"已到达最后一块文本（共 {len(text_blocks)} 块）")
+                    trim_report(trim_since)
                     file_mode = False
                     text_blocks = []
                     current_block_index = 0
-                    print("已切换回手动输入模式")
+                    echo("已切换回手动输入模式")
                     continue
 
-            user_input = input("> ").strip()
+            user_input = prompt("> ").strip()
             command, args = process_command(user_input, txt_files)
 
             if command in ['quit', 'exit', '退出']:
                 save_config(rate, volume, recent_files, voice_id=saved_voice_id)
-                print("程序已退出")
+                echo("程序已退出")
                 break
 
             if command == 'help':
@@ -292,12 +391,12 @@ def main():
                     new_rate = int(args)
                     if 50 <= new_rate <= 300:
                         rate = new_rate
-                        print(f"语速已设置为：{rate}")
+                        echo(f"语速已设置为：{rate}")
                         save_config(rate, volume, recent_files, voice_id=saved_voice_id)
                     else:
-                        print("语速范围应为 50-300")
+                        echo("语速范围应为 50-300")
                 except (IndexError, ValueError):
-                    print("请输入有效语速值，例如：:rate 150")
+                    echo("请输入有效语速值，例如：:rate 150")
                 continue
 
             if command == 'volume':
@@ -305,24 +404,26 @@ def main():
                     new_volume = float(args)
                     if 0.0 <= new_volume <= 1.0:
                         volume = new_volume
-                        print(f"音量已设置为：{volume}")
+                        echo(f"音量已设置为：{volume}")
                         save_config(rate, volume, recent_files, voice_id=saved_voice_id)
                     else:
-                        print("音量范围应为 0.0-1.0")
+                        echo("音量范围应为 0.0-1.0")
                 except (IndexError, ValueError):
-                    print("请输入有效音量值，例如：:volume 1.0")
+                    echo("请输入有效音量值，例如：:volume 1.0")
                 continue
 
             if command == 'file':
                 if not args:
-                    print("请输入文件路径或编号，例如：:file example.txt 或 :file 1")
+                    echo("请输入文件路径或编号，例如：:file example.txt 或 :file 1")
                     continue
                 if args.isdigit():
+                    if txt_files is None:
+                        txt_files = scan_txt_files()
                     file_index = int(args) - 1
                     if 0 <= file_index < len(txt_files):
                         file_paths = [txt_files[file_index]]
                     else:
-                        print(f"无效的文件编号，请输入 1-{len(txt_files)} 之间的数字")
+                        echo(f"无效的文件编号，请输入 1-{len(txt_files)} 之间的数字")
                         continue
                 else:
                     file_paths = args.split()
@@ -331,13 +432,14 @@ def main():
                     if text_blocks:
                         file_mode = True
                         current_block_index = 0
+                        trim_since = (engine_manager.stats['trimmed_files'], engine_manager.stats['trimmed_seconds'])
                         for file_path in file_paths:
                             if file_path in recent_files:
                                 recent_files.remove(file_path)
                             recent_files.append(file_path)
                         recent_files = recent_files[-5:]
                         save_config(rate, volume, recent_files, voice_id=saved_voice_id)
-                        print(f"已加载 {len(file_paths)} 个文件，共有 {len(text_blocks)} 块文本")
+                        echo(f"已加载 {len(file_paths)} 个文件，共有 {len(text_blocks)} 块文本")
                     else:
                         file_mode = False
                 continue
@@ -349,7 +451,7 @@ def main():
 
             if command == 'about':
                 clear_screen()
-                print("""
+                echo("""
                 ShitTTS-CLI
 
                 版本：v1.14.51.4-cli
@@ -380,7 +482,7 @@ def main():
 
             # === 音色选择命令 ===
             if command == 'voices':
-                list_voices()
+                list_voices(refresh=(args == 'refresh'))
                 continue
 
             if command == 'voice' and args.startswith('select'):
@@ -391,7 +493,7 @@ def main():
                         saved_voice_id = selected_id  # 更新全局保存的 voice_id
                         save_config(rate, volume, recent_files, voice_id=saved_voice_id)
                 except (ValueError, IndexError):
-                    print("请指定有效的语音编号，例如：:voice select 1")
+                    echo("请指定有效的语音编号，例如：:voice select 1")
                 continue
             # ============================
 
@@ -399,12 +501,13 @@ def main():
                 if command == 'back':
                     if current_block_index > 0:
                         current_block_index -= 1
+                        prefetch_block(text_blocks, current_block_index, rate, volume, voice_id=saved_voice_id)
                     else:
-                        print("已经是第一块文本")
+                        echo("已经是第一块文本")
                     continue
                 elif command == 'next' or user_input == '':
                     if current_block_index < len(text_blocks):
-                        text_to_speech(text_blocks[current_block_index], rate, volume, voice_id=saved_voice_id)
+                        speak_block(text_blocks, current_block_index, rate, volume, voice_id=saved_voice_id)
                         current_block_index += 1
                     continue
                 elif command == 'goto':
@@ -412,32 +515,136 @@ def main():
                         block_num = int(args)
                         if 1 <= block_num <= len(text_blocks):
                             current_block_index = block_num - 1
+                            prefetch_block(text_blocks, current_block_index, rate, volume, voice_id=saved_voice_id)
                         else:
-                            print(f"请输入有效块编号（1-{len(text_blocks)}）")
+                            echo(f"请输入有效块编号（1-{len(text_blocks)}）")
                     except (IndexError, ValueError):
-                        print("请输入有效块编号，例如：:goto 3")
+                        echo("请输入有效块编号，例如：:goto 3")
                     continue
                 elif command == 'manual':
                     file_mode = False
                     text_blocks = []
                     current_block_index = 0
-                    print("已切换回手动输入模式")
+                    echo("已切换回手动输入模式")
                     continue
                 elif command is not None:
-                    print(f"未知命令: :{command}")
+                    echo(f"未知命令: :{command}")
                     continue
 
             if user_input and command is None:
                 text_to_speech(user_input, rate, volume, voice_id=saved_voice_id)
             elif not user_input:
-                print("请输入有效文本或命令！")
+                echo("请输入有效文本或命令！")
 
         except KeyboardInterrupt:
             save_config(rate, volume, recent_files, voice_id=saved_voice_id)
-            print("\n程序被用户中断")
+            echo("\n程序被用户中断")
             break
         except Exception as e:
-            print(f"发生错误：{e}")
+            echo(f"发生错误：{e}")
+
+def run_batch(argv):
+    """非交互批量合成：python ShitTTS-CLI.py render [选项] 文件或通配符..."""
+    config = load_config()
+    parser = argparse.ArgumentParser(prog='ShitTTS-CLI render', description='把文本文件按空行分块批量合成为 WAV 音频')
+    parser.add_argument('inputs', nargs='+', help='TXT 文件路径或通配符，例如 *.txt')
+    parser.add_argument('-o', '--output', default='output', help='输出目录（默认 output）')
+    parser.add_argument('--mode', choices=['block', 'document'], default='block',
+                        help='block：每块一个文件；document：每个文档拼接为一个带章节标记的文件')
+    parser.add_argument('--silence', type=int, default=500, help='document 模式下块之间的静音毫秒数（默认 500）')
+    parser.add_argument('--rate', type=int, default=config.get('rate', 150), help='语速（50-300）')
+    parser.add_argument('--volume', type=float, default=config.get('volume', 1.0), help='音量（0.0-1.0）')
+    parser.add_argument('--voice', default=config.get('voice_id'), help='语音 ID（默认使用配置中的语音）')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='并行进程数（默认 CPU 核数）')
+    args = parser.parse_args(argv)
+
+    voice_id = args.voice
+    if not voice_id:
+        # 在主进程中确定中文语音，工作进程直接使用
+        try:
+            engine_manager.load_voices()
+            chinese_voice = voice_registry.chinese_voice()
+            voice_id = chinese_voice.id if chinese_voice else None
+        except Exception as e:
+            echo(f"获取语音列表失败：{e}")
+    from batch_render import render_files, print_report
+    stats = render_files(args.inputs, args.output, rate=args.rate, volume=args.volume,
+                         voice_id=voice_id, mode=args.mode, jobs=args.jobs, silence_ms=args.silence,
+                         silence_trim=silence_trim_options(config.get('silence_trim', {})),
+                         watchdog=config.get('engine_watchdog', {}))
+    if stats:
+        print_report(stats)
+
+def run_serve(argv):
+    """常驻合成服务：保持引擎预热，通过本机 HTTP 接口接收朗读/合成请求"""
+    config = load_config()
+    setup_console(config)
+    parser = argparse.ArgumentParser(prog='ShitTTS-CLI serve', description='启动常驻的本机合成服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认 127.0.0.1，仅本机可访问；其他地址需要设置 --token）')
+    parser.add_argument('--token', default=config.get('serve_token') or os.environ.get('SHITTTS_SERVE_TOKEN'),
+                        help='访问令牌，客户端须带上 Authorization: Bearer <令牌>（默认读取配置 serve_token 或环境变量 SHITTTS_SERVE_TOKEN）')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口（默认 8765）')
+    parser.add_argument('--queue', type=int, default=32, help='最多排队的请求数，超过时返回 503（默认 32）')
+    parser.add_argument('--rate', type=int, default=config.get('rate', 150), help='默认语速（50-300）')
+    parser.add_argument('--volume', type=float, default=config.get('volume', 1.0), help='默认音量（0.0-1.0）')
+    parser.add_argument('--voice', default=config.get('voice_id'), help='默认语音 ID')
+    args = parser.parse_args(argv)
+
+    from tts_daemon import SynthesisDaemon
+    setup_audio_cache(config.get('audio_cache_mb', DEFAULT_BUDGET_MB))
+    setup_metrics(config.get('metrics_dir'))
+    setup_silence_trim(config.get('silence_trim', {}))
+    setup_engine_watchdog(config.get('engine_watchdog', {}))
+    setup_audio_sink(config.get('audio_sink'), config.get('audio_buffer_ms', DEFAULT_BUFFER_MS))
+    try:
+        daemon = SynthesisDaemon(engine_manager, args.host, args.port, args.queue,
+                                 args.rate, args.volume, args.voice, token=args.token)
+        daemon.start()
+    except Exception as e:
+        echo(f"启动合成服务失败：{e}")
+        return
+    host, port = daemon.address
+    echo(f"合成服务已启动：http://{host}:{port}（按 Ctrl+C 退出）")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        echo("合成服务已退出")
+
+def run_client_command(argv):
+    """向正在运行的合成服务发送请求"""
+    parser = argparse.ArgumentParser(prog='ShitTTS-CLI client', description='向常驻合成服务发送请求')
+    parser.add_argument('--host', default='127.0.0.1', help='服务地址（默认 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=8765, help='服务端口（默认 8765）')
+    parser.add_argument('--token', help='访问令牌（默认读取环境变量 SHITTTS_SERVE_TOKEN）')
+    actions = parser.add_subparsers(dest='action', required=True)
+    for name, help_text in (('speak', '朗读文本'), ('render', '合成为 WAV 文件')):
+        sub = actions.add_parser(name, help=help_text)
+        sub.add_argument('text', help='要合成的文本')
+        sub.add_argument('--rate', type=int, help='语速（默认使用服务的设置）')
+        sub.add_argument('--volume', type=float, help='音量（默认使用服务的设置）')
+        sub.add_argument('--voice', dest='voice_id', help='语音 ID（默认使用服务的设置）')
+        if name == 'speak':
+            sub.add_argument('--no-wait', action='store_true', help='加入队列后立即返回')
+        else:
+            sub.add_argument('-o', '--output', default='output.wav', help='输出文件（默认 output.wav）')
+    actions.add_parser('voices', help='列出语音')
+    actions.add_parser('stop', help='停止当前朗读并丢弃排队中的朗读请求')
+    actions.add_parser('stats', help='显示请求数、每秒请求数和 p99 延迟')
+    args = parser.parse_args(argv)
+
+    from tts_daemon import run_client
+    sys.exit(run_client(args))
 
 if __name__ == "__main__":
-    main()
+    if getattr(sys, 'frozen', False):
+        # PyInstaller 打包后批量合成的工作进程需要；未打包时不导入 multiprocessing
+        import multiprocessing
+        multiprocessing.freeze_support()
+    if len(sys.argv) > 1 and sys.argv[1] == 'render':
+        run_batch(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        run_serve(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'client':
+        run_client_command(sys.argv[2:])
+    else:
+        main()
@@ -1,10 +1,25 @@
-import pyttsx3
+import time
+# 启动计时起点：用于统计从启动到窗口首次绘制的耗时
+_STARTED_AT = time.perf_counter()
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
+import os
 import threading
-import queue
-import time
-import webbrowser
+import itertools
+from audio_cache import AudioCache
+from audio_sink import create_sink
+from chunk_player import ChunkPlayer
+from console import echo, use_stderr
+from engine_watchdog import create_watchdog
+from metrics import create_recorder
+from paged_viewer import PagedViewer
+from speech_scheduler import SpeechScheduler
+from text_blocks import BlockIndex, iter_segments, load_text
+from text_model import TextBlockModel
+from tts_engine import EngineManager, stretch_rate_setting
+
+# 超过这个大小的文件建立块索引后分页显示，不再整个插入文本框
+LARGE_FILE_BYTES = 1024 * 1024
 
 class VoiceSelector:
     def __init__(self, root):
@@ -13,34 +28,83 @@ class VoiceSelector:
         self.root.geometry("600x700")  # 增加窗口高度以适应新功能
         self.root.resizable(True, True)
 
-        # 语音队列和线程控制
-        self.speech_queue = queue.Queue()
+        # 语音队列和线程控制：排队中只保留最后一次点击产生的朗读请求
+        self.speech_queue = SpeechScheduler()
         self.is_speaking = False
         self.stop_requested = False
+        # 正在朗读的请求和它是否被新的跳转请求打断（由 speech_lock 保护）
+        self.speech_lock = threading.Lock()
+        self.current_request = None
+        self.preempted = False
+        
+        # 分页显示的大文件（BlockIndex），为 None 时朗读文本框中的内容
+        self.document = None
         
         # 分块朗读相关变量
         self.text_blocks = []
         self.current_block_index = 0
         self.is_chunk_mode = False
         
-        # 初始化语音引擎
+        # 语音引擎（整个程序生命周期内复用同一个引擎）在语音线程中创建，不阻塞窗口显示
+        self.engine_manager = EngineManager(audio_cache=self.create_audio_cache(), metrics=create_recorder())
+        # 设置了环境变量 SHITTTS_TIME_STRETCH_RATE 时按该语速合成，播放时伸缩到滑块的语速
+        self.engine_manager.stretch_base_rate = stretch_rate_setting()
+        # 设置了环境变量 SHITTTS_AUDIO_SINK（device、null、stdout、file:<路径>）时，播放经过环形缓冲区交给该输出端
+        try:
+            self.engine_manager.player.set_sink(create_sink(os.environ.get('SHITTTS_AUDIO_SINK')))
+        except ValueError as e:
+            echo(e)
+        # 引擎看门狗默认启用，引擎卡住时重建，朗读队列不会卡死；环境变量 SHITTTS_ENGINE_WATCHDOG=0 时关闭
+        self.engine_manager.watchdog = create_watchdog(os.environ.get('SHITTTS_ENGINE_WATCHDOG') != '0')
+        # 分块朗读时在后台预渲染后面几块
+        self.chunk_player = ChunkPlayer(self.engine_manager)
         self.engine = None
-        self.init_engine()
-        
-        # 获取可用声音
-        self.voices = self.engine.getProperty('voices') if self.engine else []
-        if not self.voices:
-            messagebox.showwarning("警告", "未找到可用的语音")
+        self.voices = []
+        # 启动耗时：首次绘制、引擎和语音列表加载完成（从程序启动开始计算，单位秒）
+        self.startup_stats = {'first_paint_seconds': None, 'engine_ready_seconds': None}
         
         # 创建选项卡界面
         self.create_notebook()
+        self.root.bind('<Expose>', self.on_first_paint, add='+')
         
-        # 设置默认值
+        # 启动语音处理线程（先加载引擎和语音列表）
+        self.start_speech_thread()
+    
+    def on_first_paint(self, event):
+        """窗口第一次绘制时记录启动耗时"""
+        if self.startup_stats['first_paint_seconds'] is None:
+            self.startup_stats['first_paint_seconds'] = time.perf_counter() - _STARTED_AT
+            echo(f"窗口首次绘制耗时：{self.startup_stats['first_paint_seconds'] * 1000:.0f} 毫秒")
+    
+    def load_engine(self):
+        """在语音线程中创建引擎并枚举语音，完成后回到界面线程填充列表"""
+        voices = []
+        error = self.init_engine()
+        if error is None:
+            try:
+                voices = self.engine_manager.load_voices()
+            except Exception as e:
+                error = e
+        self.startup_stats['engine_ready_seconds'] = time.perf_counter() - _STARTED_AT
+        self.root.after(0, lambda: self.on_engine_ready(voices, error))
+    
+    def on_engine_ready(self, voices, error):
+        """引擎加载完成：填充音色列表和详情，启用朗读按钮"""
+        self.voices = voices
+        if error is not None:
+            messagebox.showerror("错误", f"初始化语音引擎失败: {str(error)}")
+        elif not self.voices:
+            messagebox.showwarning("警告", "未找到可用的语音")
         if self.voices:
+            self.voice_cb['values'] = [f"{voice.name} ({voice.id})" for voice in self.voices]
+            self.voice_cb.current(0)
             self.update_voice_details(0)
-        
-        # 启动语音处理线程
-        self.start_speech_thread()
+        if self.engine is not None:
+            self.speak_full_button.config(state=tk.NORMAL)
+            self.speak_chunks_button.config(state=tk.NORMAL)
+        ready = self.startup_stats['engine_ready_seconds']
+        echo(f"语音引擎加载完成：{ready * 1000:.0f} 毫秒")
+        self.status_label.config(text=f"就绪（启动耗时 {ready:.2f} 秒）")
     
     def create_notebook(self):
         """创建选项卡界面"""
@@ -68,17 +132,14 @@ class VoiceSelector:
         main_frame.pack(fill=tk.BOTH, expand=True)
         
         # 导入文件按钮
-        ttk.Button(main_frame, text="导入txt文件", command=self.import_txt_file).grid(
-            row=0, column=0, sticky=tk.W, pady=5)
+        self.import_button = ttk.Button(main_frame, text="导入txt文件", command=self.import_txt_file)
+        self.import_button.grid(row=0, column=0, sticky=tk.W, pady=5)
         
         # 声音选择
         ttk.Label(main_frame, text="选择音色:").grid(row=0, column=1, sticky=tk.W, pady=5, padx=(20, 0))
         self.voice_var = tk.StringVar()
         self.voice_cb = ttk.Combobox(main_frame, textvariable=self.voice_var, state="readonly", width=25)
         self.voice_cb.grid(row=0, column=2, sticky=(tk.W, tk.E), pady=5, padx=(5, 0))
-        if self.voices:
-            self.voice_cb['values'] = [f"{voice.name} ({voice.id})" for voice in self.voices]
-            self.voice_cb.current(0)
         self.voice_cb.bind('<<ComboboxSelected>>', self.on_voice_select)
         
         # 语音详情
@@ -129,13 +190,20 @@ class VoiceSelector:
         self.text_entry.insert("1.0", "欢迎使用ShitTTS-GUI文本转语音程序"
                                 "\n\n"
                                "使用空行进行分块")
+        # 文本块随编辑增量更新，分块朗读时不需要重新复制和分割全文
+        self.block_model = TextBlockModel(self.text_entry)
+        # 大文件只加载当前块附近的几页
+        self.viewer = PagedViewer(self.text_entry, scrollbar)
         
         # 按钮框架
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=6, column=0, columnspan=4, pady=10)
         
-        ttk.Button(button_frame, text="朗读全文", command=self.speak_full).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="分块朗读", command=self.speak_chunks).pack(side=tk.LEFT, padx=5)
+        # 引擎加载完成前禁用朗读按钮
+        self.speak_full_button = ttk.Button(button_frame, text="朗读全文", command=self.speak_full, state=tk.DISABLED)
+        self.speak_full_button.pack(side=tk.LEFT, padx=5)
+        self.speak_chunks_button = ttk.Button(button_frame, text="分块朗读", command=self.speak_chunks, state=tk.DISABLED)
+        self.speak_chunks_button.pack(side=tk.LEFT, padx=5)
         
         # 分块控制框架
         chunk_control_frame = ttk.Frame(main_frame)
@@ -155,12 +223,18 @@ class VoiceSelector:
         ttk.Button(chunk_control_frame, text="跳转", command=self.speak_specific_chunk).pack(side=tk.LEFT, padx=5)
         
         ttk.Button(button_frame, text="停止", command=self.stop).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="退出", command=self.root.quit).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="清空文本", command=self.clear_text).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="退出", command=self.quit).pack(side=tk.RIGHT, padx=5)
         
         # 状态标签
-        self.status_label = ttk.Label(main_frame, text="就绪")
+        self.status_label = ttk.Label(main_frame, text="正在加载语音引擎...")
         self.status_label.grid(row=8, column=0, columnspan=4, pady=5)
         
+        # 导入大文件时的进度条，平时隐藏
+        self.progress_bar = ttk.Progressbar(main_frame, mode='determinate', maximum=100)
+        self.progress_bar.grid(row=9, column=0, columnspan=4, sticky=(tk.W, tk.E), pady=(0, 5))
+        self.progress_bar.grid_remove()
+        
         # 配置网格权重
         main_frame.columnconfigure(2, weight=1)
         main_frame.rowconfigure(5, weight=1)
@@ -192,7 +266,7 @@ class VoiceSelector:
         ttk.Label(blog_frame, text="我的个人主页:").pack(side=tk.LEFT)
         blog_link = ttk.Label(blog_frame, text="https://gts.us.kg  ", foreground="blue", cursor="hand2")
         blog_link.pack(side=tk.LEFT, padx=(5, 0))
-        blog_link.bind("<Button-1>", lambda e: webbrowser.open_new("https://gts.us.kg  "))
+        blog_link.bind("<Button-1>", lambda e: self.open_link("https://gts.us.kg  "))
         
         # GitHub链接
         github_frame = ttk.Frame(main_frame)
@@ -201,7 +275,7 @@ class VoiceSelector:
         ttk.Label(github_frame, text="GitHub:").pack(side=tk.LEFT)
         github_link = ttk.Label(github_frame, text="https://github.com/SCeLees  ", foreground="blue", cursor="hand2")
         github_link.pack(side=tk.LEFT, padx=(5, 0))
-        github_link.bind("<Button-1>", lambda e: webbrowser.open_new("https://github.com/yourusername  "))
+        github_link.bind("<Button-1>", lambda e: self.open_link("https://github.com/yourusername  "))
 
         # 说明文本
         description = """
@@ -230,74 +304,131 @@ class VoiceSelector:
         copyright_label = ttk.Label(main_frame, text="Copyright © 2025 GTSense. Licensed under MIT.", font=("Arial", 8))
         copyright_label.pack(side=tk.BOTTOM, pady=10)
     
+    def open_link(self, url):
+        """在浏览器中打开链接（用到时才导入 webbrowser，加快启动）"""
+        import webbrowser
+        webbrowser.open_new(url)
+    
     def on_mousewheel(self, event):
         """处理鼠标滚轮事件"""
         self.text_entry.yview_scroll(int(-1*(event.delta/120)), "units")
     
     def init_engine(self):
-        """初始化语音引擎"""
+        """初始化语音引擎，失败时返回异常（由界面线程提示）"""
         try:
-            self.engine = pyttsx3.init()
-            # 设置默认属性
-            self.engine.setProperty('rate', 150)
-            self.engine.setProperty('volume', 1.0)
-            return True
+            self.engine = self.engine_manager.get_engine()
+            return None
         except Exception as e:
-            messagebox.showerror("错误", f"初始化语音引擎失败: {str(e)}")
             self.engine = None
-            return False
+            return e
     
+    def create_audio_cache(self):
+        """创建合成音频缓存，失败时直接朗读"""
+        try:
+            return AudioCache()
+        except OSError as e:
+            echo(f"创建音频缓存失败: {e}")
+            return None
+
     def start_speech_thread(self):
         """启动语音处理线程"""
         self.speech_thread = threading.Thread(target=self.speech_worker, daemon=True)
         self.speech_thread.start()
-    
+        self.root.protocol("WM_DELETE_WINDOW", self.quit)
+
+    def enqueue_speech(self, text, rate, volume, voice_id, upcoming=(), preempt=False, segmented=False):
+        """将朗读任务加入队列，并记录入队时间用于统计延迟
+
+        upcoming 为分块模式下接下来的文本块，播放当前块时在后台预渲染；
+        segmented 为 True 时（朗读全文）按句子分段朗读；
+        排队中尚未开始的请求会被这次请求替换。preempt 为 True 时（上一块、下一块、跳转）
+        还会打断正在朗读的内容，因此无论点击多快，从点击到听到目标块最多只需等待一次停止。
+        """
+        item = (text, rate, volume, voice_id, time.perf_counter(), upcoming, segmented)
+        with self.speech_lock:
+            self.speech_queue.put(item)
+            if preempt and self.current_request is not None and not self.preempted:
+                self.preempted = True
+                self.chunk_player.cancel()
+                self.engine_manager.stop()
+
     def speech_worker(self):
-        """语音处理工作线程"""
+        """语音处理工作线程：先加载引擎和语音列表，然后阻塞等待队列，队列关闭时退出"""
+        self.load_engine()
         while True:
+            item = self.speech_queue.get()
+            if item is None:
+                break
+            text, rate, volume, voice_id, enqueued_at, upcoming, segmented = item
+            with self.speech_lock:
+                self.current_request = item
+                self.preempted = False
             try:
-                if not self.speech_queue.empty():
-                    text, rate, volume, voice_id = self.speech_queue.get()
-                    
-                    # 每次都需要重新初始化引擎
-                    if not self.init_engine():
-                        continue
-                    
-                    # 设置属性
-                    self.engine.setProperty('rate', rate)
-                    self.engine.setProperty('volume', volume)
-                    if voice_id:
-                        self.engine.setProperty('voice', voice_id)
-                    
-                    # 更新界面状态
-                    self.root.after(0, lambda: self.status_label.config(text="朗读中..."))
-                    
-                    # 执行朗读
-                    self.is_speaking = True
-                    self.engine.say(text)
-                    self.engine.runAndWait()
-                    
-                    # 完成后的处理
-                    self.is_speaking = False
-                    if not self.stop_requested:
-                        self.root.after(0, lambda: self.status_label.config(text="朗读完成"))
-                        # 如果是分块模式，朗读完成后启用按钮
-                        if self.is_chunk_mode:
-                            self.root.after(0, self.enable_chunk_buttons)
-                    else:
-                        self.root.after(0, lambda: self.status_label.config(text="已停止"))
-                        self.stop_requested = False
-                    
-                    # 清理引擎
-                    self.engine = None
-                
-                time.sleep(0.1)  # 避免CPU占用过高
-                
+                # 更新界面状态
+                depth = self.speech_queue.depth
+                status = f"朗读中...（排队 {depth} 项）" if depth else "朗读中..."
+                self.root.after(0, lambda: self.status_label.config(text=status))
+
+                # 执行朗读（引擎复用，只在属性变化时重新设置）
+                self.is_speaking = True
+                if segmented:
+                    self.speak_segments(text, rate, volume, voice_id, enqueued_at)
+                else:
+                    self.chunk_player.speak(text, rate, volume, voice_id,
+                                            upcoming=upcoming, requested_at=enqueued_at)
+
+                # 完成后的处理
+                self.is_speaking = False
+                with self.speech_lock:
+                    self.current_request = None
+                    preempted = self.preempted
+                if self.stop_requested:
+                    self.root.after(0, lambda: self.status_label.config(text="已停止"))
+                    self.stop_requested = False
+                elif not preempted and self.speech_queue.empty():
+                    self.root.after(0, lambda: self.status_label.config(text="朗读完成"))
+                    # 如果是分块模式，朗读完成后更新按钮
+                    if self.is_chunk_mode:
+                        self.root.after(0, self.enable_chunk_buttons)
+
             except Exception as e:
-                print(f"语音线程错误: {e}")
+                # speak 出错时已重置引擎（卡住超时的引擎已重建），下一项会重新创建
+                echo(f"语音线程错误: {e}")
+                message = f"朗读出错：{e}"
+                self.root.after(0, lambda: self.status_label.config(text=message))
                 self.is_speaking = False
-                self.engine = None
-                time.sleep(0.1)
+                with self.speech_lock:
+                    self.current_request = None
+
+    def speak_segments(self, text, rate, volume, voice_id, enqueued_at):
+        """逐句朗读长文本：第一句合成完就开始出声，停止或被新请求打断后不再朗读下一句
+
+        启用音频缓存时，朗读当前句的同时在后台预渲染后面几句。
+        """
+        if isinstance(text, str):
+            segments = iter_segments(text)
+        else:
+            # 分页显示的大文件：逐块读取后分句
+            segments = itertools.chain.from_iterable(iter_segments(block) for block in text)
+        lookahead = list(itertools.islice(segments, self.chunk_player.prefetch_depth + 1))
+        requested_at = enqueued_at
+        while lookahead:
+            if self.stop_requested or self.preempted:
+                break
+            segment = lookahead.pop(0)
+            lookahead.extend(itertools.islice(segments, 1))
+            self.chunk_player.speak(segment, rate, volume, voice_id,
+                                    upcoming=lookahead, requested_at=requested_at)
+            requested_at = None
+
+    def quit(self):
+        """停止朗读，通知语音线程退出后关闭窗口"""
+        self.stop_requested = True
+        self.chunk_player.close()
+        self.speech_queue.close()
+        self.engine_manager.stop()
+        self.speech_thread.join(timeout=2)
+        self.root.destroy()
     
     def import_txt_file(self):
         """导入txt文件"""
@@ -308,14 +439,73 @@ class VoiceSelector:
         
         if file_path:
             try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    self.text_entry.delete("1.0", tk.END)
-                    self.text_entry.insert("1.0", content)
-                self.status_label.config(text=f"已导入文件: {file_path}")
+                if os.path.getsize(file_path) >= LARGE_FILE_BYTES:
+                    self.import_large_file(file_path)
+                    return
+                content, encoding, seconds = load_text(file_path)
+                self.close_document()
+                self.text_entry.delete("1.0", tk.END)
+                self.text_entry.insert("1.0", content)
+                self.status_label.config(
+                    text=f"已导入文件: {file_path}（编码: {encoding}，解码耗时 {seconds * 1000:.0f} 毫秒）")
             except Exception as e:
                 messagebox.showerror("错误", f"读取文件时出错: {str(e)}")
     
+    def import_large_file(self, file_path):
+        """在后台线程中建立块索引（已有索引时直接加载），完成后分页显示，导入期间界面保持响应"""
+        self.import_button.config(state=tk.DISABLED)
+        self.progress_bar.config(value=0)
+        self.progress_bar.grid()
+        self.status_label.config(text=f"正在导入: {file_path}")
+        
+        def progress(done, total):
+            self.root.after(0, lambda: self.progress_bar.config(value=done * 100 / max(total, 1)))
+        
+        def worker():
+            start = time.perf_counter()
+            try:
+                try:
+                    index = BlockIndex.open(file_path, progress=progress)
+                except UnicodeDecodeError:
+                    # 开头像 UTF-8/GBK 但后面解码失败，用兼容范围最大的 GB18030 重试
+                    index = BlockIndex.open(file_path, encoding='gb18030', progress=progress)
+            except Exception as e:
+                self.root.after(0, lambda error=e: self.on_document_ready(file_path, None, 0, error))
+                return
+            seconds = time.perf_counter() - start
+            self.root.after(0, lambda: self.on_document_ready(file_path, index, seconds, None))
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def on_document_ready(self, file_path, index, seconds, error):
+        """大文件索引建立完成（界面线程）"""
+        self.import_button.config(state=tk.NORMAL)
+        self.progress_bar.grid_remove()
+        if error is not None:
+            self.status_label.config(text="导入失败")
+            messagebox.showerror("错误", f"读取文件时出错: {str(error)}")
+            return
+        self.stop()
+        self.is_chunk_mode = False
+        self.document = index
+        self.viewer.attach(index)
+        self.status_label.config(
+            text=f"已导入文件: {file_path}（{len(index)} 块，编码: {index.encoding}，"
+                 f"耗时 {seconds:.2f} 秒，分页显示）")
+    
+    def close_document(self):
+        """退出大文件的分页显示，恢复可编辑的文本框"""
+        if self.document is not None:
+            self.stop()
+            self.is_chunk_mode = False
+            self.document = None
+            self.viewer.detach()
+    
+    def clear_text(self):
+        """清空文本框（同时关闭分页显示的大文件）"""
+        self.close_document()
+        self.text_entry.delete("1.0", tk.END)
+    
     def on_voice_select(self, event):
         index = self.voice_cb.current()
         self.update_voice_details(index)
@@ -340,25 +530,8 @@ class VoiceSelector:
     def update_volume_label(self, event):
         value = self.volume_var.get()
         self.volume_value_label.config(text=f"{value:.1f}")
-    
-    def split_text_into_blocks(self, text):
-        """将文本按空行分割成块"""
-        blocks = []
-        current_block = []
-        
-        for line in text.split('\n'):
-            if line.strip() == '':
-                if current_block:  # 如果当前块不为空
-                    blocks.append('\n'.join(current_block))
-                    current_block = []
-            else:
-                current_block.append(line)
-        
-        # 添加最后一个块（如果有）
-        if current_block:
-            blocks.append('\n'.join(current_block))
-            
-        return blocks
+        # 软件调节音量时，正在朗读的块也立即改变音量
+        self.engine_manager.set_playback_volume(value)
     
     def speak_full(self):
         """朗读全文"""
@@ -366,8 +539,11 @@ class VoiceSelector:
             messagebox.showinfo("提示", "正在朗读中，请等待完成或点击停止")
             return
         
-        text = self.text_entry.get("1.0", tk.END).strip()
-        if not text:
+        if self.document is not None:
+            text = self.document
+        else:
+            text = self.text_entry.get("1.0", tk.END).strip()
+        if not len(text):
             messagebox.showwarning("警告", "请输入要朗读的文本")
             return
         
@@ -378,7 +554,7 @@ class VoiceSelector:
         
         # 将朗读任务加入队列
         self.is_chunk_mode = False
-        self.speech_queue.put((text, self.rate_var.get(), self.volume_var.get(), voice_id))
+        self.enqueue_speech(text, self.rate_var.get(), self.volume_var.get(), voice_id, segmented=True)
         self.status_label.config(text="已加入队列")
     
     def speak_chunks(self):
@@ -387,15 +563,14 @@ class VoiceSelector:
             messagebox.showinfo("提示", "正在朗读中，请等待完成或点击停止")
             return
         
-        text = self.text_entry.get("1.0", tk.END).strip()
-        if not text:
-            messagebox.showwarning("警告", "请输入要朗读的文本")
-            return
-        
-        # 分割文本为块
-        self.text_blocks = self.split_text_into_blocks(text)
+        # 只重新分割上次之后修改过的段落；分页显示的大文件直接使用块索引，按需从磁盘读取。
+        # 分块朗读期间使用开始时的快照，之后的编辑不会改变它，当前块序号不会错位
+        if self.document is not None:
+            self.text_blocks = self.document
+        else:
+            self.text_blocks = self.block_model.snapshot()
         if not self.text_blocks:
-            messagebox.showwarning("警告", "没有找到有效的文本块")
+            messagebox.showwarning("警告", "请输入要朗读的文本")
             return
         
         self.current_block_index = 0
@@ -422,13 +597,17 @@ class VoiceSelector:
         if self.voices and self.voice_cb.current() >= 0:
             voice_id = self.voices[self.voice_cb.current()].id
         
-        # 将朗读任务加入队列
-        self.speech_queue.put((text_block, self.rate_var.get(), self.volume_var.get(), voice_id))
+        # 将朗读任务加入队列，打断正在朗读的块
+        self.enqueue_speech(text_block, self.rate_var.get(), self.volume_var.get(), voice_id,
+                            upcoming=self.chunk_player.upcoming(self.text_blocks, self.current_block_index),
+                            preempt=True)
         self.status_label.config(text=f"朗读第 {self.current_block_index + 1}/{len(self.text_blocks)} 块")
+        if self.document is not None:
+            # 加载当前块所在的页并高亮
+            self.viewer.show_block(self.current_block_index, highlight=True)
         
-        # 禁用按钮，直到当前块朗读完成
-        self.prev_chunk_button.config(state=tk.DISABLED)
-        self.next_chunk_button.config(state=tk.DISABLED)
+        # 朗读中也可以继续切换块，只按位置启用/禁用按钮
+        self.update_chunk_buttons()
     
     def speak_prev_chunk(self):
         """朗读上一块文本"""
@@ -467,35 +646,39 @@ class VoiceSelector:
         except ValueError:
             messagebox.showwarning("警告", "请输入有效的数字")
     
+    def update_chunk_buttons(self):
+        """根据当前块索引启用/禁用上一块和下一块按钮"""
+        if self.current_block_index > 0:
+            self.prev_chunk_button.config(state=tk.NORMAL)
+        else:
+            self.prev_chunk_button.config(state=tk.DISABLED)
+            
+        if self.current_block_index < len(self.text_blocks) - 1:
+            self.next_chunk_button.config(state=tk.NORMAL)
+        else:
+            self.next_chunk_button.config(state=tk.DISABLED)
+
     def enable_chunk_buttons(self):
         """启用分块控制按钮"""
         if self.is_chunk_mode and self.text_blocks:
-            # 根据当前块索引启用/禁用上一块和下一块按钮
-            if self.current_block_index > 0:
-                self.prev_chunk_button.config(state=tk.NORMAL)
-            else:
-                self.prev_chunk_button.config(state=tk.DISABLED)
-                
-            if self.current_block_index < len(self.text_blocks) - 1:
-                self.next_chunk_button.config(state=tk.NORMAL)
-            else:
-                self.next_chunk_button.config(state=tk.DISABLED)
-                
+            self.update_chunk_buttons()
             self.status_label.config(text=f"第 {self.current_block_index + 1}/{len(self.text_blocks)} 块完成")
 
     def stop(self):
-        self.stop_requested = True
-        if self.engine:
-            try:
-                self.engine.stop()
-            except:
-                pass
-        self.status_label.config(text="停止请求已发送")
+        # 先丢弃排队中的请求，再停止当前朗读
+        dropped = self.speech_queue.clear()
+        self.stop_requested = self.is_speaking
+        self.chunk_player.cancel()
+        self.engine_manager.stop()
+        self.status_label.config(text=f"停止请求已发送（丢弃 {dropped} 项排队请求）" if dropped else "停止请求已发送")
         # 停止后也禁用分块按钮
         self.prev_chunk_button.config(state=tk.DISABLED)
         self.next_chunk_button.config(state=tk.DISABLED)
 
 if __name__ == "__main__":
+    if os.environ.get('SHITTTS_AUDIO_SINK') == 'stdout':
+        # 标准输出留给音频数据，提示信息改为输出到标准错误
+        use_stderr()
     root = tk.Tk()
     app = VoiceSelector(root)
     root.mainloop()
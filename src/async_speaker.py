@@ -0,0 +1,249 @@
+import asyncio
+import itertools
+import queue
+import threading
+import time
+
+from tts_engine import EngineManager
+
+# 通过 say(text, name) 传给 pyttsx3 的名字前缀，用来在回调中认出自己的请求
+NAME_PREFIX = 'async-'
+
+_ids = itertools.count(1)
+
+
+class _Job:
+    """一个排队中的朗读/合成请求，future 属于调用方的事件循环"""
+
+    def __init__(self, kind, text, settings, path, future):
+        self.id = f"{NAME_PREFIX}{next(_ids)}"
+        self.kind = kind
+        self.text = text
+        self.settings = settings
+        self.path = path
+        self.future = future
+        self.queued_at = time.perf_counter()
+        self.started = False
+        self.finished = False
+        self.cancelled = False
+
+
+class AsyncSpeaker:
+    """asyncio 接口的朗读器：多个协程共享同一个预热好的引擎，不阻塞事件循环
+
+    所有请求按顺序交给同一个引擎线程执行（pyttsx3 引擎不是线程安全的），
+    朗读请求在 pyttsx3 的 finished-utterance 回调触发时结束对应的 future；
+    使用音频缓存直接播放、或驱动不发出回调时，在调用返回后结束。
+    合成请求在文件写完（包括裁剪首尾静音）、render() 返回后才结束。
+
+        speaker = AsyncSpeaker()
+        await speaker.speak("你好")              # True 表示完整朗读，False 表示被停止
+        await speaker.render("你好", "out.wav")
+        async for event in speaker.events():    # queued / started / word / finished / cancelled / error
+            ...
+
+    cancel() 停止当前朗读，排队中的请求被取消（等待它们的协程收到 CancelledError）。
+    """
+
+    def __init__(self, engine_manager=None, default_rate=150, default_volume=1.0, default_voice_id=None):
+        self.engine_manager = engine_manager or EngineManager()
+        self.defaults = {'rate': default_rate, 'volume': default_volume, 'voice_id': default_voice_id}
+        self.jobs = queue.Queue()
+        self._pending = {}  # id -> _Job，包括正在执行的请求
+        self._current = None
+        self._loop = None
+        self._thread = None
+        self._connected_engine = None
+        self._subscribers = []
+        self._closed = False
+
+    # ---- 协程接口 ----
+
+    async def speak(self, text, rate=None, volume=None, voice_id=None):
+        """朗读文本，返回 True 表示完整朗读，False 表示被 cancel() 停止"""
+        return await self._submit('speak', text, rate, volume, voice_id)
+
+    async def render(self, text, path, rate=None, volume=None, voice_id=None):
+        """合成到音频文件，返回文件路径"""
+        await self._submit('render', text, rate, volume, voice_id, path)
+        return path
+
+    async def warm(self, rate=None, volume=None, voice_id=None):
+        """提前创建引擎并加载语音，之后的第一次朗读不再等待初始化"""
+        await self._submit('warm', '', rate, volume, voice_id)
+
+    def cancel(self):
+        """停止当前朗读并取消所有排队中的请求，返回取消的数量"""
+        cancelled = 0
+        for job in list(self._pending.values()):
+            if job is not self._current and not job.future.done():
+                job.future.cancel()
+                cancelled += 1
+        if self._current is not None:
+            self.engine_manager.stop()
+        return cancelled
+
+    async def events(self):
+        """进度事件的异步迭代器，close() 后结束
+
+        每个事件是一个字典，包含 type 和 id，以及 text（queued/started）、
+        location / length（word）、completed（finished）、error（error）。
+        """
+        events = asyncio.Queue()
+        self._subscribers.append(events)
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            self._subscribers.remove(events)
+
+    @property
+    def queue_depth(self):
+        """尚未完成的请求数（包括正在执行的）"""
+        return len(self._pending)
+
+    async def close(self):
+        """取消所有请求并结束引擎线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self.cancel()
+        if self._thread is not None:
+            self.jobs.put(None)
+            await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+        for events in self._subscribers:
+            events.put_nowait(None)
+
+    # ---- 事件循环一侧 ----
+
+    def _submit(self, kind, text, rate, volume, voice_id, path=None):
+        if self._closed:
+            raise RuntimeError("AsyncSpeaker 已关闭")
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        elif self._loop is not loop:
+            raise RuntimeError("AsyncSpeaker 只能在一个事件循环中使用")
+        settings = (self.defaults['rate'] if rate is None else rate,
+                    self.defaults['volume'] if volume is None else volume,
+                    self.defaults['voice_id'] if voice_id is None else voice_id)
+        job = _Job(kind, text, settings, path, loop.create_future())
+        job.future.add_done_callback(lambda f: self._on_done(job))
+        self._pending[job.id] = job
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+        self.jobs.put(job)
+        if kind != 'warm':
+            self._publish({'type': 'queued', 'id': job.id, 'text': text})
+        return job.future
+
+    def _on_done(self, job):
+        self._pending.pop(job.id, None)
+        if job.future.cancelled():
+            job.cancelled = True
+            if job is self._current:
+                # 调用方取消了正在朗读的请求
+                self.engine_manager.stop()
+            self._publish({'type': 'cancelled', 'id': job.id})
+
+    def _publish(self, event):
+        for events in self._subscribers:
+            events.put_nowait(event)
+
+    # ---- 引擎线程一侧 ----
+
+    def _emit(self, event):
+        self._loop.call_soon_threadsafe(self._publish, event)
+
+    def _resolve(self, job, result=None, error=None):
+        def resolve():
+            if job.future.done():
+                return
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+        self._loop.call_soon_threadsafe(resolve)
+
+    def _connect(self):
+        """引擎被重建后重新注册回调"""
+        engine = self.engine_manager.get_engine()
+        if engine is not self._connected_engine:
+            engine.connect('started-utterance', self._on_started_utterance)
+            engine.connect('started-word', self._on_started_word)
+            engine.connect('finished-utterance', self._on_finished_utterance)
+            self._connected_engine = engine
+
+    def _job_for(self, name):
+        job = self._current
+        if job is not None and job.id == name:
+            return job
+        return None
+
+    def _started(self, job):
+        if not job.started:
+            job.started = True
+            self._emit({'type': 'started', 'id': job.id, 'text': job.text})
+
+    def _on_started_utterance(self, name=None):
+        job = self._job_for(name)
+        if job is not None:
+            self._started(job)
+
+    def _on_started_word(self, name=None, location=0, length=0):
+        job = self._job_for(name)
+        if job is not None:
+            self._emit({'type': 'word', 'id': job.id, 'location': location, 'length': length})
+
+    def _on_finished_utterance(self, name=None, completed=True):
+        job = self._job_for(name)
+        # 合成到文件时回调在 runAndWait() 中触发，之后 render() 还要裁剪静音、重写文件，
+        # 因此 render 请求只在 render() 返回后结束
+        if job is not None and job.kind != 'render':
+            self._finish(job, completed)
+
+    def _finish(self, job, completed):
+        if job.finished:
+            return
+        job.finished = True
+        self._emit({'type': 'finished', 'id': job.id, 'completed': completed})
+        self._resolve(job, completed if job.kind == 'speak' else job.path)
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            if job.cancelled or job.future.cancelled():
+                continue
+            self._current = job
+            try:
+                self._run(job)
+            except Exception as e:
+                self._emit({'type': 'error', 'id': job.id, 'error': str(e)})
+                self._resolve(job, error=e)
+            finally:
+                self._current = None
+
+    def _run(self, job):
+        rate, volume, voice_id = job.settings
+        if job.kind == 'warm':
+            self.engine_manager.acquire(rate, volume, voice_id)
+            self._connect()
+            self._resolve(job)
+            return
+        self._connect()
+        if job.kind == 'speak':
+            completed = self.engine_manager.speak(
+                job.text, rate, volume, voice_id, requested_at=job.queued_at,
+                on_rendered=lambda: self._started(job), name=job.id)
+        else:
+            self._started(job)
+            self.engine_manager.render(job.text, job.path, rate, volume, voice_id, name=job.id)
+            completed = True
+        # 使用缓存播放或驱动没有发出 finished-utterance 时在这里结束
+        self._finish(job, bool(completed) and not job.cancelled)
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+
+CACHE_DIR = 'audio_cache'
+DEFAULT_BUDGET_MB = 256
+
+
+def normalize_text(text):
+    """规范化文本：统一 Unicode 形式并合并空白，内容相同的文本得到相同的键"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def cache_key(text, voice_id, rate, volume, trim=None):
+    """根据规范化文本、语音、语速、音量和静音裁剪参数（None 表示不裁剪）计算缓存键"""
+    trim_part = '-' if trim is None else json.dumps(trim, sort_keys=True)
+    raw = f"{normalize_text(text)}\0{voice_id or ''}\0{int(rate)}\0{float(volume):.3f}\0{trim_part}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+    """按内容寻址的合成音频缓存
+
+    以规范化文本 + voice_id + rate + volume + 静音裁剪参数的哈希为键保存 save_to_file 生成的 WAV，
+    总大小超过预算时按最近最少使用（LRU）顺序淘汰。
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_BUDGET_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # key -> 文件大小，按访问顺序排列（最旧的在前）
+        self._entries = OrderedDict()
+        self.total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        # 正在合成的键 -> Event，避免前台和后台预渲染重复合成同一段文本
+        self._inflight = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """启动时扫描缓存目录，按修改时间恢复 LRU 顺序"""
+        found = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.tmp.wav'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith('.wav'):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._evict()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key + '.wav')
+
+    def get(self, key, count_miss=True):
+        """查找缓存，命中时返回文件路径并更新访问顺序"""
+        with self.lock:
+            if key not in self._entries:
+                if count_miss:
+                    self.stats['misses'] += 1
+                return None
+            path = self.path_for(key)
+            if not os.path.exists(path):
+                self.total_bytes -= self._entries.pop(key)
+                if count_miss:
+                    self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+        try:
+            # 更新修改时间，下次启动时仍能保持 LRU 顺序
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key, source_path):
+        """把已合成的文件移入缓存，返回缓存中的路径"""
+        path = self.path_for(key)
+        os.replace(source_path, path)
+        size = os.path.getsize(path)
+        with self.lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self.total_bytes += size
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep=None):
+        """超过预算时淘汰最久未使用的条目"""
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self.total_bytes -= size
+            self.stats['evictions'] += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def get_or_render(self, text, rate, volume, voice_id, render, trim=None):
+        """命中时直接返回缓存文件，否则调用 render(text, path) 合成后加入缓存
+
+        trim 为合成后裁剪首尾静音的参数（None 表示不裁剪），裁剪设置不同的音频分别缓存；
+        同一段文本正在其他线程中合成时等待其完成；合成失败或生成空文件时返回 None
+        """
+        key = cache_key(text, voice_id, rate, volume, trim)
+        while True:
+            path = self.get(key, count_miss=False)
+            if path:
+                return path
+            with self.lock:
+                event = self._inflight.get(key)
+                if event is None:
+                    self._inflight[key] = threading.Event()
+                    self.stats['misses'] += 1
+                    break
+            event.wait()
+        tmp_path = os.path.join(self.cache_dir, f"{key}.{threading.get_ident()}.tmp.wav")
+        try:
+            render(text, tmp_path)
+            if not os.path.exists(tmp_path) or os.path.getsize(tmp_path) == 0:
+                return None
+            return self.put(key, tmp_path)
+        finally:
+            self._finish(key)
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _finish(self, key):
+        """标记合成结束，唤醒等待同一键的线程"""
+        with self.lock:
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
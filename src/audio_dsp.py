@@ -0,0 +1,153 @@
+import wave
+
+from audio_sink import UnsupportedAudioFormat, wav_header
+
+# 合成音频的后处理需要 NumPy，未安装时 available() 返回 False，调用方退回原来的做法。
+# 只处理 16 位 PCM 的 WAV；其他格式（例如 macOS 的驱动生成的 AIFF）读取时抛出 UnsupportedAudioFormat（ValueError 的子类）。
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+INT16_MAX = 32767
+INT16_MIN = -32768
+
+
+def available():
+    """是否安装了 NumPy"""
+    return np is not None
+
+
+class Audio:
+    """一段 PCM 音频：samples 为 (帧数, 声道数) 的 int16 数组"""
+
+    def __init__(self, samples, framerate):
+        self.samples = samples
+        self.framerate = framerate
+
+    @property
+    def channels(self):
+        return self.samples.shape[1]
+
+    @property
+    def duration(self):
+        return len(self.samples) / float(self.framerate)
+
+    def to_wav_bytes(self):
+        return wav_header(self.framerate, self.channels, len(self.samples)) + self.samples.astype('<i2').tobytes()
+
+
+def read_wav(path):
+    """读取 16 位 PCM WAV 文件"""
+    try:
+        with wave.open(path, 'rb') as w:
+            if w.getsampwidth() != 2:
+                raise UnsupportedAudioFormat(f"不支持的采样位数：{w.getsampwidth() * 8}")
+            channels = w.getnchannels()
+            framerate = w.getframerate()
+            data = w.readframes(w.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise UnsupportedAudioFormat(f"无法解析音频文件：{e}")
+    samples = np.frombuffer(data, dtype='<i2').reshape(-1, channels)
+    return Audio(samples, framerate)
+
+
+def write_wav(path, audio):
+    with open(path, 'wb') as f:
+        f.write(audio.to_wav_bytes())
+
+
+def apply_gain(samples, gain):
+    """把 int16 样本乘以 gain，超出范围的部分截断，不会溢出回绕"""
+    if gain == 1.0:
+        return samples
+    scaled = samples.astype(np.float32) * np.float32(gain)
+    np.clip(scaled, INT16_MIN, INT16_MAX, out=scaled)
+    return scaled.astype(np.int16)
+
+
+# 首尾静音裁剪：短时能量低于 TRIM_THRESHOLD_DB（相对满幅，dBFS）视为静音，
+# 两端各保留 TRIM_GUARD_MS 毫秒，避免切掉轻声的起音和收尾
+TRIM_THRESHOLD_DB = -50.0
+TRIM_GUARD_MS = 30
+_TRIM_WINDOW_SECONDS = 0.005
+
+
+def trim_silence(audio, threshold_db=TRIM_THRESHOLD_DB, guard_ms=TRIM_GUARD_MS):
+    """去掉首尾的静音，返回 (新的 Audio, 去掉的秒数)；整段都是静音时原样返回"""
+    window = max(int(audio.framerate * _TRIM_WINDOW_SECONDS), 1)
+    count = len(audio.samples) // window
+    if count == 0:
+        return audio, 0.0
+    frames = audio.samples[:count * window].astype(np.float32).reshape(count, -1)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    loud = np.flatnonzero(rms > INT16_MAX * 10 ** (threshold_db / 20.0))
+    if len(loud) == 0:
+        return audio, 0.0
+    guard = int(audio.framerate * guard_ms / 1000.0)
+    start = max(loud[0] * window - guard, 0)
+    # 最后不足一个窗口的样本不参与判断，末尾窗口有声音时保留到结尾
+    end = len(audio.samples) if loud[-1] == count - 1 else (loud[-1] + 1) * window
+    stop = min(end + guard, len(audio.samples))
+    removed = len(audio.samples) - (stop - start)
+    if removed == 0:
+        return audio, 0.0
+    return Audio(audio.samples[start:stop], audio.framerate), removed / float(audio.framerate)
+
+
+def trim_wav_file(path, threshold_db=TRIM_THRESHOLD_DB, guard_ms=TRIM_GUARD_MS):
+    """原地裁剪 WAV 文件首尾的静音，返回去掉的秒数；不是 16 位 PCM 时抛出 UnsupportedAudioFormat"""
+    audio, removed = trim_silence(read_wav(path), threshold_db, guard_ms)
+    if removed:
+        write_wav(path, audio)
+    return removed
+
+
+# 时间伸缩（WSOLA）：帧长、搜索范围，以及允许的伸缩倍数范围（超出时音质明显下降）
+STRETCH_FRAME_SECONDS = 0.04
+STRETCH_TOLERANCE_SECONDS = 0.01
+MIN_SPEED = 0.5
+MAX_SPEED = 2.0
+# 搜索最佳拼接位置时对信号降采样的倍数
+_SEARCH_STEP = 4
+
+
+def time_stretch(audio, speed):
+    """不改变音高地把音频加快 speed 倍（speed < 1 为放慢），返回新的 Audio
+
+    使用 WSOLA：输出按半帧的固定间隔叠加汉宁窗帧，每帧在输入中的名义位置附近
+    搜索与上一帧的自然延续最相似的位置，避免相位不连续造成的杂音。
+    """
+    if speed == 1.0 or len(audio.samples) == 0:
+        return audio
+    n = max(int(audio.framerate * STRETCH_FRAME_SECONDS) // 2 * 2, 2)
+    hop = n // 2
+    tol = int(audio.framerate * STRETCH_TOLERANCE_SECONDS)
+    out_length = int(len(audio.samples) / speed)
+    count = out_length // hop + 2
+    # 两端补零，名义位置 ± tol 以及上一帧的延续都不会越界
+    pad_right = int(count * hop * speed) + n + 2 * tol + hop - len(audio.samples)
+    padded = np.pad(audio.samples.astype(np.float32), ((tol, max(pad_right, 0)), (0, 0)))
+    mono = padded.mean(axis=1)
+    positions = np.empty(count, dtype=np.int64)
+    positions[0] = tol
+    for k in range(1, count):
+        nominal = tol + int(k * hop * speed)
+        natural = positions[k - 1] + hop
+        target = mono[natural:natural + n:_SEARCH_STEP]
+        region = mono[nominal - tol:nominal + tol + n:_SEARCH_STEP]
+        corr = np.correlate(region, target, 'valid')
+        positions[k] = nominal - tol + int(np.argmax(corr)) * _SEARCH_STEP
+    # 周期汉宁窗在半帧重叠时逐点相加为 1；偶数帧之间、奇数帧之间互不重叠，可以整体拼接
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n) / n)).astype(np.float32)
+    frames = padded[positions[:, None] + np.arange(n)] * window[None, :, None]
+    channels = audio.channels
+    out = np.zeros(((count + 1) * hop, channels), dtype=np.float32)
+    even = frames[0::2].reshape(-1, channels)
+    odd = frames[1::2].reshape(-1, channels)
+    out[:len(even)] += even
+    out[hop:hop + len(odd)] += odd
+    # 第一帧的前半段没有与之重叠的帧，直接使用原始输入，避免淡入
+    out[:hop] = padded[tol:tol + hop]
+    np.clip(out, INT16_MIN, INT16_MAX, out=out)
+    return Audio(out[:out_length].astype(np.int16), audio.framerate)
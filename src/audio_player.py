@@ -0,0 +1,200 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+
+from audio_sink import STREAM_COMMANDS, DEFAULT_BUFFER_MS, BufferedOutput, DeviceSink, UnsupportedAudioFormat
+
+
+# 处理音量、语速时每次处理的时长，播放中修改增益从下一段开始生效
+CHUNK_SECONDS = 0.05
+
+
+def _find_command():
+    """查找可用的命令行播放器"""
+    if sys.platform == 'darwin':
+        candidates = [['afplay']]
+    else:
+        candidates = [['paplay'], ['aplay', '-q'], ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet']]
+    for command in candidates:
+        if shutil.which(command[0]):
+            return command
+    return None
+
+
+def _round(value):
+    return round(value, 6) if value is not None else None
+
+
+def wav_duration(path):
+    """返回 WAV 文件时长（秒），无法解析时返回 None"""
+    try:
+        with wave.open(path, 'rb') as w:
+            return w.getnframes() / float(w.getframerate())
+    except (OSError, wave.Error, EOFError, ZeroDivisionError):
+        return None
+
+
+class WavPlayer:
+    """播放已合成的音频文件，可在其他线程中调用 stop() 打断
+
+    指定 sink（见 audio_sink）时，音频经过 buffer_ms 毫秒的环形缓冲区交给该输出端，
+    不再调用命令行播放器；last_playback 为最近一次经过缓冲区播放时的输出端、断音次数和缓冲区填充量。
+    """
+
+    def __init__(self, sink=None, buffer_ms=DEFAULT_BUFFER_MS):
+        # 第一次需要播放时才查找播放器，不拖慢程序启动
+        self._command = None
+        self._resolved = sys.platform == 'win32'
+        self._process = None
+        self._stop_event = threading.Event()
+        # 软件增益：play(path, gain) 播放期间可以通过 set_gain() 修改
+        self.gain = 1.0
+        self.sink = None
+        self.output = None
+        self.last_playback = None
+        self.set_sink(sink, buffer_ms)
+
+    def set_sink(self, sink, buffer_ms=DEFAULT_BUFFER_MS):
+        """设置输出端（None 表示使用命令行播放器）和环形缓冲区的大小（毫秒）"""
+        self.sink = sink
+        self.output = BufferedOutput(sink, buffer_ms)
+
+    def _player_command(self):
+        if not self._resolved:
+            self._command = _find_command()
+            self._resolved = True
+        return self._command
+
+    def available(self):
+        """当前平台是否能直接播放音频文件"""
+        if self.sink is not None:
+            return self.sink.available()
+        return sys.platform == 'win32' or self._player_command() is not None
+
+    def play(self, path, gain=None, speed=None):
+        """阻塞播放音频文件，返回 True 表示完整播放，False 表示被停止
+
+        gain 或 speed 不为 None 时用 NumPy 处理 PCM 数据（需要 16 位 PCM 的 WAV，
+        否则抛出 UnsupportedAudioFormat）：speed 为不改变音高的加速倍数；gain 为软件增益，
+        播放器能从标准输入读取时经过环形缓冲区边处理边写入，播放中调用 set_gain() 很快生效；
+        否则先写出处理后的临时文件再播放。
+        """
+        self._stop_event.clear()
+        self.last_playback = None
+        if self.sink is not None:
+            return self._play_buffered(self.sink, path, gain, speed)
+        if gain is not None or speed is not None:
+            command = self._player_command()
+            stream_command = STREAM_COMMANDS.get(command[0]) if command else None
+            if stream_command is not None:
+                return self._play_buffered(DeviceSink(stream_command), path, gain, speed)
+            return self._play_processed_file(path, 1.0 if gain is None else gain, speed)
+        if sys.platform == 'win32':
+            return self._play_winsound(path)
+        return self._run(self._player_command() + [path])
+
+    def set_gain(self, gain):
+        """修改正在播放（以及之后播放）的音频的软件增益"""
+        self.gain = gain
+
+    def _run(self, command):
+        """运行播放器进程直到结束或被停止"""
+        self._process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while self._process.poll() is None:
+                if self._stop_event.wait(0.02):
+                    return False
+            return True
+        finally:
+            if self._process.poll() is None:
+                self._process.terminate()
+                self._process.wait()
+            self._process = None
+
+    def _play_buffered(self, sink, path, gain, speed):
+        """分段读取、处理音频，经过环形缓冲区交给输出端"""
+        self.gain = 1.0 if gain is None else gain
+        if gain is None and speed is None:
+            # 不需要处理时直接读取 PCM 数据，不依赖 NumPy
+            try:
+                with wave.open(path, 'rb') as w:
+                    if w.getsampwidth() != 2:
+                        raise UnsupportedAudioFormat(f"不支持的采样位数：{w.getsampwidth() * 8}")
+                    framerate, channels, frames = w.getframerate(), w.getnchannels(), w.getnframes()
+                    data = w.readframes(frames)
+            except (wave.Error, EOFError) as e:
+                raise UnsupportedAudioFormat(f"无法解析音频文件：{e}")
+            step = max(int(framerate * CHUNK_SECONDS), 1) * channels * 2
+            chunks = (data[pos:pos + step] for pos in range(0, len(data), step))
+        else:
+            import audio_dsp
+            audio = audio_dsp.read_wav(path)
+            if speed is not None:
+                audio = audio_dsp.time_stretch(audio, speed)
+            framerate, channels, frames = audio.framerate, audio.channels, len(audio.samples)
+            chunks = self._gained_chunks(audio)
+        self.output.sink = sink
+        completed = self.output.play(chunks, framerate, channels, frames, self._stop_event)
+        stats = self.output.stats
+        self.last_playback = {
+            'sink': sink.name,
+            'underruns': stats['last_underruns'],
+            'min_fill': _round(stats['last_min_fill_seconds']),
+            'avg_fill': _round(stats['last_avg_fill_seconds']),
+        }
+        return completed
+
+    def _gained_chunks(self, audio):
+        """按 CHUNK_SECONDS 分段输出 PCM 数据，每段使用当前的增益"""
+        import audio_dsp
+        step = max(int(audio.framerate * CHUNK_SECONDS), 1)
+        for pos in range(0, len(audio.samples), step):
+            yield audio_dsp.apply_gain(audio.samples[pos:pos + step], self.gain).astype('<i2').tobytes()
+
+    def _play_processed_file(self, path, gain, speed):
+        """播放器不能从标准输入读取（afplay、winsound）：写出处理后的临时文件再播放"""
+        import audio_dsp
+        import tempfile
+        audio = audio_dsp.read_wav(path)
+        if speed is not None:
+            audio = audio_dsp.time_stretch(audio, speed)
+        self.gain = gain
+        fd, tmp_path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            audio_dsp.write_wav(tmp_path, audio_dsp.Audio(audio_dsp.apply_gain(audio.samples, gain), audio.framerate))
+            if sys.platform == 'win32':
+                return self._play_winsound(tmp_path)
+            return self._run(self._player_command() + [tmp_path])
+        finally:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _play_winsound(self, path):
+        import winsound
+        duration = wav_duration(path)
+        if duration is None:
+            winsound.PlaySound(path, winsound.SND_FILENAME)
+            return True
+        winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+        deadline = time.perf_counter() + duration
+        completed = False
+        try:
+            while time.perf_counter() < deadline:
+                if self._stop_event.wait(0.02):
+                    return False
+            completed = True
+            return True
+        finally:
+            if not completed:
+                winsound.PlaySound(None, 0)
+
+    def stop(self):
+        """停止当前播放"""
+        self._stop_event.set()
@@ -0,0 +1,350 @@
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+# 环形缓冲区默认能容纳的音频时长；越大越不容易断音，但音量变化和停止前已写入的部分越长
+DEFAULT_BUFFER_MS = 200
+# 消费线程每次交给输出端的时长
+PERIOD_SECONDS = 0.02
+
+# 能从标准输入读取 WAV 数据的播放器
+STREAM_COMMANDS = {
+    'aplay': ['aplay', '-q', '-'],
+    'paplay': ['paplay'],
+    'ffplay': ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet', '-'],
+}
+
+
+class UnsupportedAudioFormat(ValueError):
+    """音频文件不是 16 位 PCM 的 WAV（例如 macOS 的驱动生成的 AIFF），无法用软件处理或经过缓冲区播放"""
+
+
+def wav_header(framerate, channels, frames):
+    """16 位 PCM WAV 文件头"""
+    data_size = frames * channels * 2
+    return struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + data_size, b'WAVE', b'fmt ', 16, 1,
+                       channels, framerate, framerate * channels * 2, channels * 2, 16, b'data', data_size)
+
+
+class RingBuffer:
+    """固定大小的字节环形缓冲区：write() 在缓冲区满时阻塞，read() 不阻塞"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def fill(self):
+        return self._size
+
+    def write(self, data, stop_event=None):
+        """写入全部数据，缓冲区满时等待；stop_event 被设置时返回 False"""
+        view = memoryview(data)
+        while view:
+            with self._cond:
+                while self._size == self.capacity:
+                    if stop_event is not None and stop_event.is_set():
+                        return False
+                    self._cond.wait(0.02)
+                count = min(len(view), self.capacity - self._size)
+                end = (self._start + self._size) % self.capacity
+                first = min(count, self.capacity - end)
+                self._data[end:end + first] = view[:first]
+                self._data[:count - first] = view[first:count]
+                self._size += count
+                self._cond.notify_all()
+            view = view[count:]
+        return stop_event is None or not stop_event.is_set()
+
+    def wait_fill(self, count, timeout):
+        """等待缓冲区中至少有 count 个字节或生产者已写完，超时返回 False"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._size >= count or self.closed, timeout)
+
+    def read(self, count):
+        """读取最多 count 个字节，缓冲区为空时返回 b''"""
+        with self._cond:
+            count = min(count, self._size)
+            first = min(count, self.capacity - self._start)
+            data = bytes(self._data[self._start:self._start + first]) + bytes(self._data[:count - first])
+            self._start = (self._start + count) % self.capacity
+            self._size -= count
+            self._cond.notify_all()
+            return data
+
+    def close(self):
+        """生产者写完，消费者读完剩余数据后结束"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class AudioSink:
+    """音频输出端：接收 16 位 PCM 数据
+
+    pace 为消费速度相对实时的倍数：1.0 表示像声卡一样按实时速度消费，
+    None 表示尽快写出（文件、管道），此时不会断音；lead 为按实时速度消费时
+    最多提前送出的时长（秒）。
+    """
+    name = 'sink'
+    pace = None
+    lead = PERIOD_SECONDS
+
+    def available(self):
+        return True
+
+    def open(self, framerate, channels, frames):
+        """开始一段音频，frames 为总帧数"""
+
+    def write(self, data):
+        pass
+
+    def finish(self, stop_event):
+        """数据全部写入后调用，等待输出完成；期间 stop_event 被设置时返回 False"""
+        return True
+
+    def abort(self):
+        """被停止时调用，丢弃尚未输出的数据"""
+
+
+class DeviceSink(AudioSink):
+    """默认声音设备：把 WAV 数据写入 aplay / paplay / ffplay 的标准输入"""
+    name = 'device'
+    pace = 1.0
+    # 播放器自身也有缓冲区，收到足够的数据才开始出声，提前送出一些避免首音变慢
+    lead = 0.5
+
+    def __init__(self, command=None):
+        self.command = command
+        self._process = None
+
+    def available(self):
+        if self.command is None:
+            for name, command in STREAM_COMMANDS.items():
+                if shutil.which(name):
+                    self.command = command
+                    break
+        return self.command is not None
+
+    def open(self, framerate, channels, frames):
+        if not self.available():
+            raise OSError("没有找到能从标准输入播放音频的播放器（aplay、paplay 或 ffplay）")
+        self._process = subprocess.Popen(self.command, stdin=subprocess.PIPE,
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._process.stdin.write(wav_header(framerate, channels, frames))
+
+    def write(self, data):
+        self._process.stdin.write(data)
+
+    def finish(self, stop_event):
+        try:
+            self._process.stdin.close()
+            while self._process.poll() is None:
+                if stop_event.wait(0.02):
+                    return False
+            return True
+        finally:
+            self.abort()
+
+    def abort(self):
+        process = self._process
+        self._process = None
+        if process is not None and process.poll() is None:
+            process.terminate()
+            process.wait()
+
+
+class FileSink(AudioSink):
+    """把播放的音频依次追加到一个 WAV 文件，每段结束后更新文件头，文件随时可以打开"""
+    name = 'file'
+
+    def __init__(self, path):
+        self.path = path
+        self._format = None
+        self._file = None
+
+    def open(self, framerate, channels, frames):
+        if self._format is None:
+            # 第一次写入时覆盖旧文件
+            with open(self.path, 'wb') as f:
+                f.write(wav_header(framerate, channels, 0))
+            self._format = (framerate, channels)
+        elif self._format != (framerate, channels):
+            raise ValueError(f"音频格式 {(framerate, channels)} 与文件中已有的 {self._format} 不一致")
+        self._file = open(self.path, 'r+b')
+        self._file.seek(0, os.SEEK_END)
+
+    def write(self, data):
+        self._file.write(data)
+
+    def finish(self, stop_event):
+        self.abort()
+        return True
+
+    def abort(self):
+        # 被停止时保留已经写入的部分
+        f = self._file
+        self._file = None
+        if f is None:
+            return
+        with f:
+            data_size = f.tell() - 44
+            f.seek(0)
+            f.write(wav_header(self._format[0], self._format[1], data_size // (2 * self._format[1])))
+
+
+class StdoutSink(AudioSink):
+    """把原始 PCM（16 位小端）写到标准输出，可以用管道交给其他程序，例如 aplay -f S16_LE -r 采样率"""
+    name = 'stdout'
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdout.buffer
+
+    def write(self, data):
+        self.stream.write(data)
+
+    def finish(self, stop_event):
+        self.stream.flush()
+        return True
+
+    def abort(self):
+        self.stream.flush()
+
+
+class NullSink(AudioSink):
+    """丢弃音频，用于压力测试；pace 为按实时速度的几倍消费（None 表示不限速）"""
+    name = 'null'
+
+    def __init__(self, pace=1.0):
+        self.pace = pace
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+
+
+def create_sink(spec):
+    """按配置创建输出端：device、null、stdout、file:<路径>；spec 为空时返回 None（使用默认播放方式）
+
+    未知的配置或 device 没有可用的播放器时抛出 ValueError
+    """
+    if not spec:
+        return None
+    if spec == 'device':
+        sink = DeviceSink()
+        if not sink.available():
+            # Windows 和 macOS 的默认播放方式（winsound、afplay）不能从标准输入读取
+            raise ValueError("音频输出 device 需要能从标准输入播放音频的播放器（aplay、paplay 或 ffplay），"
+                             "当前系统没有找到")
+        return sink
+    if spec == 'null':
+        return NullSink()
+    if spec == 'stdout':
+        return StdoutSink()
+    if spec.startswith('file:') and len(spec) > 5:
+        return FileSink(spec[5:])
+    raise ValueError(f"未知的音频输出：{spec}（可选 device、null、stdout、file:<路径>）")
+
+
+class BufferedOutput:
+    """经过环形缓冲区把 PCM 数据交给输出端
+
+    调用方（生产者）把数据写入缓冲区，缓冲区满时阻塞；消费线程按输出端的 pace
+    每 PERIOD_SECONDS 取出一段交给输出端。需要数据时缓冲区为空记为一次断音（underrun）。
+    stats 记录累计断音次数，以及最近一段音频播放期间缓冲区的最低和平均填充量（秒）。
+    """
+
+    def __init__(self, sink, buffer_ms=DEFAULT_BUFFER_MS):
+        self.sink = sink
+        self.buffer_ms = buffer_ms
+        self.stats = {
+            'underruns': 0,
+            'last_underruns': 0,
+            'last_min_fill_seconds': None,
+            'last_avg_fill_seconds': None,
+        }
+
+    def play(self, chunks, framerate, channels, frames, stop_event):
+        """播放 chunks 产生的 PCM 数据，返回 True 表示完整播放，False 表示被停止"""
+        frame_size = channels * 2
+        bytes_per_second = framerate * frame_size
+        capacity = max(int(bytes_per_second * self.buffer_ms / 1000) // frame_size, 1) * frame_size
+        ring = RingBuffer(capacity)
+        self.sink.open(framerate, channels, frames)
+        result = {'error': None}
+        consumer = threading.Thread(target=self._consume, args=(ring, bytes_per_second, frame_size, stop_event, result),
+                                    daemon=True)
+        consumer.start()
+        completed = False
+        try:
+            for chunk in chunks:
+                if result['error'] is not None or not ring.write(chunk, stop_event):
+                    break
+            else:
+                completed = True
+        finally:
+            ring.close()
+            consumer.join()
+        if result['error'] is not None:
+            self.sink.abort()
+            raise result['error']
+        if not completed or stop_event.is_set():
+            self.sink.abort()
+            return False
+        return self.sink.finish(stop_event)
+
+    def _consume(self, ring, bytes_per_second, frame_size, stop_event, result):
+        period = max(int(bytes_per_second * PERIOD_SECONDS) // frame_size, 1) * frame_size
+        pace = self.sink.pace
+        # 开始前先等缓冲区写满（或数据已经全部写入），避免一开始就断音
+        while not ring.wait_fill(ring.capacity, 0.02) and not stop_event.is_set():
+            pass
+        start = time.perf_counter()
+        sent = 0
+        underruns = 0
+        starved = False
+        fills = []
+        try:
+            while not stop_event.is_set():
+                # 输出端已经收到、还没有播放的时长
+                ahead = sent / (bytes_per_second * pace) - (time.perf_counter() - start) if pace else 0.0
+                if pace:
+                    # 按输出端的时钟送出数据，最多比实际播放提前 lead 秒
+                    if ahead > self.sink.lead:
+                        if stop_event.wait(ahead - self.sink.lead):
+                            break
+                        continue
+                    if not ring.closed:
+                        fills.append(ring.fill() / float(bytes_per_second))
+                data = ring.read(period)
+                if not data:
+                    if ring.closed:
+                        break
+                    # 输出端已经播放完收到的数据而缓冲区仍然为空：断音
+                    if pace and ahead <= 0 and not starved:
+                        underruns += 1
+                        starved = True
+                    ring.wait_fill(1, min(max(ahead, 0.001), 0.02) if pace else 0.02)
+                    continue
+                if starved:
+                    # 断音之后输出端从现在重新开始计时
+                    start = time.perf_counter() - sent / (bytes_per_second * pace)
+                    starved = False
+                self.sink.write(data)
+                sent += len(data)
+        except Exception as e:
+            # 输出端出错（例如播放器退出）：设置停止事件，让阻塞在缓冲区上的生产者返回
+            result['error'] = e
+            stop_event.set()
+        finally:
+            self.stats['underruns'] += underruns
+            self.stats['last_underruns'] = underruns
+            self.stats['last_min_fill_seconds'] = min(fills) if fills else None
+            self.stats['last_avg_fill_seconds'] = sum(fills) / len(fills) if fills else None
@@ -0,0 +1,191 @@
+import glob
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from audio_player import wav_duration
+from console import echo
+from text_blocks import iter_file_blocks
+from wav_export import block_label, concat_wavs
+
+# 每个工作进程各自持有一个引擎
+_worker_manager = None
+_worker_settings = None
+
+
+def _init_worker(rate, volume, voice_id, silence_trim=None, watchdog=True):
+    """工作进程初始化：创建本进程专用的引擎"""
+    global _worker_manager, _worker_settings
+    from engine_watchdog import create_watchdog
+    from tts_engine import EngineManager
+    _worker_manager = EngineManager()
+    _worker_manager.silence_trim = silence_trim
+    _worker_manager.watchdog = create_watchdog(watchdog)
+    _worker_settings = (rate, volume, voice_id)
+
+
+def _render_one(text, out_path):
+    """在工作进程中把一段文本合成到 WAV 文件，返回 (路径, 时长秒数, 错误信息, 裁掉的静音秒数)"""
+    rate, volume, voice_id = _worker_settings
+    tmp_path = out_path + '.part.wav'
+    try:
+        _worker_manager.render(text, tmp_path, rate, volume, voice_id)
+        os.replace(tmp_path, out_path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return out_path, 0.0, str(e), 0.0
+    return out_path, wav_duration(out_path) or 0.0, None, _worker_manager.stats['last_trimmed_seconds'] or 0.0
+
+
+def expand_inputs(patterns):
+    """展开文件路径和通配符，去重并排序，保证输出顺序确定"""
+    files = []
+    seen = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern) if glob.has_magic(pattern) else [pattern]
+        for path in sorted(matches):
+            abs_path = os.path.abspath(path)
+            if abs_path not in seen and os.path.isfile(path):
+                seen.add(abs_path)
+                files.append(path)
+    return files
+
+
+def read_blocks(file_path):
+    """按 CLI 相同的规则（空行分块，自动识别编码，解码失败时用 GB18030）读取文件"""
+    try:
+        return list(iter_file_blocks(file_path))
+    except UnicodeDecodeError:
+        return list(iter_file_blocks(file_path, encoding='gb18030'))
+
+
+def _output_names(files):
+    """为每个输入文件分配输出名，同名文件依次加后缀"""
+    names = []
+    used = {}
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        used[stem] = used.get(stem, 0) + 1
+        names.append(stem if used[stem] == 1 else f"{stem}_{used[stem]}")
+    return names
+
+
+def _document_name(doc_dir):
+    """由块文件所在目录得到文档名（document 模式的临时目录为 .<文件名>.blocks）"""
+    name = os.path.basename(doc_dir)
+    if name.startswith('.') and name.endswith('.blocks'):
+        return name[1:-len('.blocks')]
+    return name
+
+
+def plan_jobs(files, output_dir, mode='block', documents=None):
+    """生成每块的 (文本, 输出路径) 任务
+
+    block 模式下块文件直接写到 输出目录/<文件名>/；document 模式下写到临时目录，
+    并把每个文档的块文件和章节标签追加到 documents，合成结束后再拼接为一个文件。
+    """
+    for path, name in zip(files, _output_names(files)):
+        try:
+            blocks = read_blocks(path)
+        except (OSError, UnicodeDecodeError) as e:
+            echo(f"读取文件 '{path}' 出错：{e}")
+            continue
+        if not blocks:
+            echo(f"文件 '{path}' 中没有文本块，已跳过")
+            continue
+        if mode == 'document':
+            doc_dir = os.path.join(output_dir, f".{name}.blocks")
+        else:
+            doc_dir = os.path.join(output_dir, name)
+        os.makedirs(doc_dir, exist_ok=True)
+        width = max(4, len(str(len(blocks))))
+        block_paths = []
+        labels = []
+        for i, block in enumerate(blocks):
+            block_path = os.path.join(doc_dir, f"{name}_{i + 1:0{width}d}.wav")
+            block_paths.append(block_path)
+            labels.append(block_label(i, len(blocks), block))
+            yield block, block_path
+        if documents is not None:
+            documents.append((os.path.join(output_dir, f"{name}.wav"), doc_dir, block_paths, labels))
+
+
+def stitch_documents(documents, silence_ms=500):
+    """把每个文档的块文件拼接为一个带章节标记的 WAV，并删除临时块文件"""
+    for out_path, doc_dir, block_paths, labels in documents:
+        present = [(p, label) for p, label in zip(block_paths, labels) if os.path.exists(p)]
+        try:
+            if present:
+                concat_wavs([p for p, _ in present], out_path, silence_ms=silence_ms,
+                            labels=[label for _, label in present])
+            if len(present) < len(block_paths):
+                echo(f"'{out_path}' 缺少 {len(block_paths) - len(present)} 块（合成失败）")
+        except Exception as e:
+            echo(f"拼接 '{out_path}' 出错：{e}")
+        finally:
+            shutil.rmtree(doc_dir, ignore_errors=True)
+
+
+def render_files(patterns, output_dir, rate=150, volume=1.0, voice_id=None, mode='block', jobs=None,
+                 silence_ms=500, silence_trim=None, watchdog=True):
+    """把多个文本文件批量合成为 WAV，返回统计信息字典
+
+    silence_trim 为裁剪每块首尾静音的参数（见 EngineManager.silence_trim），在拼接之前裁剪；None 表示不裁剪；
+    watchdog 为工作进程中引擎看门狗的参数（见 engine_watchdog.create_watchdog，默认启用，false 关闭），某块合成卡住时重建引擎，
+    重试后仍超时的块计为失败
+    """
+    files = expand_inputs(patterns)
+    if not files:
+        echo("没有找到要合成的文件")
+        return None
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+    stats = {'files': len(files), 'blocks': 0, 'failed': 0, 'audio_seconds': 0.0, 'wall_seconds': 0.0,
+             'trimmed_seconds': 0.0, 'trimmed_by_document': {}}
+    documents = [] if mode == 'document' else None
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(rate, volume, voice_id, silence_trim, watchdog)) as pool:
+        pending = set()
+        # 限制同时提交的任务数，避免把所有文本一次性放进内存
+        for text, out_path in plan_jobs(files, output_dir, mode, documents):
+            pending.add(pool.submit(_render_one, text, out_path))
+            if len(pending) >= jobs * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _collect(done, stats)
+        done, _ = wait(pending)
+        _collect(done, stats)
+    if documents:
+        stitch_documents(documents, silence_ms)
+    stats['wall_seconds'] = time.perf_counter() - start
+    return stats
+
+
+def _collect(futures, stats):
+    for future in futures:
+        out_path, seconds, error, trimmed = future.result()
+        if error:
+            stats['failed'] += 1
+            echo(f"合成 '{out_path}' 出错：{error}")
+        else:
+            stats['blocks'] += 1
+            stats['audio_seconds'] += seconds
+            stats['trimmed_seconds'] += trimmed
+            # 同一文档的块文件在同一个目录中
+            document = _document_name(os.path.dirname(out_path))
+            stats['trimmed_by_document'][document] = stats['trimmed_by_document'].get(document, 0.0) + trimmed
+
+
+def print_report(stats):
+    """输出吞吐量：每秒块数和实时倍率（音频时长 / 实际耗时）"""
+    wall = stats['wall_seconds'] or 1e-9
+    echo(f"文件数：{stats['files']}，成功：{stats['blocks']}，失败：{stats['failed']}")
+    echo(f"音频总时长：{stats['audio_seconds']:.1f} 秒，耗时：{stats['wall_seconds']:.1f} 秒")
+    echo(f"吞吐量：{stats['blocks'] / wall:.2f} 块/秒，实时倍率：{stats['audio_seconds'] / wall:.2f}x")
+    if stats['trimmed_seconds'] > 0:
+        echo(f"去除首尾静音：共 {stats['trimmed_seconds']:.1f} 秒，"
+              f"平均每块 {stats['trimmed_seconds'] * 1000 / max(stats['blocks'], 1):.0f} 毫秒")
+        for document, seconds in sorted(stats['trimmed_by_document'].items()):
+            echo(f"  {document}：{seconds * 1000:.0f} 毫秒")
@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+from collections import deque
+
+from console import echo
+
+DEFAULT_PREFETCH_DEPTH = 2
+
+
+class ChunkPlayer:
+    """分块朗读的预渲染播放器
+
+    播放第 N 块的同时，在后台线程中把后面 prefetch_depth 块合成到音频缓存，
+    前进到下一块时直接播放缓存，几乎没有间隔；后台线程只负责排队和等待，合成通过
+    engine_manager.render_cached 交给引擎的引擎线程执行，不会在第二个线程中调用引擎；回退或跳转时调用 cancel()
+    丢弃已不需要的预渲染任务。没有音频缓存时退化为普通的逐块朗读。
+    """
+
+    def __init__(self, engine_manager, prefetch_depth=DEFAULT_PREFETCH_DEPTH):
+        self.engine_manager = engine_manager
+        self.prefetch_depth = prefetch_depth
+        self._jobs = queue.Queue()
+        self._generation = 0
+        self._thread = None
+        self._last_end = None
+        # 最近若干次块间间隔（上一块播放结束到下一块开始出声），单位秒
+        self.gaps = deque(maxlen=100)
+        self.stats = {
+            'prefetched': 0,
+            'cancelled': 0,
+            'last_gap_seconds': None,
+            'last_start_delay_seconds': None,
+        }
+
+    def enabled(self):
+        return self.prefetch_depth > 0 and self.engine_manager.can_cache()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+
+    def _worker(self):
+        """后台预渲染线程：依次把合成请求交给引擎线程并等待完成"""
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            generation, text, rate, volume, voice_id = job
+            if generation != self._generation:
+                self.stats['cancelled'] += 1
+                continue
+            try:
+                self.engine_manager.render_cached(text, self.engine_manager.cache_rate(rate),
+                                                  self.engine_manager.cache_volume(volume), voice_id)
+                self.stats['prefetched'] += 1
+            except Exception as e:
+                echo(f"预渲染出错：{e}")
+
+    def prefetch(self, texts, rate, volume, voice_id):
+        """安排后台合成接下来的若干块"""
+        if not self.enabled():
+            return
+        self._ensure_thread()
+        generation = self._generation
+        for text in list(texts)[:self.prefetch_depth]:
+            self._jobs.put((generation, text, rate, volume, voice_id))
+
+    def cancel(self):
+        """取消尚未开始的预渲染任务（正在合成的一块会继续完成并进入缓存）"""
+        self._generation += 1
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._jobs.put(None)
+                break
+            self.stats['cancelled'] += 1
+
+    def speak(self, text, rate, volume, voice_id, upcoming=(), requested_at=None):
+        """朗读当前块，开始播放前安排 upcoming 中后续块的预渲染"""
+        if requested_at is None:
+            requested_at = time.perf_counter()
+        self.cancel()
+        self.engine_manager.speak(
+            text, rate, volume, voice_id, requested_at=requested_at,
+            on_rendered=lambda: self.prefetch(upcoming, rate, volume, voice_id))
+        delay = self.engine_manager.stats['last_first_audio_seconds']
+        if delay is not None:
+            self.stats['last_start_delay_seconds'] = delay
+            if self._last_end is not None:
+                gap = requested_at + delay - self._last_end
+                self.stats['last_gap_seconds'] = gap
+                self.gaps.append(gap)
+        self._last_end = time.perf_counter()
+
+    def upcoming(self, blocks, index):
+        """返回第 index 块之后需要预渲染的文本块"""
+        end = min(len(blocks), index + 1 + self.prefetch_depth)
+        return [blocks[i] for i in range(index + 1, end)]
+
+    def close(self):
+        """取消所有任务并结束后台线程"""
+        self.cancel()
+        if self._thread is not None:
+            self._jobs.put(None)
@@ -0,0 +1,27 @@
+import sys
+
+# 提示信息的输出流，None 表示标准输出；音频数据写到标准输出时（stdout 输出端）在启动时改为标准错误
+_stream = None
+
+
+def use_stderr():
+    """提示信息改为输出到标准错误，需要在输出任何提示之前调用"""
+    global _stream
+    _stream = sys.stderr
+
+
+def stream():
+    """当前提示信息的输出流"""
+    return _stream or sys.stdout
+
+
+def echo(*args, **kwargs):
+    """输出提示信息，用法与 print 相同"""
+    kwargs.setdefault('file', stream())
+    print(*args, **kwargs)
+
+
+def prompt(text):
+    """在提示信息的输出流上显示提示符，读取一行输入"""
+    echo(text, end='', flush=True)
+    return input()
@@ -0,0 +1,207 @@
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+from console import echo
+
+# 每次 runAndWait() 的期限 = BASE_SECONDS + FACTOR × 预计时长；
+# 预计时长按每分钟朗读 rate 个字估算，比实际语音慢，留出余量
+BASE_SECONDS = 10.0
+FACTOR = 2.0
+# 收到停止请求后驱动仍未返回时，最多再等待的时间，超过即视为卡住
+STOP_GRACE_SECONDS = 2.0
+# 引擎卡住并重建后，同一项最多重试的次数
+RETRIES = 1
+# 计算尾部延迟时保留的最近 runAndWait() 耗时个数
+LATENCY_WINDOW = 1000
+
+
+class EngineTimeout(Exception):
+    """引擎线程超过期限仍未返回，该线程及其中的引擎已被放弃"""
+
+
+def _percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class EngineThread:
+    """长期存在的引擎线程：依次执行提交的任务，收到 None 后退出
+
+    SAPI5（COM 单线程套间）和 NSSpeechSynthesizer 要求引擎在同一个线程中创建和使用，
+    EngineManager 把所有引擎调用都交给一个引擎线程执行；不启用看门狗时调用方一直等到任务完成。
+    """
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self._loop, daemon=True, name='engine-thread')
+        self.thread.start()
+
+    def current(self):
+        """当前线程是否为本引擎线程"""
+        return self.thread is threading.current_thread()
+
+    def submit(self, func):
+        """把 func 排入引擎线程，返回 (完成事件, 结果字典)；结果字典中为 result 或 error"""
+        done = threading.Event()
+        outcome = {}
+        self.jobs.put((func, done, outcome))
+        return done, outcome
+
+    def call(self, func):
+        """在引擎线程中调用 func() 并等待完成，返回其结果或抛出其异常；已经在引擎线程中时直接调用"""
+        if self.current():
+            return func()
+        done, outcome = self.submit(func)
+        done.wait()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome.get('result')
+
+    def _loop(self):
+        if sys.platform == 'win32':
+            # SAPI5 驱动通过 COM 调用，引擎要在初始化了 COM 的同一个线程中创建和使用
+            try:
+                import comtypes
+                comtypes.CoInitialize()
+            except Exception:
+                pass
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            func, done, outcome = job
+            try:
+                outcome['result'] = func()
+            except BaseException as e:
+                outcome['error'] = e
+            finally:
+                done.set()
+
+
+class EngineWatchdog:
+    """在长期存在的引擎线程中创建和使用引擎，runAndWait() 超过按文本长度和语速计算的期限时抛出 EngineTimeout
+
+    引擎的创建、属性设置、排入命令和 runAndWait() 都通过 call() / run() 交给引擎线程（EngineThread）执行，
+    调用方线程只等待到期限为止。超时后放弃卡住的引擎线程（执行完手上的任务即退出），
+    之后的调用在新的引擎线程中执行，由 EngineManager 在新线程中创建新的引擎。
+    stats 记录执行次数、超时次数、引擎重建次数、重试次数和最终失败次数；
+    summary() 给出最近 runAndWait() 耗时的 p50/p95/p99。
+    """
+
+    def __init__(self, base_seconds=BASE_SECONDS, factor=FACTOR, retries=RETRIES):
+        self.base_seconds = base_seconds
+        self.factor = factor
+        self.retries = retries
+        self.lock = threading.Lock()
+        self._engine_thread = None
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {
+            'runs': 0,
+            'timeouts': 0,
+            'restarts': 0,
+            'retries': 0,
+            'failures': 0,
+            'max_seconds': 0.0,
+        }
+
+    def deadline(self, text, rate):
+        """朗读/合成 text 允许的最长时间（秒）"""
+        expected = len(text) * 60.0 / max(rate or 0, 1)
+        return self.base_seconds + self.factor * expected
+
+    def on_engine_thread(self):
+        """当前线程是否为引擎线程"""
+        worker = self._engine_thread
+        return worker is not None and worker.current()
+
+    def call(self, func, timeout=None, stopped=None):
+        """在引擎线程中调用 func()，返回其结果或抛出其异常；timeout 秒（默认 base_seconds）内没有返回时抛出 EngineTimeout
+
+        stopped() 返回 True（调用方已请求停止）后最多再等待 STOP_GRACE_SECONDS 秒；
+        已经在引擎线程中时直接调用
+        """
+        if self.on_engine_thread():
+            return func()
+        start = time.perf_counter()
+        finished, outcome = self._submit(func, self.base_seconds if timeout is None else timeout, stopped)
+        if not finished:
+            with self.lock:
+                self.stats['timeouts'] += 1
+            raise EngineTimeout(f"引擎 {time.perf_counter() - start:.1f} 秒内没有响应")
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome.get('result')
+
+    def run(self, func, timeout, stopped=None):
+        """与 call() 相同，并把耗时计入 runAndWait() 的统计"""
+        start = time.perf_counter()
+        finished, outcome = self._submit(func, timeout, stopped)
+        self._observe(time.perf_counter() - start, finished)
+        if not finished:
+            raise EngineTimeout(f"引擎 {time.perf_counter() - start:.1f} 秒内没有响应")
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome.get('result')
+
+    def _submit(self, func, timeout, stopped):
+        with self.lock:
+            if self._engine_thread is None:
+                self._engine_thread = EngineThread()
+            worker = self._engine_thread
+        start = time.perf_counter()
+        done, outcome = worker.submit(func)
+        deadline = start + timeout
+        finished = False
+        while not finished:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            finished = done.wait(min(remaining, 0.05) if stopped is not None else remaining)
+            if not finished and stopped is not None and stopped():
+                deadline = min(deadline, time.perf_counter() + STOP_GRACE_SECONDS)
+                stopped = None
+        if not finished:
+            self._abandon(worker)
+        return finished, outcome
+
+    def _abandon(self, worker):
+        """放弃卡住的引擎线程：卡住的任务返回后线程即退出，之后的调用在新的引擎线程中执行"""
+        with self.lock:
+            if self._engine_thread is worker:
+                self._engine_thread = None
+        worker.jobs.put(None)
+
+    def _observe(self, seconds, finished):
+        with self.lock:
+            self.stats['runs'] += 1
+            if not finished:
+                self.stats['timeouts'] += 1
+            self.stats['max_seconds'] = max(self.stats['max_seconds'], seconds)
+            self._latencies.append(seconds)
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def summary(self):
+        """累计计数，以及最近 LATENCY_WINDOW 次 runAndWait() 耗时的 p50/p95/p99（毫秒）"""
+        with self.lock:
+            result = dict(self.stats)
+            recent = sorted(self._latencies)
+        result['max_seconds'] = round(result['max_seconds'], 6)
+        for name, q in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            result[name] = round(_percentile(recent, q) * 1000, 2) if recent else None
+        return result
+
+
+def create_watchdog(options=True):
+    """按配置创建看门狗：参数字典（base_seconds、factor、retries）、true 或 null（未设置）使用默认参数，false 关闭（返回 None）"""
+    if options is False:
+        return None
+    try:
+        return EngineWatchdog(**options) if isinstance(options, dict) else EngineWatchdog()
+    except TypeError as e:
+        echo(f"引擎看门狗参数无效（{e}），使用默认参数")
+        return EngineWatchdog()
@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+import time
+
+from console import echo
+
+# 通过环境变量指定统计数据目录即可启用（CLI 也可以在 config.json 中设置 metrics_dir）
+METRICS_ENV = 'SHITTTS_METRICS_DIR'
+LOG_NAME = 'utterances.jsonl'
+PROM_NAME = 'shittts.prom'
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+# 直方图的桶上限（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Prometheus 风格的累计直方图"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+def _labels(**labels):
+    return ','.join(f'{k}="{v}"' for k, v in labels.items())
+
+
+class MetricsRecorder:
+    """记录每次朗读/合成的分阶段耗时
+
+    每条记录以一行 JSON 追加到 utterances.jsonl（超过 max_bytes 时轮转，保留 backup_count 个旧文件），
+    同时更新延迟直方图并写入 shittts.prom，供 Prometheus node_exporter 的 textfile collector 读取。
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT,
+                 buckets=DEFAULT_BUCKETS):
+        self.directory = directory
+        self.log_path = os.path.join(directory, LOG_NAME)
+        self.prom_path = os.path.join(directory, PROM_NAME)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # (指标名, 标签) -> Histogram / 计数
+        self._histograms = {}
+        self._counters = {}
+        self._failed = False
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, record):
+        """写入一条记录并更新 Prometheus 文件；写入失败只提示一次，不影响朗读"""
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self.lock:
+            self._observe(record)
+            try:
+                self._append(line)
+                self._write_prom()
+            except OSError as e:
+                if not self._failed:
+                    echo(f"写入统计数据出错：{e}")
+                    self._failed = True
+
+    def _append(self, line):
+        data = line.encode('utf-8')
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            size = 0
+        if size and size + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.log_path, 'ab') as f:
+            f.write(data)
+
+    def _rotate(self):
+        """utterances.jsonl -> .1 -> .2 ...，超出 backup_count 的最旧文件被删除"""
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.log_path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.log_path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.log_path, f"{self.log_path}.1")
+        else:
+            os.remove(self.log_path)
+
+    def _histogram(self, name, labels):
+        key = (name, labels)
+        if key not in self._histograms:
+            self._histograms[key] = Histogram(self.buckets)
+        return self._histograms[key]
+
+    def _count(self, name, labels, value=1):
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def _observe(self, record):
+        kind = record['kind']
+        status = 'error' if record.get('error') else 'ok'
+        self._count('shittts_utterances_total', _labels(kind=kind, status=status))
+        self._count('shittts_utterance_chars_total', _labels(kind=kind), record.get('chars', 0))
+        self._histogram('shittts_utterance_seconds', _labels(kind=kind)).observe(record['total'])
+        if record.get('first_audio') is not None:
+            self._histogram('shittts_first_audio_seconds', _labels(kind=kind)).observe(record['first_audio'])
+        for phase, seconds in record.get('phases', {}).items():
+            self._histogram('shittts_phase_seconds', _labels(kind=kind, phase=phase)).observe(seconds)
+        if record.get('restarts'):
+            self._count('shittts_engine_restarts_total', _labels(kind=kind), record['restarts'])
+        playback = record.get('playback')
+        if playback:
+            sink = _labels(sink=playback['sink'])
+            self._count('shittts_underruns_total', sink, playback['underruns'])
+            if playback.get('min_fill') is not None:
+                self._histogram('shittts_buffer_min_fill_seconds', sink).observe(playback['min_fill'])
+
+    def _write_prom(self):
+        """先写临时文件再替换，collector 不会读到写了一半的文件"""
+        help_text = {
+            'shittts_utterances_total': ('counter', '朗读/合成次数'),
+            'shittts_utterance_chars_total': ('counter', '朗读/合成的字符数'),
+            'shittts_utterance_seconds': ('histogram', '每次朗读/合成的总耗时（秒）'),
+            'shittts_first_audio_seconds': ('histogram', '从请求到发出第一个声音的延迟（秒）'),
+            'shittts_phase_seconds': ('histogram', '各阶段耗时（秒）'),
+            'shittts_engine_restarts_total': ('counter', 'runAndWait() 超时后重建引擎的次数'),
+            'shittts_underruns_total': ('counter', '播放时环形缓冲区断音次数'),
+            'shittts_buffer_min_fill_seconds': ('histogram', '每次播放期间环形缓冲区的最低填充量（秒）'),
+        }
+        lines = []
+        for name, (kind, text) in help_text.items():
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(self._counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{{{labels}}} {value}")
+            for (metric, labels), hist in sorted(self._histograms.items()):
+                if metric != name:
+                    continue
+                sep = ',' if labels else ''
+                for upper, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'{name}_bucket{{{labels}{sep}le="{upper}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {hist.count}')
+                lines.append(f"{name}_sum{{{labels}}} {hist.total:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {hist.count}")
+        tmp_path = self.prom_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.prom_path)
+
+
+def create_recorder(directory=None):
+    """目录未指定时读取环境变量 SHITTTS_METRICS_DIR，都没有时返回 None（不统计）"""
+    directory = directory or os.environ.get(METRICS_ENV)
+    if not directory:
+        return None
+    try:
+        return MetricsRecorder(directory)
+    except OSError as e:
+        echo(f"创建统计目录出错：{e}，将不记录统计数据")
+        return None
+
+
+def make_record(kind, text, rate, volume, voice, total, phases, first_audio=None, trimmed=None, playback=None,
+                restarts=0, error=None):
+    """组装一条朗读/合成记录
+
+    trimmed 为合成后裁掉的首尾静音时长（秒）；playback 为经过环形缓冲区播放时的
+    输出端、断音次数和缓冲区最低/平均填充量（秒），见 WavPlayer.last_playback；
+    restarts 为这次朗读/合成期间因 runAndWait() 超时而重建引擎的次数
+    """
+    return {
+        'ts': round(time.time(), 3),
+        'kind': kind,
+        'chars': len(text),
+        'voice': voice,
+        'rate': rate,
+        'volume': volume,
+        'total': round(total, 6),
+        'first_audio': round(first_audio, 6) if first_audio is not None else None,
+        'phases': {k: round(v, 6) for k, v in phases.items()},
+        'trimmed': round(trimmed, 6) if trimmed is not None else None,
+        'playback': playback,
+        'restarts': restarts,
+        'error': str(error) if error else None,
+    }
@@ -0,0 +1,202 @@
+import time
+import tkinter as tk
+
+# 每页的块数
+PAGE_BLOCKS = 50
+# 同时加载在控件中的最多页数
+MAX_PAGES = 3
+# 可见区域离已加载内容的边缘小于这个比例时加载相邻页
+EDGE_FRACTION = 0.15
+
+
+class PagedViewer:
+    """在 Text 控件中分页显示大文件，只加载当前块附近的几页
+
+    blocks 为支持 len() 和下标访问的文本块序列（如 BlockIndex，按需从磁盘读取）。
+    滚动到已加载内容的边缘、拖动滚动条或朗读前进到其他页时加载相邻页，
+    超过 max_pages 的页从控件中删除，控件中的文本量与文件大小无关。
+    每块文本带有 b<块号> 标签；滚动条按块在全文中的位置显示；分页模式下控件只读。
+    """
+
+    def __init__(self, text_widget, scrollbar, page_blocks=PAGE_BLOCKS, max_pages=MAX_PAGES):
+        self.text = text_widget
+        self.scrollbar = scrollbar
+        self.page_blocks = page_blocks
+        self.max_pages = max(max_pages, 2)
+        self.blocks = None
+        self.pages = []  # 已加载的页号（连续、升序）
+        self._check_pending = False
+        self.stats = {'pages_loaded': 0, 'last_page_seconds': None}
+        self.text.tag_configure('current_block', background='#fff2a8')
+
+    @property
+    def active(self):
+        return self.blocks is not None
+
+    def page_count(self):
+        return (len(self.blocks) + self.page_blocks - 1) // self.page_blocks
+
+    def attach(self, blocks, block=0):
+        """进入分页模式，显示第 block 块所在的页"""
+        self.blocks = blocks
+        self.pages = []
+        self.text.configure(yscrollcommand=self._on_yscroll)
+        self.scrollbar.configure(command=self._on_scrollbar)
+        self._edit(lambda: self.text.delete('1.0', tk.END))
+        if len(blocks):
+            self.show_block(block)
+
+    def detach(self):
+        """退出分页模式并清空控件"""
+        self.blocks = None
+        self.pages = []
+        self.text.configure(state=tk.NORMAL, yscrollcommand=self.scrollbar.set)
+        self.scrollbar.configure(command=self.text.yview)
+        self.text.delete('1.0', tk.END)
+        self._delete_block_tags()
+
+    # ---- 页的加载与删除 ----
+
+    def _edit(self, func):
+        """临时允许修改只读的控件"""
+        self.text.configure(state=tk.NORMAL)
+        try:
+            func()
+        finally:
+            self.text.configure(state=tk.DISABLED)
+
+    def _page_range(self, page):
+        start = page * self.page_blocks
+        return start, min(start + self.page_blocks, len(self.blocks))
+
+    def _read_page(self, page):
+        start, stop = self._page_range(page)
+        if hasattr(self.blocks, 'read_range'):
+            return self.blocks.read_range(start, stop)
+        return [self.blocks[i] for i in range(start, stop)]
+
+    def _insert_page(self, page, index):
+        """在 index（'1.0' 或 end）处插入一页，每块后面跟一个空行"""
+        start_time = time.perf_counter()
+        start, _ = self._page_range(page)
+        args = []
+        for i, block in enumerate(self._read_page(page), start):
+            args += [block, f'b{i}', '\n\n', ()]
+        if args:
+            self.text.insert(index, *args)
+        self.stats['pages_loaded'] += 1
+        self.stats['last_page_seconds'] = time.perf_counter() - start_time
+
+    def _delete_block_tags(self, start=None, stop=None):
+        names = [t for t in self.text.tag_names() if t[:1] == 'b' and t[1:].isdigit()
+                 and (start is None or start <= int(t[1:]) < stop)]
+        if names:
+            self.text.tag_delete(*names)
+
+    def _line(self, index):
+        return int(self.text.index(index).split('.')[0])
+
+    def _keep_view(self, anchor_block, func):
+        """执行 func（增删页）后，让 anchor_block 块保持在屏幕上原来的位置"""
+        offset = self._line('@0,0') - self._line(f'b{anchor_block}.first')
+        self._edit(func)
+        self.text.yview(f'{max(self._line(f"b{anchor_block}.first") + offset, 1)}.0')
+
+    def _append_page(self):
+        page = self.pages[-1] + 1
+        anchor = self._page_range(self.pages[-1])[0]
+
+        def change():
+            self._insert_page(page, 'end-1c')
+            self.pages.append(page)
+            if len(self.pages) > self.max_pages:
+                self._drop_first()
+        self._keep_view(anchor, change)
+
+    def _prepend_page(self):
+        page = self.pages[0] - 1
+        anchor = self._page_range(self.pages[0])[0]
+
+        def change():
+            self._insert_page(page, '1.0')
+            self.pages.insert(0, page)
+            if len(self.pages) > self.max_pages:
+                self._drop_last()
+        self._keep_view(anchor, change)
+
+    def _drop_first(self):
+        page = self.pages.pop(0)
+        start, stop = self._page_range(page)
+        self.text.delete('1.0', f'b{stop}.first')
+        self._delete_block_tags(start, stop)
+
+    def _drop_last(self):
+        page = self.pages.pop()
+        start, stop = self._page_range(page)
+        self.text.delete(f'b{start}.first', 'end-1c')
+        self._delete_block_tags(start, stop)
+
+    def _load_around(self, page):
+        """重新加载 page 及其前后各一页"""
+        first = max(page - 1, 0)
+        last = min(first + self.max_pages, self.page_count()) - 1
+        first = max(min(first, last - self.max_pages + 1), 0)
+
+        def change():
+            self.text.delete('1.0', tk.END)
+            self._delete_block_tags()
+            self.pages = []
+            for p in range(first, last + 1):
+                self._insert_page(p, 'end-1c')
+                self.pages.append(p)
+        self._edit(change)
+
+    # ---- 定位与滚动 ----
+
+    def show_block(self, block, highlight=False):
+        """加载第 block 块所在的页并滚动到该块，highlight 为 True 时高亮（朗读当前块）"""
+        if not self.active or not 0 <= block < len(self.blocks):
+            return
+        if block // self.page_blocks not in self.pages:
+            self._load_around(block // self.page_blocks)
+        if highlight:
+            self.text.tag_remove('current_block', '1.0', tk.END)
+            self.text.tag_add('current_block', f'b{block}.first', f'b{block}.last')
+            self.text.see(f'b{block}.last')
+            self.text.see(f'b{block}.first')
+        else:
+            self.text.yview(f'b{block}.first')
+
+    def _loaded_range(self):
+        return self._page_range(self.pages[0])[0], self._page_range(self.pages[-1])[1]
+
+    def _on_yscroll(self, first, last):
+        """控件滚动时：按全文位置更新滚动条，并在空闲时检查是否需要加载相邻页"""
+        if not self.pages:
+            self.scrollbar.set(first, last)
+            return
+        start, stop = self._loaded_range()
+        total = len(self.blocks)
+        loaded = stop - start
+        self.scrollbar.set((start + float(first) * loaded) / total, (start + float(last) * loaded) / total)
+        if not self._check_pending:
+            self._check_pending = True
+            self.text.after_idle(self._check_edges)
+
+    def _check_edges(self):
+        self._check_pending = False
+        if not self.pages:
+            return
+        first, last = self.text.yview()
+        if last > 1 - EDGE_FRACTION and self.pages[-1] < self.page_count() - 1:
+            self._append_page()
+        elif first < EDGE_FRACTION and self.pages[0] > 0:
+            self._prepend_page()
+
+    def _on_scrollbar(self, *args):
+        """拖动滚动条时跳到全文中对应位置的块，其他滚动交给控件处理"""
+        if args and args[0] == 'moveto' and self.pages:
+            block = int(float(args[1]) * len(self.blocks))
+            self.show_block(min(max(block, 0), len(self.blocks) - 1))
+        else:
+            self.text.yview(*args)
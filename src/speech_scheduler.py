@@ -0,0 +1,80 @@
+import threading
+import time
+
+
+class SpeechScheduler:
+    """只保留最新请求的朗读队列，用法与 queue.Queue 相同（put / get）
+
+    界面发出的朗读请求（朗读全文、上一块、下一块、跳转）都以最后一次点击为准，
+    因此排队中最多只有一个请求：
+    - put() 替换尚未开始执行的请求，快速连续点击“下一块”“跳转”时只朗读最后一次的目标；
+    - clear() 丢弃排队中的请求（点击停止时使用）；
+    - close() 之后 get() 返回 None，工作线程据此退出。
+
+    depth 为当前排队数量（0 或 1），stats 统计提交、合并和丢弃的次数。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = None
+        self._has_pending = False
+        self._closed = False
+        self.stats = {'submitted': 0, 'coalesced': 0, 'dropped': 0}
+
+    def put(self, item):
+        """加入队列，替换排队中尚未执行的请求，返回被替换的数量"""
+        with self._cond:
+            replaced = 1 if self._has_pending else 0
+            self.stats['coalesced'] += replaced
+            self.stats['submitted'] += 1
+            self._pending = item
+            self._has_pending = True
+            self._cond.notify()
+            return replaced
+
+    def get(self, timeout=None):
+        """取出排队中的请求，队列为空时阻塞；关闭后或超时返回 None"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                if self._has_pending:
+                    item = self._pending
+                    self._pending = None
+                    self._has_pending = False
+                    return item
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+
+    def clear(self):
+        """丢弃排队中的请求，返回丢弃的数量"""
+        with self._cond:
+            dropped = 1 if self._has_pending else 0
+            self._pending = None
+            self._has_pending = False
+            self.stats['dropped'] += dropped
+            return dropped
+
+    def close(self):
+        """丢弃排队中的请求并让 get() 返回 None"""
+        with self._cond:
+            self.clear()
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def depth(self):
+        """排队中（尚未开始执行）的请求数"""
+        return 1 if self._has_pending else 0
+
+    def empty(self):
+        return not self._has_pending
+
+    def qsize(self):
+        return self.depth
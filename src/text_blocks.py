@@ -0,0 +1,540 @@
+import bisect
+import codecs
+import hashlib
+import io
+import itertools
+import json
+import os
+import re
+import struct
+import time
+from array import array
+
+from console import echo
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def iter_text_blocks(file, chunk_size=CHUNK_SIZE):
+    """从已打开的文本文件中分段读取，以空行（\\n\\n）分隔逐个产出文本块
+
+    每次只读取 chunk_size 个字符，内存占用只与最长的文本块有关，与文件大小无关；
+    跨越两次读取的空行分隔符同样能正确识别，结果与 content.split('\\n\\n') 一致。
+    """
+    pending = []  # 当前尚未遇到分隔符的文本片段
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        # 上一段以换行结尾、本段以换行开头：分隔符跨越了读取边界
+        if pending and pending[-1].endswith('\n') and chunk.startswith('\n'):
+            pending[-1] = pending[-1][:-1]
+            block = ''.join(pending).strip()
+            if block:
+                yield block
+            pending = []
+            chunk = chunk[1:]
+        pieces = chunk.split('\n\n')
+        if len(pieces) == 1:
+            pending.append(chunk)
+            continue
+        pending.append(pieces[0])
+        block = ''.join(pending).strip()
+        if block:
+            yield block
+        for piece in pieces[1:-1]:
+            block = piece.strip()
+            if block:
+                yield block
+        pending = [pieces[-1]]
+    block = ''.join(pending).strip()
+    if block:
+        yield block
+
+
+# ---------------- 分句 ----------------
+
+# 朗读全文时每个朗读单元的最大字数
+SEGMENT_MAX_CHARS = 120
+# 句末标点（连同紧跟的引号、括号）或换行处断句；英文句号后面需要有空白
+_SENTENCE_END = re.compile(r'[。！？!?；;…\n]+[”’"\'）)」』]*|\.(?=\s)')
+# 句子过长时优先在这些位置切开
+_SOFT_BREAK = re.compile(r'[，,、：:\s]')
+
+
+def iter_segments(text, max_chars=SEGMENT_MAX_CHARS):
+    """把文本按句子切分为朗读单元并逐个产出，超过 max_chars 的句子在逗号或空白处再切开
+
+    按需切分，不会先复制或拆分整段文本；只有标点、没有文字的片段会被跳过。
+    """
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        yield from _bounded_segments(text[start:match.end()], max_chars)
+        start = match.end()
+    yield from _bounded_segments(text[start:], max_chars)
+
+
+def _bounded_segments(sentence, max_chars):
+    sentence = sentence.strip()
+    while len(sentence) > max_chars:
+        # max_chars 以内最后一个逗号或空白之后切开，没有时直接截断
+        cut = 0
+        for match in _SOFT_BREAK.finditer(sentence, 0, max_chars):
+            cut = match.end()
+        if cut == 0:
+            cut = max_chars
+        head, sentence = sentence[:cut].strip(), sentence[cut:].lstrip()
+        if any(c.isalnum() for c in head):
+            yield head
+    if any(c.isalnum() for c in sentence):
+        yield sentence
+
+
+# ---------------- 编码识别与流式解码 ----------------
+
+# 只读取文件开头这么多字节来判断编码
+SNIFF_SIZE = 64 * 1024
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+# 指定带 BOM 的编码时，按文件开头的 BOM 换成不带 BOM 的具体编码（没有 BOM 时取第一个），
+# 这样分段编码、按偏移解码单个块时都不会再插入或要求 BOM
+_BOM_FAMILIES = {
+    'utf-8-sig': ((codecs.BOM_UTF8, 'utf-8'),),
+    'utf-16': ((codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be')),
+    'utf-32': ((codecs.BOM_UTF32_LE, 'utf-32-le'), (codecs.BOM_UTF32_BE, 'utf-32-be')),
+}
+# 无 BOM 时依次尝试的编码；GB18030 是 GBK 的超集，放在最后
+_CANDIDATES = ('utf-8', 'gbk', 'gb18030')
+# 无 BOM 的 UTF-16 判断：取开头这么多字节试解码，看起来像正常文本的字符比例至少为 UTF16_MIN_SCORE
+UTF16_SAMPLE = 4096
+UTF16_MIN_SCORE = 0.8
+
+
+def _plausible_char(ch):
+    """是否为常见文本字符（ASCII、拉丁字母、标点、中日韩文字、全角字符）"""
+    c = ord(ch)
+    if c > 0xFF and c & 0xFF == 0:
+        # 字节序读反的 ASCII 字符都是 U+xx00
+        return False
+    return (c in (0x09, 0x0A, 0x0D) or 0x20 <= c < 0x7F or 0xA0 <= c <= 0x24F
+            or 0x2000 <= c <= 0x206F or 0x3000 <= c <= 0x30FF or 0x3400 <= c <= 0x9FFF
+            or 0xAC00 <= c <= 0xD7A3 or 0xFF00 <= c <= 0xFFEF)
+
+
+def _utf16_score(sample, encoding):
+    """按 encoding 严格解码 sample，返回常见文本字符的比例，解码失败时返回 -1"""
+    try:
+        text = codecs.getincrementaldecoder(encoding)().decode(sample[:len(sample) // 2 * 2], final=False)
+    except UnicodeDecodeError:
+        return -1
+    if not text:
+        return -1
+    return sum(1 for ch in text if _plausible_char(ch)) / len(text)
+
+
+def sniff_encoding(prefix):
+    """根据文件开头的字节判断编码，返回 (编码, BOM 字节数)
+
+    依次检查 BOM；开头含 0 字节时（UTF-8 和 GBK 文本中不会出现）按 UTF-16-LE / UTF-16-BE 严格试解码，
+    取常见文本字符比例较高且不低于 UTF16_MIN_SCORE 的一个；再按 UTF-8、GBK、GB18030 试解码。
+    开头全是 ASCII 时判为 UTF-8。
+    """
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding, len(bom)
+    sample = prefix[:UTF16_SAMPLE]
+    if 0 in sample:
+        scores = {encoding: _utf16_score(sample, encoding) for encoding in ('utf-16-le', 'utf-16-be')}
+        best = max(scores, key=scores.get)
+        if scores[best] >= UTF16_MIN_SCORE:
+            return best, 0
+    for encoding in _CANDIDATES:
+        try:
+            # 开头可能截断了一个多字节字符，所以不要求 final
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+            return encoding, 0
+        except UnicodeDecodeError:
+            continue
+    return 'utf-8', 0
+
+
+def resolve_encoding(prefix, encoding):
+    """指定编码时确定实际使用的编码和要跳过的 BOM 字节数
+
+    utf-16、utf-32、utf-8-sig 按文件开头的 BOM 换成不带 BOM 的具体编码（见 _BOM_FAMILIES）。
+    """
+    name = codecs.lookup(encoding).name
+    family = _BOM_FAMILIES.get(name)
+    if family:
+        for bom, concrete in family:
+            if prefix.startswith(bom):
+                return concrete, len(bom)
+        return family[0][1], 0
+    for bom, bom_encoding in _BOMS:
+        if prefix.startswith(bom) and codecs.lookup(bom_encoding).name == name:
+            return encoding, len(bom)
+    return encoding, 0
+
+
+def is_ascii_compatible(encoding):
+    """换行符是否为单字节（可以直接在字节中查找分隔符）"""
+    return not codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32'))
+
+
+class DecodedReader:
+    """把二进制文件增量解码为文本，换行统一为 \n，提供 read(size) 供 iter_text_blocks 使用
+
+    识别编码用的开头字节会直接复用，整个文件只读取一遍。
+    """
+
+    def __init__(self, raw, encoding=None, chunk_size=CHUNK_SIZE):
+        start = time.perf_counter()
+        self.raw = raw
+        prefix = raw.read(SNIFF_SIZE)
+        if encoding is None:
+            encoding, bom = sniff_encoding(prefix)
+        else:
+            encoding, bom = resolve_encoding(prefix, encoding)
+        self.encoding = encoding
+        self._pending = prefix[bom:]
+        self._eof = not prefix
+        self._decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(), translate=True)
+        self.decode_seconds = time.perf_counter() - start
+
+    def read(self, size=CHUNK_SIZE):
+        start = time.perf_counter()
+        try:
+            while True:
+                if self._pending:
+                    data, self._pending = self._pending, b''
+                elif self._eof:
+                    return ''
+                else:
+                    data = self.raw.read(size)
+                if not data:
+                    self._eof = True
+                    return self._decoder.decode(b'', final=True)
+                text = self._decoder.decode(data)
+                if text:
+                    return text
+        finally:
+            self.decode_seconds += time.perf_counter() - start
+
+
+def iter_file_blocks(file_path, encoding=None, chunk_size=CHUNK_SIZE):
+    """流式读取文件并逐个产出文本块，未指定编码时自动识别"""
+    with open(file_path, 'rb') as raw:
+        yield from iter_text_blocks(DecodedReader(raw, encoding), chunk_size)
+
+
+def load_text(file_path, encoding=None, chunk_size=CHUNK_SIZE):
+    """一次读取并解码整个文件，返回 (文本, 编码, 解码耗时秒数)
+
+    开头看起来像 UTF-8 但后面解码失败时，改用 GB18030 重新读取。
+    """
+    try:
+        with open(file_path, 'rb') as raw:
+            reader = DecodedReader(raw, encoding)
+            parts = []
+            while True:
+                text = reader.read(chunk_size)
+                if not text:
+                    break
+                parts.append(text)
+            return ''.join(parts), reader.encoding, reader.decode_seconds
+    except UnicodeDecodeError:
+        if encoding is not None or reader.encoding == 'gb18030':
+            raise
+        return load_text(file_path, 'gb18030', chunk_size)
+
+
+# ---------------- 块偏移索引 ----------------
+
+INDEX_DIR = 'block_index'
+# 版本 2：修正了无 BOM 的 UTF-16 和指定 utf-16 编码时的偏移，旧索引需要重建
+_INDEX_MAGIC = b'SBIX2\n'
+# 连续两个及以上的换行（兼容 \r\n 和 \r）即为块分隔符，与文本模式下 split('\n\n') 一致。
+# 常见的 \n / \r\n 文件用带字面前缀的快速模式；出现单独的 \r 时改用通用模式，
+# 通用模式下换行字符组成的串中只有单独的 \r\n 不是分隔符。
+# 单字节换行的编码直接在字节中查找，UTF-16 等编码解码后在文本中查找。
+_PATTERNS = {
+    bytes: (re.compile(rb'\n\r?\n[\r\n]*'), re.compile(rb'[\r\n]{2,}'), re.compile(rb'\r(?!\n)'), b'\r\n'),
+    str: (re.compile(r'\n\r?\n[\r\n]*'), re.compile(r'[\r\n]{2,}'), re.compile(r'\r(?!\n)'), '\r\n'),
+}
+
+
+class _LoneCarriageReturn(Exception):
+    """快速模式下发现单独的 \r，需要改用通用模式重新扫描"""
+
+
+def _normalize_block(raw, encoding):
+    """把原始字节解码为文本块，换行统一为 \n"""
+    return raw.decode(encoding).replace('\r\n', '\n').replace('\r', '\n').strip()
+
+
+def _find_blocks(chunks, kind, measure, keep, base_offset=0, general=False):
+    """在分段读取的内容中查找以空行分隔的非空区域，产出 (字节偏移, 字节长度)
+
+    chunks 为 bytes 或 str 片段的迭代器（kind 指明类型），measure(piece) 返回片段在文件中
+    占用的字节数（为 None 时即片段长度），keep(region) 判断区域去掉空白后是否非空。
+    """
+    fast, slow, lone_cr, crlf = _PATTERNS[kind]
+    separator = slow if general else fast
+    buf = kind()
+    block_start = 0    # 当前块在 buf 中的起点
+    search_from = 0
+    cursor = [0, base_offset]  # buf 中的位置及其对应的文件字节偏移，只向前移动
+
+    def offset_of(i):
+        cursor[1] += measure(buf[cursor[0]:i]) if measure else i - cursor[0]
+        cursor[0] = i
+        return cursor[1]
+
+    for chunk in itertools.chain(chunks, [None]):
+        eof = chunk is None
+        if not eof:
+            buf += chunk
+        if not general:
+            m = lone_cr.search(buf, search_from)
+            if m and (m.end() < len(buf) or eof):
+                raise _LoneCarriageReturn()
+        next_search = None
+        for m in separator.finditer(buf, search_from):
+            if m.end() == len(buf) and not eof:
+                # 分隔符可能延续到下一次读取的内容中
+                next_search = m.start()
+                break
+            if m.group() == crlf:
+                continue
+            if keep(buf[block_start:m.start()]):
+                start = offset_of(block_start)
+                yield start, offset_of(m.start()) - start
+            block_start = m.end()
+        if eof:
+            if keep(buf[block_start:]):
+                start = offset_of(block_start)
+                yield start, offset_of(len(buf)) - start
+            break
+        if next_search is None:
+            # 末尾可能有一个换行与下一段开头的换行组成分隔符
+            next_search = max(block_start, len(buf) - 2)
+        offset_of(block_start)
+        buf = buf[block_start:]
+        cursor[0] = 0
+        search_from = next_search - block_start
+        block_start = 0
+
+
+def scan_block_offsets(file_path, encoding=None, chunk_size=CHUNK_SIZE, progress=None):
+    """扫描文件，返回 (偏移数组, 长度数组, 内容哈希, 编码)
+
+    未指定编码时根据文件开头自动识别；解码失败时抛出 UnicodeDecodeError。
+    progress(已读字节数, 文件大小) 在每读取一段后调用，用于显示进度。
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        prefix = f.read(SNIFF_SIZE)
+    if encoding is None:
+        encoding, bom = sniff_encoding(prefix)
+    else:
+        encoding, bom = resolve_encoding(prefix, encoding)
+    for general in (False, True):
+        offsets = array('Q')
+        lengths = array('I')
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            hasher.update(f.read(bom))
+
+            def raw_chunks():
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    hasher.update(chunk)
+                    if progress is not None:
+                        progress(f.tell(), size)
+                    yield chunk
+
+            if is_ascii_compatible(encoding):
+                blocks = _find_blocks(raw_chunks(), bytes, None,
+                                      lambda r: bool(_normalize_block(r, encoding)), bom, general)
+            else:
+                decoder = codecs.getincrementaldecoder(encoding)()
+
+                def text_chunks():
+                    for chunk in raw_chunks():
+                        text = decoder.decode(chunk)
+                        if text:
+                            yield text
+                    text = decoder.decode(b'', final=True)
+                    if text:
+                        yield text
+
+                blocks = _find_blocks(text_chunks(), str, lambda t: len(t.encode(encoding)),
+                                      lambda r: bool(r.strip()), bom, general)
+            try:
+                for offset, length in blocks:
+                    offsets.append(offset)
+                    lengths.append(length)
+            except _LoneCarriageReturn:
+                continue
+        return offsets, lengths, hasher.hexdigest(), encoding
+
+
+def file_hash(file_path, chunk_size=CHUNK_SIZE):
+    """计算文件内容哈希"""
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class BlockIndex:
+    """单个文件的块偏移索引，按需定位并解码单个文本块
+
+    索引保存在 block_index 目录中，以文件大小、修改时间和内容哈希校验，
+    文件未变化时再次打开只需加载索引，无需重新扫描。
+    """
+
+    def __init__(self, file_path, encoding, offsets, lengths, size, mtime_ns, content_hash):
+        self.file_path = file_path
+        self.encoding = encoding
+        self.offsets = offsets
+        self.lengths = lengths
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.content_hash = content_hash
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.offsets)
+        if not 0 <= index < len(self.offsets):
+            raise IndexError('block index out of range')
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offsets[index])
+            raw = f.read(self.lengths[index])
+        return _normalize_block(raw, self.encoding)
+
+    def read_range(self, start, stop):
+        """一次读取第 start 到 stop-1 块（只打开、读取文件一次），用于分页显示"""
+        start, stop = max(start, 0), min(stop, len(self.offsets))
+        if start >= stop:
+            return []
+        base = self.offsets[start]
+        with open(self.file_path, 'rb') as f:
+            f.seek(base)
+            raw = f.read(self.offsets[stop - 1] + self.lengths[stop - 1] - base)
+        return [_normalize_block(raw[self.offsets[i] - base:self.offsets[i] - base + self.lengths[i]], self.encoding)
+                for i in range(start, stop)]
+
+    @staticmethod
+    def index_path(file_path, index_dir=INDEX_DIR):
+        """索引文件路径：以文件绝对路径的哈希命名"""
+        name = hashlib.blake2b(os.path.abspath(file_path).encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(index_dir, name + '.idx')
+
+    def save(self, index_dir=INDEX_DIR):
+        """把索引写入磁盘"""
+        os.makedirs(index_dir, exist_ok=True)
+        meta = json.dumps({
+            'path': os.path.abspath(self.file_path),
+            'encoding': self.encoding,
+            'size': self.size,
+            'mtime_ns': self.mtime_ns,
+            'hash': self.content_hash,
+            'count': len(self.offsets),
+        }).encode('utf-8')
+        path = self.index_path(self.file_path, index_dir)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_INDEX_MAGIC)
+            f.write(struct.pack('<I', len(meta)))
+            f.write(meta)
+            f.write(self.offsets.tobytes())
+            f.write(self.lengths.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, file_path, index_dir=INDEX_DIR):
+        """加载已保存的索引，文件已变化或索引损坏时返回 None"""
+        try:
+            st = os.stat(file_path)
+            with open(cls.index_path(file_path, index_dir), 'rb') as f:
+                if f.read(len(_INDEX_MAGIC)) != _INDEX_MAGIC:
+                    return None
+                meta_len, = struct.unpack('<I', f.read(4))
+                meta = json.loads(f.read(meta_len).decode('utf-8'))
+                count = meta['count']
+                offsets = array('Q')
+                offsets.frombytes(f.read(count * offsets.itemsize))
+                lengths = array('I')
+                lengths.frombytes(f.read(count * lengths.itemsize))
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+        if len(offsets) != count or len(lengths) != count or meta['size'] != st.st_size:
+            return None
+        index = cls(file_path, meta['encoding'], offsets, lengths,
+                    meta['size'], meta['mtime_ns'], meta['hash'])
+        if meta['mtime_ns'] != st.st_mtime_ns:
+            # 修改时间变了但大小相同：内容哈希一致时仍可复用索引
+            if file_hash(file_path) != meta['hash']:
+                return None
+            index.mtime_ns = st.st_mtime_ns
+            index.save(index_dir)
+        return index
+
+    @classmethod
+    def build(cls, file_path, encoding=None, index_dir=INDEX_DIR, progress=None):
+        """扫描文件建立索引并保存，未指定编码时自动识别；progress 见 scan_block_offsets"""
+        st = os.stat(file_path)
+        offsets, lengths, content_hash, encoding = scan_block_offsets(file_path, encoding, progress=progress)
+        index = cls(file_path, encoding, offsets, lengths, st.st_size, st.st_mtime_ns, content_hash)
+        try:
+            index.save(index_dir)
+        except OSError as e:
+            echo(f"保存块索引出错：{e}")
+        return index
+
+    @classmethod
+    def open(cls, file_path, encoding=None, index_dir=INDEX_DIR, progress=None):
+        """优先加载已有索引，否则扫描建立索引（未指定编码时自动识别）"""
+        index = cls.load(file_path, index_dir)
+        if index is not None:
+            return index
+        return cls.build(file_path, encoding, index_dir, progress)
+
+
+class BlockList:
+    """把多个文件的块索引拼接成一个只读序列，用法与文本块列表相同"""
+
+    def __init__(self, indexes=None):
+        self.indexes = []
+        self._starts = []
+        self._total = 0
+        for index in indexes or []:
+            self.append(index)
+
+    def append(self, index):
+        self.indexes.append(index)
+        self._starts.append(self._total)
+        self._total += len(index)
+
+    def __len__(self):
+        return self._total
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._total
+        if not 0 <= i < self._total:
+            raise IndexError('block index out of range')
+        pos = bisect.bisect_right(self._starts, i) - 1
+        return self.indexes[pos][i - self._starts[pos]]
+
+    def __iter__(self):
+        for index in self.indexes:
+            for i in range(len(index)):
+                yield index[i]
@@ -0,0 +1,196 @@
+import bisect
+
+
+def split_lines_into_blocks(lines, first_line=1):
+    """把若干行按空行分割成块，返回 [(起始行, 结束行, 文本)]，行号从 first_line 开始
+
+    只含空白的行是分隔行，块内各行用换行连接。
+    """
+    blocks = []
+    start = None
+    for offset, line in enumerate(lines):
+        if line.strip() == '':
+            if start is not None:
+                blocks.append((first_line + start, first_line + offset - 1, '\n'.join(lines[start:offset])))
+                start = None
+        elif start is None:
+            start = offset
+    if start is not None:
+        blocks.append((first_line + start, first_line + len(lines) - 1, '\n'.join(lines[start:])))
+    return blocks
+
+
+class TextBlockModel:
+    """与 Tk Text 控件绑定的文本块模型，编辑后只重新分割受影响的段落
+
+    通过替换控件的 Tcl 命令拦截 insert / delete / replace，记录被修改的行范围并平移
+    后面各块的行号；收到 <<Modified>> 或调用 sync() 时只重新读取、分割这些行
+    以及与它们相邻的块。小改动之后 blocks 立即可用，不需要复制和分割整个文本。
+    撤销/重做无法知道修改范围，会重新分割全文。
+    """
+
+    def __init__(self, text_widget):
+        self.text = text_widget
+        self.blocks = []  # 文本块内容
+        self.starts = []  # 每块的起始行号（从 1 开始）
+        self.ends = []  # 每块的结束行号
+        self._dirty = None  # 需要重新分割的行范围 [lo, hi]，按当前行号
+        self._shared = False  # blocks 是否已经通过 snapshot() 交给调用方，是则下次修改前先复制
+        self.stats = {'full_splits': 0, 'partial_splits': 0, 'lines_resplit': 0}
+        self._orig = None
+        if text_widget is not None:
+            self._hook()
+            text_widget.bind('<<Modified>>', self._on_modified, add='+')
+            self.rebuild()
+
+    # ---- 拦截控件命令 ----
+
+    def _hook(self):
+        widget = self.text
+        self._orig = widget._w + '_orig'
+        widget.tk.call('rename', widget._w, self._orig)
+        widget.tk.createcommand(widget._w, self._dispatch)
+        widget.bind('<Destroy>', self._unhook, add='+')
+
+    def _unhook(self, event=None):
+        if self._orig is None or event is not None and event.widget is not self.text:
+            return
+        widget = self.text
+        try:
+            widget.tk.deletecommand(widget._w)
+            widget.tk.call('rename', self._orig, widget._w)
+        except Exception:
+            pass
+        self._orig = None
+
+    def _call(self, *args):
+        return self.text.tk.call((self._orig,) + args)
+
+    def _line(self, index):
+        """index 所在的行号，超出末尾时取最后一行"""
+        line = int(str(self._call('index', index)).split('.')[0])
+        return min(line, self.line_count())
+
+    def _dispatch(self, operation, *args):
+        if operation == 'insert' and args:
+            self.on_insert(self._line(args[0]), sum(str(chars).count('\n') for chars in args[1::2]))
+        elif operation == 'delete' and args:
+            last = args[1] if len(args) > 1 else f'{args[0]}+1c'
+            self.on_delete(self._line(args[0]), self._line(last))
+        elif operation == 'replace' and len(args) >= 3:
+            self.on_delete(self._line(args[0]), self._line(args[1]))
+            self.on_insert(self._line(args[0]), sum(str(chars).count('\n') for chars in args[2::2]))
+        elif operation == 'edit' and args and args[0] in ('undo', 'redo'):
+            self._mark_dirty(1, max(self.line_count(), 1) + 1)
+        return self._call(operation, *args)
+
+    def _on_modified(self, event=None):
+        # 清除修改标志本身也会触发 <<Modified>>，此时标志已经是 False
+        if not self.text.tk.getboolean(self._call('edit', 'modified')):
+            return
+        self.sync()
+        self._call('edit', 'modified', False)
+
+    # ---- 读取控件内容 ----
+
+    def line_count(self):
+        """文本的行数（不含 Tk 在末尾自动添加的换行）"""
+        return int(str(self._call('index', 'end-1c')).split('.')[0])
+
+    def read_lines(self, first, last):
+        """读取第 first 到 last 行（含）"""
+        return str(self._call('get', f'{first}.0', f'{last}.end')).split('\n')
+
+    # ---- 记录修改 ----
+
+    def on_insert(self, line, newlines):
+        """在第 line 行插入了含 newlines 个换行的文本（在插入之前调用）"""
+        self._shift(line, line, newlines)
+        self._mark_dirty(line, line + newlines)
+
+    def on_delete(self, first, last):
+        """删除了第 first 行到第 last 行之间的内容（在删除之前调用）"""
+        self._shift(first, last, first - last)
+        self._mark_dirty(first, first)
+
+    @staticmethod
+    def _moved(pos, first, last, delta):
+        """编辑前的行号 pos 在编辑后的位置：first..last 之间的行并入 first，之后的行平移 delta"""
+        if pos <= first:
+            return pos
+        if pos <= last:
+            return first
+        return pos + delta
+
+    def _shift(self, first, last, delta):
+        if delta == 0:
+            return
+        if self._dirty is not None:
+            lo, hi = self._dirty
+            self._dirty = [self._moved(lo, first, last, delta), self._moved(hi, first, last, delta)]
+        # 只处理修改位置之后的块：被删除的行并入 first，之后的行整体平移
+        for positions in (self.starts, self.ends):
+            i = bisect.bisect_right(positions, first)
+            j = bisect.bisect_right(positions, last)
+            positions[i:j] = [first] * (j - i)
+            positions[j:] = [p + delta for p in positions[j:]]
+
+    def _mark_dirty(self, lo, hi):
+        if self._dirty is None:
+            self._dirty = [lo, hi]
+        else:
+            self._dirty = [min(self._dirty[0], lo), max(self._dirty[1], hi)]
+
+    # ---- 重新分割 ----
+
+    def rebuild(self):
+        """重新分割全文"""
+        count = self.line_count()
+        blocks = split_lines_into_blocks(self.read_lines(1, count)) if count else []
+        self.starts = [b[0] for b in blocks]
+        self.ends = [b[1] for b in blocks]
+        self.blocks = [b[2] for b in blocks]
+        self._shared = False
+        self._dirty = None
+        self.stats['full_splits'] += 1
+        self.stats['lines_resplit'] += count
+
+    def sync(self):
+        """重新分割有修改的段落，返回最新的文本块列表"""
+        if self._dirty is None:
+            return self.blocks
+        count = self.line_count()
+        lo, hi = self._dirty
+        self._dirty = None
+        # 与修改范围相邻的块也要重新分割：删除或填写空行会合并或拆开两块
+        first = bisect.bisect_left(self.ends, lo - 1)
+        last = bisect.bisect_right(self.starts, hi + 1)
+        if first < last:
+            lo = min(lo, self.starts[first])
+            hi = max(hi, self.ends[last - 1])
+        lo, hi = max(lo, 1), min(hi, count)
+        if lo > hi:
+            replacement = []
+        else:
+            replacement = split_lines_into_blocks(self.read_lines(lo, hi), lo)
+            self.stats['lines_resplit'] += hi - lo + 1
+        self.starts[first:last] = [b[0] for b in replacement]
+        self.ends[first:last] = [b[1] for b in replacement]
+        texts = [b[2] for b in replacement]
+        if self._shared:
+            # 调用方还在使用 snapshot() 返回的列表：换成新的列表，不修改旧的
+            self.blocks = self.blocks[:first] + texts + self.blocks[last:]
+            self._shared = False
+        else:
+            self.blocks[first:last] = texts
+        self.stats['partial_splits'] += 1
+        return self.blocks
+
+    def snapshot(self):
+        """返回最新的文本块列表，之后的编辑不会再修改这个列表
+
+        不复制列表：只做标记，之后第一次重新分割时才换成新的列表（写时复制）。
+        """
+        blocks = self.sync()
+        self._shared = True
+        return blocks
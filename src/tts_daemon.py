@@ -0,0 +1,429 @@
+import hmac
+import ipaddress
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urlrequest
+from urllib.error import HTTPError, URLError
+
+from console import echo
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# 排队中的请求超过这个数量时直接返回 503，由客户端稍后重试
+DEFAULT_MAX_QUEUE = 32
+# 单个请求最长等待时间（秒）
+REQUEST_TIMEOUT = 300
+# 客户端未指定令牌时读取的环境变量
+TOKEN_ENV = 'SHITTTS_SERVE_TOKEN'
+
+
+def is_loopback(host):
+    """监听地址是否只有本机可以访问"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class LatencyStats:
+    """记录最近的请求延迟，计算每秒请求数和分位数"""
+
+    def __init__(self, maxlen=10000):
+        self.lock = threading.Lock()
+        self._samples = deque(maxlen=maxlen)  # (完成时间, 延迟秒数)
+        self.total = 0
+        self.rejected = 0
+
+    def add(self, latency):
+        with self.lock:
+            self._samples.append((time.perf_counter(), latency))
+            self.total += 1
+
+    def summary(self, window=60.0):
+        """最近 window 秒内的请求数、每秒请求数、p50/p99 延迟（毫秒）"""
+        now = time.perf_counter()
+        with self.lock:
+            recent = [latency for finished, latency in self._samples if now - finished <= window]
+            total, rejected = self.total, self.rejected
+        result = {'requests': total, 'rejected': rejected, 'window_seconds': window,
+                  'rps': 0.0, 'p50_ms': None, 'p99_ms': None}
+        if recent:
+            recent.sort()
+            result['rps'] = round(len(recent) / window, 3)
+            result['p50_ms'] = round(recent[len(recent) // 2] * 1000, 2)
+            result['p99_ms'] = round(recent[min(len(recent) - 1, int(len(recent) * 0.99))] * 1000, 2)
+        return result
+
+
+class Job:
+    """一个排队中的合成请求，由工作线程执行后通过 done 通知请求线程"""
+
+    def __init__(self, kind, params):
+        self.kind = kind
+        self.params = params
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancelled = False
+
+
+class JobQueue:
+    """有上限的请求队列，丢弃请求时在锁内原地筛选，其余请求的顺序不变"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def put_nowait(self, job):
+        """放入队尾，队列已满或已关闭时返回 False"""
+        with self._cond:
+            if self._closed or len(self._items) >= self.maxsize:
+                return False
+            self._items.append(job)
+            self._cond.notify()
+            return True
+
+    def get(self):
+        """取出队首的请求，队列为空时等待；关闭后返回 None"""
+        with self._cond:
+            while not self._items and not self._closed:
+                self._cond.wait()
+            return None if self._closed else self._items.popleft()
+
+    def remove_if(self, predicate):
+        """移除所有满足 predicate 的请求并按原顺序返回"""
+        with self._cond:
+            removed = [job for job in self._items if predicate(job)]
+            if removed:
+                self._items = deque(job for job in self._items if not predicate(job))
+            return removed
+
+    def close(self):
+        """关闭队列：之后不再接受请求，等待中的 get() 返回 None"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def qsize(self):
+        with self._cond:
+            return len(self._items)
+
+
+class SynthesisDaemon:
+    """常驻的合成服务：保持引擎预热，通过本机 HTTP 接口接收请求
+
+    所有请求按顺序交给同一个工作线程执行（pyttsx3 引擎不是线程安全的）；
+    排队请求超过 max_queue 时返回 503，实现背压。
+
+    浏览器中打开的网页也能向本机端口发请求，因此带 Origin 头的请求一律拒绝（403），
+    POST 的 Content-Type 必须是 application/json（415）；设置 token 时每个请求都要带上
+    Authorization: Bearer <token>（401）。监听非本机地址时必须设置 token。接口：
+
+    - POST /speak   {"text", "rate", "volume", "voice_id", "wait"}  朗读（wait 为 false 时入队后立即返回）
+    - POST /render  {"text", "rate", "volume", "voice_id"}  合成并返回 WAV 数据
+    - GET  /voices  列出语音
+    - POST /stop    停止当前朗读并丢弃排队中的朗读请求
+    - GET  /stats   请求数、每秒请求数、p50/p99 延迟和队列长度，以及引擎重建次数和 runAndWait() 的尾部延迟
+    """
+
+    def __init__(self, engine_manager, host=DEFAULT_HOST, port=DEFAULT_PORT, max_queue=DEFAULT_MAX_QUEUE,
+                 default_rate=150, default_volume=1.0, default_voice_id=None, token=None):
+        if not token and not is_loopback(host):
+            raise ValueError(f"监听非本机地址 {host} 时必须设置访问令牌")
+        self.engine_manager = engine_manager
+        self.token = token or None
+        self.defaults = {'rate': default_rate, 'volume': default_volume, 'voice_id': default_voice_id}
+        self.jobs = JobQueue(max_queue)
+        self.stats = LatencyStats()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.synthesis = self
+        self._worker_thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address[:2]
+
+    def start(self):
+        """启动工作线程并预热引擎和语音列表"""
+        self.engine_manager.acquire(**self.defaults)
+        self._worker_thread = threading.Thread(target=self._worker, daemon=True)
+        self._worker_thread.start()
+
+    def serve_forever(self):
+        if self._worker_thread is None:
+            self.start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """停止接收请求并结束工作线程"""
+        self.server.server_close()
+        self.engine_manager.stop()
+        self.jobs.close()
+        self._cancel_queued('服务已关闭')
+
+    def submit(self, kind, params):
+        """放入队列，队列已满时返回 None"""
+        job = Job(kind, params)
+        if not self.jobs.put_nowait(job):
+            with self.stats.lock:
+                self.stats.rejected += 1
+            return None
+        return job
+
+    def _settings(self, params):
+        return (params.get('rate', self.defaults['rate']),
+                params.get('volume', self.defaults['volume']),
+                params.get('voice_id', self.defaults['voice_id']))
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            try:
+                job.result = self._run(job)
+            except Exception as e:
+                job.error = str(e)
+            finally:
+                job.done.set()
+
+    def _run(self, job):
+        text = job.params.get('text', '')
+        rate, volume, voice_id = self._settings(job.params)
+        if job.kind == 'speak':
+            self.engine_manager.speak(text, rate, volume, voice_id, requested_at=job.params.get('_queued_at'))
+            return {'ok': True}
+        if job.kind == 'render':
+            return {'ok': True, 'audio': self._render_bytes(text, rate, volume, voice_id)}
+        raise ValueError(f"未知的请求类型：{job.kind}")
+
+    def _render_bytes(self, text, rate, volume, voice_id):
+        """合成并返回 WAV 数据，启用音频缓存时重复的文本直接读取缓存"""
+        if self.engine_manager.audio_cache is not None:
+            path = self.engine_manager.render_cached(text, rate, volume, voice_id)
+            if path:
+                with open(path, 'rb') as f:
+                    return f.read()
+        fd, path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            self.engine_manager.render(text, path, rate, volume, voice_id)
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def _cancel_queued(self, reason, kinds=None):
+        """丢弃排队中的请求（可只丢弃指定类型），返回丢弃的数量"""
+        jobs = self.jobs.remove_if(lambda job: kinds is None or job.kind in kinds)
+        for job in jobs:
+            job.error = reason
+            job.cancelled = True
+            job.done.set()
+        return len(jobs)
+
+    def stop(self):
+        """停止当前朗读并丢弃排队中的朗读请求"""
+        cancelled = self._cancel_queued('已停止', kinds=('speak',))
+        self.engine_manager.stop()
+        return {'ok': True, 'cancelled': cancelled}
+
+    def voices(self):
+        voices = self.engine_manager.load_voices()
+        return {'ok': True, 'voices': [
+            {'id': v.id, 'name': v.name, 'languages': v.languages, 'gender': v.gender, 'age': v.age}
+            for v in voices
+        ]}
+
+    def status(self):
+        result = self.stats.summary()
+        result['queue'] = self.jobs.qsize()
+        result['max_queue'] = self.jobs.maxsize
+        if self.engine_manager.watchdog is not None:
+            result['engine'] = self.engine_manager.watchdog.summary()
+        return result
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reject(self, status, message):
+        """请求内容还没有读取，回复后关闭连接，避免剩下的内容被当作下一个请求"""
+        self.close_connection = True
+        self._send_json(status, {'error': message})
+
+    def _authorize(self):
+        """检查来源和令牌，不通过时发送错误响应并返回 False"""
+        if self.headers.get('Origin') is not None:
+            # 浏览器发出的跨站请求都带 Origin，命令行和脚本客户端不会带
+            self._reject(403, "不接受来自浏览器网页的请求")
+            return False
+        token = self.server.synthesis.token
+        if token is not None:
+            expected = f"Bearer {token}".encode('utf-8')
+            if not hmac.compare_digest(self.headers.get('Authorization', '').encode('utf-8'), expected):
+                self._reject(401, "缺少或错误的访问令牌")
+                return False
+        return True
+
+    def _read_json(self):
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            # 网页可以不经预检发出 text/plain 等“简单请求”，只接受 JSON
+            raise TypeError("Content-Type 必须是 application/json")
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        payload = json.loads(self.rfile.read(length).decode('utf-8'))
+        if not isinstance(payload, dict):
+            raise ValueError("请求内容必须是 JSON 对象")
+        return payload
+
+    def do_GET(self):
+        synthesis = self.server.synthesis
+        if not self._authorize():
+            return
+        if self.path == '/voices':
+            try:
+                self._send_json(200, synthesis.voices())
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+        elif self.path == '/stats':
+            self._send_json(200, synthesis.status())
+        else:
+            self._send_json(404, {'error': f"未知的路径：{self.path}"})
+
+    def do_POST(self):
+        synthesis = self.server.synthesis
+        start = time.perf_counter()
+        if not self._authorize():
+            return
+        try:
+            params = self._read_json()
+        except TypeError as e:
+            self._reject(415, str(e))
+            return
+        except ValueError as e:
+            self._send_json(400, {'error': f"无法解析请求：{e}"})
+            return
+        if self.path == '/stop':
+            self._send_json(200, synthesis.stop())
+            return
+        if self.path not in ('/speak', '/render'):
+            self._send_json(404, {'error': f"未知的路径：{self.path}"})
+            return
+        if not str(params.get('text', '')).strip():
+            self._send_json(400, {'error': "缺少要合成的文本 text"})
+            return
+        params['_queued_at'] = start
+        job = synthesis.submit(self.path[1:], params)
+        if job is None:
+            self._send_json(503, {'error': "队列已满，请稍后重试"}, {'Retry-After': '1'})
+            return
+        if self.path == '/speak' and params.get('wait') is False:
+            self._send_json(202, {'ok': True, 'queued': True})
+            return
+        if not job.done.wait(REQUEST_TIMEOUT):
+            self._send_json(504, {'error': "等待合成超时"})
+            return
+        if job.cancelled:
+            self._send_json(409, {'error': job.error, 'cancelled': True})
+            return
+        if job.error:
+            self._send_json(500, {'error': job.error})
+            return
+        synthesis.stats.add(time.perf_counter() - start)
+        audio = job.result.pop('audio', None) if isinstance(job.result, dict) else None
+        if audio is None:
+            self._send_json(200, job.result)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/wav')
+        self.send_header('Content-Length', str(len(audio)))
+        self.end_headers()
+        self.wfile.write(audio)
+
+
+def call(method, path, payload=None, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=REQUEST_TIMEOUT, token=None):
+    """向合成服务发送请求，返回 (状态码, Content-Type, 响应内容)；token 为空时读取环境变量 SHITTTS_SERVE_TOKEN"""
+    if payload is None and method == 'POST':
+        payload = {}
+    data = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else None
+    headers = {'Content-Type': 'application/json'} if data is not None else {}
+    token = token or os.environ.get(TOKEN_ENV)
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    req = urlrequest.Request(f"http://{host}:{port}{path}", data=data, method=method, headers=headers)
+    try:
+        with urlrequest.urlopen(req, timeout=timeout) as resp:
+            return resp.status, resp.headers.get('Content-Type', ''), resp.read()
+    except HTTPError as e:
+        return e.code, e.headers.get('Content-Type', ''), e.read()
+
+
+def run_client(args):
+    """客户端命令：把请求发给正在运行的合成服务并输出结果，返回退出码"""
+    payload = None
+    if args.action in ('speak', 'render'):
+        payload = {'text': args.text}
+        for key in ('rate', 'volume', 'voice_id'):
+            value = getattr(args, key, None)
+            if value is not None:
+                payload[key] = value
+        if args.action == 'speak' and args.no_wait:
+            payload['wait'] = False
+    method, path = {'speak': ('POST', '/speak'), 'render': ('POST', '/render'), 'voices': ('GET', '/voices'),
+                    'stop': ('POST', '/stop'), 'stats': ('GET', '/stats')}[args.action]
+    try:
+        status, content_type, body = call(method, path, payload, args.host, args.port, token=args.token)
+    except (URLError, OSError) as e:
+        echo(f"无法连接合成服务 {args.host}:{args.port}：{e}")
+        return 2
+    if content_type.startswith('audio/'):
+        with open(args.output, 'wb') as f:
+            f.write(body)
+        echo(f"已保存：{args.output}（{len(body)} 字节）")
+        return 0
+    try:
+        result = json.loads(body.decode('utf-8'))
+    except ValueError:
+        result = {'error': body.decode('utf-8', errors='replace')}
+    if status >= 400:
+        echo(f"请求失败（{status}）：{result.get('error')}")
+        return 1
+    if args.action == 'voices':
+        for i, voice in enumerate(result['voices'], 1):
+            echo(f"{i}. {voice['name']} ({voice['id']})")
+    elif args.action == 'stats':
+        echo(json.dumps(result, ensure_ascii=False, indent=2))
+    elif args.action == 'speak':
+        echo("已加入队列" if result.get('queued') else "朗读完成")
+    elif args.action == 'stop':
+        echo(f"已停止，丢弃 {result.get('cancelled', 0)} 个排队中的请求")
+    return 0
@@ -0,0 +1,502 @@
+import contextlib
+import os
+import threading
+import time
+
+from audio_player import WavPlayer
+from audio_sink import UnsupportedAudioFormat
+from console import echo
+from engine_watchdog import EngineThread, EngineTimeout, EngineWatchdog
+from metrics import make_record
+from voice_registry import VoiceRegistry
+
+
+def stretch_rate_setting(value=None):
+    """时间伸缩模式的基准语速：配置值，未配置时读取环境变量 SHITTTS_TIME_STRETCH_RATE；None 表示关闭"""
+    if value is None:
+        value = os.environ.get('SHITTTS_TIME_STRETCH_RATE') or None
+    try:
+        return int(value) if value is not None and int(value) > 0 else None
+    except (TypeError, ValueError):
+        echo(f"时间伸缩基准语速无效：{value}，已关闭时间伸缩")
+        return None
+
+
+class EngineManager:
+    """长期复用的语音引擎管理器
+
+    引擎只创建一次，之后每次朗读都复用同一个实例；
+    rate / volume / voice 只在发生变化时才重新设置；
+    只有在朗读真正出错后才会丢弃引擎并在下次使用时重建。
+    指定 audio_cache 时，朗读会先合成到缓存文件再播放，重复朗读直接播放缓存。
+    指定 metrics（MetricsRecorder）时，每次朗读/合成都会记录引擎创建、语音查找、
+    say()、runAndWait() 等各阶段的耗时。
+    启用缓存且安装了 NumPy 时，音频按原始音量合成、播放时再做软件增益，
+    不同音量共用同一份缓存，调节音量不需要重新合成。
+    设置 stretch_base_rate 后（时间伸缩模式），音频统一按该语速合成，播放时用 WSOLA
+    伸缩到所需语速，调节语速也不需要重新合成；伸缩倍数超出
+    audio_dsp.MIN_SPEED..MAX_SPEED 时仍按所需语速合成。
+    安装了 NumPy 时，合成到文件（包括缓存、批量合成）后会裁掉首尾的静音，
+    silence_trim 为传给 audio_dsp.trim_silence 的参数（threshold_db、guard_ms），None 表示不裁剪。
+    SAPI5 和 NSSpeechSynthesizer 要求引擎在同一个线程中创建和使用，因此无论从哪个线程调用
+    （朗读线程、预渲染线程、服务的工作线程），引擎的所有操作都交给一个引擎线程执行。
+    指定 watchdog（EngineWatchdog，默认启用）时使用看门狗的引擎线程，runAndWait()
+    超过按文本长度和语速计算的期限仍未返回时放弃卡住的引擎线程，在新的引擎线程中创建新的引擎并重试，
+    重试仍超时则抛出 EngineTimeout；watchdog 为 None 时使用不限制等待时间的引擎线程。
+    """
+
+    def __init__(self, driver_name=None, registry=None, audio_cache=None, metrics=None):
+        self.driver_name = driver_name
+        self.registry = registry or VoiceRegistry(driver_name)
+        self.audio_cache = audio_cache
+        self.metrics = metrics
+        # 每个线程当前朗读/合成的分阶段耗时，只在启用 metrics 时使用
+        self._local = threading.local()
+        self._active_voice = None
+        self.player = WavPlayer()
+        # 是否安装了 NumPy：None 表示尚未检查
+        self._dsp = None
+        # 是否在播放时用软件增益调节音量：None 表示尚未检查
+        self.post_gain = None
+        # 合成后裁剪首尾静音的参数，None 表示不裁剪
+        self.silence_trim = {}
+        # 时间伸缩模式的基准语速，None 表示关闭
+        self.stretch_base_rate = None
+        # 监督 runAndWait() 的看门狗，None 表示不监督
+        self.watchdog = EngineWatchdog()
+        self.engine = None
+        # 创建当前引擎的线程，引擎只在该线程中使用
+        self._engine_owner = None
+        # 不启用看门狗时使用的引擎线程
+        self._executor = None
+        # 引擎卡住后是否已被重建：重建时不再使用 pyttsx3.init() 缓存的实例
+        self._restarted = False
+        self.lock = threading.RLock()
+        # 已经应用到引擎上的属性，用于判断是否需要重新 setProperty
+        self._applied = {}
+        self._utterance_start = None
+        # 驱动发出 started-utterance 的时间点，回调在引擎线程中执行，由朗读线程计入统计
+        self._utterance_heard = None
+        # 正在朗读的句子开始时的停止计数，朗读中收到 started-word 回调时用来判断是否需要停止
+        self._utterance_generation = None
+        # 每次 stop() 自增，用于判断合成期间是否收到了停止请求
+        self._stop_generation = 0
+        # 计时统计：引擎创建次数、最近一次准备耗时、最近一次首音耗时
+        self.stats = {
+            'init_count': 0,
+            'init_seconds': 0.0,
+            'last_setup_seconds': 0.0,
+            'last_first_audio_seconds': None,
+            # 裁剪首尾静音：裁剪过的文件数、累计和最近一次去掉的时长
+            'trimmed_files': 0,
+            'trimmed_seconds': 0.0,
+            'last_trimmed_seconds': None,
+        }
+
+    def _create_engine(self):
+        """创建新的引擎实例并注册回调"""
+        start = time.perf_counter()
+        # 第一次朗读或查询语音时才导入 pyttsx3，加快程序启动
+        import pyttsx3
+        # pyttsx3.init() 按驱动名缓存实例，卡住的引擎仍在缓存中，重建时直接创建新的实例
+        engine = pyttsx3.Engine(self.driver_name) if self._restarted else pyttsx3.init(self.driver_name)
+        engine.connect('started-utterance', self._on_started_utterance)
+        engine.connect('started-word', self._on_started_word)
+        self.stats['init_count'] += 1
+        self.stats['init_seconds'] = time.perf_counter() - start
+        self._phase('engine_init', start)
+        return engine
+
+    def _on_started_utterance(self, name=None):
+        if self._utterance_start is not None:
+            self._utterance_heard = time.perf_counter()
+            self._utterance_start = None
+
+    def _on_started_word(self, name=None, location=None, length=None):
+        """有的驱动在其他线程调用 stop() 时不会立即停下，在引擎线程的单词回调中再停止一次"""
+        generation = self._utterance_generation
+        if generation is not None and generation != self._stop_generation:
+            self._utterance_generation = None
+            engine = self.engine
+            if engine is not None:
+                engine.stop()
+
+    def _record_first_audio(self, start, heard=None):
+        self.stats['last_first_audio_seconds'] = (heard or time.perf_counter()) - start
+        if self.metrics is not None:
+            self._local.first_audio = self.stats['last_first_audio_seconds']
+
+    def _phase(self, name, start, end=None):
+        """把从 start 到 end（默认为现在）的耗时累计到当前线程的阶段统计中（未启用 metrics 时直接返回）"""
+        if self.metrics is None:
+            return
+        phases = self._local.__dict__.setdefault('phases', {})
+        phases[name] = phases.get(name, 0.0) + (end or time.perf_counter()) - start
+
+    @contextlib.contextmanager
+    def _measure(self, kind, text, rate, volume, voice_id, requested_at=None):
+        """统计一次朗读/合成并输出一条记录
+
+        嵌套调用（朗读时合成到缓存）只在最外层输出；之前单独调用 acquire()
+        产生的引擎创建、语音查找耗时会计入紧接着的这次朗读。
+        """
+        if self.metrics is None:
+            yield
+            return
+        local = self._local
+        depth = getattr(local, 'depth', 0)
+        local.depth = depth + 1
+        if depth == 0:
+            local.first_audio = None
+            local.trimmed = None
+            local.playback = None
+            local.restarts = 0
+            # 之前单独调用 acquire() 时累计的阶段耗时也计入总耗时
+            carried = sum(local.__dict__.get('phases', {}).values())
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            local.depth = depth
+            if depth == 0:
+                phases = local.__dict__.pop('phases', {})
+                if requested_at is not None:
+                    phases['queue_wait'] = max(start - requested_at, 0.0)
+                total = time.perf_counter() - (requested_at if requested_at is not None else start) + carried
+                self.metrics.record(make_record(
+                    kind, text, rate, volume, voice_id or self._active_voice, total, phases,
+                    first_audio=local.first_audio, trimmed=local.trimmed, playback=local.playback,
+                    restarts=local.restarts, error=error))
+
+    def _resolve_voice(self, engine, voice_id):
+        """根据 voice_id 选择语音，未指定时优先选择中文语音，返回实际使用的 voice_id"""
+        self.registry.load(lambda: engine)
+        if voice_id:
+            if self.registry.get(voice_id):
+                return voice_id
+            echo(f"警告：未找到指定的语音ID '{voice_id}'，使用默认语音。")
+            return None
+        chinese_voice = self.registry.chinese_voice()
+        if chinese_voice:
+            return chinese_voice.id
+        echo("警告：未找到中文语音，可能使用默认语音。")
+        return None
+
+    def _unsupervised(self):
+        """不启用看门狗时使用的引擎线程，第一次使用时创建"""
+        if self._executor is None:
+            self._executor = EngineThread()
+        return self._executor
+
+    def _call(self, func):
+        """在引擎线程中调用 func()；启用看门狗时引擎卡住则丢弃引擎后抛出 EngineTimeout"""
+        if self.watchdog is None:
+            return self._unsupervised().call(self._bind_phases(func))
+        try:
+            return self.watchdog.call(self._bind_phases(func))
+        except EngineTimeout:
+            self.restart()
+            raise
+
+    def _bind_phases(self, func):
+        """让 func 在引擎线程中记录的阶段耗时计入调用线程的统计"""
+        if self.metrics is None:
+            return func
+        phases = self._local.__dict__.setdefault('phases', {})
+
+        def bound():
+            if self._local.__dict__.get('phases') is phases:
+                # 已经在调用线程（引擎线程）中
+                return func()
+            self._local.phases = phases
+            try:
+                return func()
+            finally:
+                del self._local.phases
+        return bound
+
+    def _ensure_engine(self):
+        """返回当前引擎，不存在或不是在当前引擎线程中创建时新建一个"""
+        current = threading.current_thread()
+        if self.engine is not None and self._engine_owner is not current:
+            self.engine = None
+        if self.engine is None:
+            self.engine = self._create_engine()
+            self._engine_owner = current
+            self._applied = {}
+        return self.engine
+
+    def get_engine(self):
+        """返回当前引擎，不存在时创建"""
+        with self.lock:
+            return self._call(self._ensure_engine)
+
+    def load_voices(self, refresh=False):
+        """返回可用语音列表（优先读取语音缓存），refresh 为 True 时重新枚举；需要时在引擎线程中创建引擎"""
+        load = self.registry.refresh if refresh else self.registry.load
+        with self.lock:
+            return self._call(lambda: load(self._ensure_engine))
+
+    def acquire(self, rate=150, volume=1.0, voice_id=None):
+        """获取可用的引擎，并只应用发生变化的属性"""
+        with self.lock:
+            return self._call(lambda: self._configure(rate, volume, voice_id))
+
+    def _configure(self, rate, volume, voice_id):
+        """acquire() 的实际操作，在持有 lock 的线程或引擎线程中执行"""
+        start = time.perf_counter()
+        engine = self._ensure_engine()
+        if self._applied.get('rate') != rate:
+            engine.setProperty('rate', rate)
+            self._applied['rate'] = rate
+        if self._applied.get('volume') != volume:
+            engine.setProperty('volume', volume)
+            self._applied['volume'] = volume
+        # 以请求的 voice_id 为键，避免每次都扫描语音列表
+        if 'voice' not in self._applied or self._applied['voice'] != voice_id:
+            lookup_start = time.perf_counter()
+            resolved = self._resolve_voice(engine, voice_id)
+            self._phase('voice_lookup', lookup_start)
+            self._active_voice = resolved
+            if resolved:
+                try:
+                    engine.setProperty('voice', resolved)
+                except Exception:
+                    # 缓存中的语音可能已被卸载，下次重新枚举
+                    self.registry.invalidate()
+                    raise
+            self._applied['voice'] = voice_id
+        self.stats['last_setup_seconds'] = time.perf_counter() - start
+        return engine
+
+    def render(self, text, path, rate=150, volume=1.0, voice_id=None, name=None):
+        """将文本合成到音频文件，出错时重置引擎后抛出异常
+
+        name 会随 pyttsx3 的 started-utterance / finished-utterance 等回调一起传回
+        """
+        with self._measure('render', text, rate, volume, voice_id), self.lock:
+            self._run(lambda engine: engine.save_to_file(text, path, name), 'save_to_file',
+                      text, rate, volume, voice_id)
+        self._trim(path)
+
+    def _run(self, queue, phase, text, rate, volume, voice_id, generation=None):
+        """获取引擎，调用 queue(engine) 排入命令（计入 phase 阶段）后执行 runAndWait()
+
+        获取引擎、排入命令和 runAndWait() 都在引擎线程中执行；启用看门狗时（有的驱动在排入命令时
+        就开始合成，因此两者一起计时）超过期限时放弃卡住的引擎线程，在新的引擎线程中重建引擎，按 watchdog.retries
+        重试；收到停止请求（generation 已变化）后驱动仍不返回时提前视为卡住，重建引擎后按已停止返回。
+        其他错误重置引擎后抛出。调用方需持有 lock。
+        """
+        attempt = 0
+        while True:
+            # 引擎线程中记录的时间点：排入命令开始、runAndWait() 开始
+            marks = {}
+
+            def work():
+                engine = self._configure(rate, volume, voice_id)
+                marks['queue'] = time.perf_counter()
+                queue(engine)
+                marks['run'] = time.perf_counter()
+                engine.runAndWait()
+
+            start = time.perf_counter()
+            try:
+                if self.watchdog is None:
+                    self._unsupervised().call(self._bind_phases(work))
+                else:
+                    stopped = None if generation is None else lambda: generation != self._stop_generation
+                    self.watchdog.run(self._bind_phases(work), self.watchdog.deadline(text, rate), stopped)
+                return
+            except EngineTimeout as e:
+                self.restart()
+                if generation is not None and generation != self._stop_generation:
+                    return
+                if attempt >= self.watchdog.retries:
+                    self.watchdog.count('failures')
+                    raise
+                attempt += 1
+                self.watchdog.count('retries')
+                echo(f"{e}，已重新创建引擎，重试第 {attempt} 次")
+            except Exception:
+                self.reset()
+                raise
+            finally:
+                # 超时的也计入 run_and_wait，尾部延迟能反映卡住的情况
+                if 'run' in marks:
+                    self._phase(phase, marks['queue'], marks['run'])
+                self._phase('run_and_wait', marks.get('run', start))
+
+    def _trim(self, path):
+        """裁剪合成结果首尾的静音，记录去掉的时长"""
+        self.stats['last_trimmed_seconds'] = None
+        if self.trim_setting() is None or not os.path.exists(path):
+            return
+        import audio_dsp
+        phase_start = time.perf_counter()
+        try:
+            removed = audio_dsp.trim_wav_file(path, **self.silence_trim)
+        except (ValueError, TypeError) as e:
+            # 驱动生成的不是 16 位 PCM WAV，或配置的参数有误：本次运行不再裁剪
+            echo(f"无法裁剪静音（{e}），已关闭静音裁剪")
+            self.silence_trim = None
+            return
+        self._phase('trim', phase_start)
+        self.stats['trimmed_files'] += 1
+        self.stats['trimmed_seconds'] += removed
+        self.stats['last_trimmed_seconds'] = removed
+        if self.metrics is not None:
+            self._local.trimmed = (getattr(self._local, 'trimmed', None) or 0.0) + removed
+
+    def _have_dsp(self):
+        """是否安装了 NumPy（第一次调用时才导入，不拖慢程序启动）"""
+        if self._dsp is None:
+            import audio_dsp
+            self._dsp = audio_dsp.available()
+        return self._dsp
+
+    def can_cache(self):
+        """是否启用了音频缓存并且能够直接播放音频文件"""
+        return self.audio_cache is not None and self.player.available()
+
+    def software_volume(self):
+        """是否由播放器用软件增益调节音量（需要音频缓存和 NumPy）"""
+        if not self.can_cache():
+            return False
+        if self.post_gain is None:
+            self.post_gain = self._have_dsp()
+        return self.post_gain
+
+    def cache_volume(self, volume):
+        """合成到缓存时使用的音量：软件调节音量时统一按原始音量合成"""
+        return 1.0 if self.software_volume() else volume
+
+    def stretch_speed(self, rate):
+        """时间伸缩模式下由基准语速的音频得到 rate 需要的加速倍数，不使用时间伸缩时返回 None"""
+        if not self.stretch_base_rate or not self.software_volume():
+            return None
+        import audio_dsp
+        speed = rate / float(self.stretch_base_rate)
+        if speed == 1.0 or not audio_dsp.MIN_SPEED <= speed <= audio_dsp.MAX_SPEED:
+            return None
+        return speed
+
+    def cache_rate(self, rate):
+        """合成到缓存时使用的语速：时间伸缩时按基准语速合成"""
+        return self.stretch_base_rate if self.stretch_speed(rate) else rate
+
+    def set_playback_volume(self, volume):
+        """调节正在播放的音频的音量（仅在软件调节音量时有效）"""
+        if self.post_gain:
+            self.player.set_gain(volume)
+
+    def trim_setting(self):
+        """合成后实际使用的静音裁剪参数，不裁剪（关闭或没有 NumPy）时为 None"""
+        if self.silence_trim is None or not self._have_dsp():
+            return None
+        return self.silence_trim
+
+    def render_cached(self, text, rate=150, volume=1.0, voice_id=None):
+        """合成到音频缓存（已缓存时不再合成），返回缓存文件路径；静音裁剪参数也是缓存键的一部分"""
+        return self.audio_cache.get_or_render(
+            text, rate, volume, voice_id,
+            lambda t, p: self.render(t, p, rate, volume, voice_id), trim=self.trim_setting())
+
+    def speak(self, text, rate=150, volume=1.0, voice_id=None, requested_at=None, on_rendered=None, name=None):
+        """使用复用的引擎朗读文本，出错时重置引擎后抛出异常；返回 True 表示完整朗读，False 表示被停止
+
+        requested_at 为请求产生的时间（time.perf_counter），用于统计从请求到出声的延迟；
+        on_rendered 在音频合成完成、开始播放前调用（用于安排后续块的预渲染）；
+        name 会随 pyttsx3 的 started-utterance / started-word / finished-utterance 回调一起传回
+        """
+        with self._measure('speak', text, rate, volume, voice_id, requested_at):
+            return self._speak(text, rate, volume, voice_id, requested_at, on_rendered, name)
+
+    def _speak(self, text, rate, volume, voice_id, requested_at, on_rendered, name):
+        start = requested_at if requested_at is not None else time.perf_counter()
+        generation = self._stop_generation
+        if self.can_cache():
+            gain = volume if self.software_volume() else None
+            speed = self.stretch_speed(rate)
+            path = self.render_cached(text, self.cache_rate(rate), self.cache_volume(volume), voice_id)
+            if generation != self._stop_generation:
+                return False
+            if path:
+                if on_rendered:
+                    on_rendered()
+                self._record_first_audio(start)
+                # 播放时不持有引擎锁，后台可以同时合成下一块
+                phase_start = time.perf_counter()
+                try:
+                    completed = self.player.play(path, gain, speed)
+                except UnsupportedAudioFormat as e:
+                    # 驱动生成的不是 16 位 PCM WAV：改回由引擎调节音量和语速
+                    echo(f"无法用软件处理音频（{e}），改为合成时设置音量和语速")
+                    self.post_gain = False
+                    completed = self.player.play(self.render_cached(text, rate, volume, voice_id))
+                self._phase('play', phase_start)
+                if self.metrics is not None:
+                    self._local.playback = self.player.last_playback
+                return completed
+        with self.lock:
+            self._utterance_start = start
+            self._utterance_heard = None
+            self._utterance_generation = generation
+            try:
+                self._run(lambda engine: engine.say(text, name), 'say', text, rate, volume, voice_id, generation)
+            finally:
+                self._utterance_start = None
+                self._utterance_generation = None
+                if self._utterance_heard is not None:
+                    self._record_first_audio(start, self._utterance_heard)
+            return generation == self._stop_generation
+
+    def stop(self):
+        """停止当前朗读，不销毁引擎"""
+        self._stop_generation += 1
+        self.player.stop()
+        engine = self.engine
+        if engine is not None:
+            try:
+                engine.stop()
+            except Exception:
+                pass
+
+    def reset(self):
+        """丢弃当前引擎，下次使用时重新创建"""
+        engine = self.engine
+        self.engine = None
+        self._applied = {}
+        if engine is not None:
+            try:
+                engine.stop()
+            except Exception:
+                pass
+
+    def restart(self):
+        """引擎卡住时调用：停止并丢弃当前引擎，下次使用时用 pyttsx3.Engine() 创建新的驱动
+
+        卡住的线程仍然引用旧引擎，pyttsx3.init() 会返回同一个实例，因此重建时不经过它的缓存。
+        卡住的驱动的 stop() 也可能不返回，在守护线程中调用。
+        """
+        engine = self.engine
+        self.engine = None
+        self._engine_owner = None
+        self._applied = {}
+        self._restarted = True
+        if engine is not None:
+            threading.Thread(target=self._stop_engine, args=(engine,), daemon=True, name='engine-stop').start()
+        if self.watchdog is not None:
+            self.watchdog.count('restarts')
+        if self.metrics is not None:
+            self._local.restarts = getattr(self._local, 'restarts', 0) + 1
+
+    @staticmethod
+    def _stop_engine(engine):
+        try:
+            engine.stop()
+        except Exception:
+            pass
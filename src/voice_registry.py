@@ -0,0 +1,201 @@
+import json
+import os
+import sys
+import time
+
+from console import echo
+
+CACHE_FILE = 'voices_cache.json'
+# 无法计算指纹（没有已知的语音目录或注册表项）时，缓存最多使用的时长（秒），过期后重新枚举
+UNVERIFIED_MAX_AGE = 24 * 3600
+
+# 各平台语音的安装位置，目录或注册表项变化即视为语音集合发生变化
+_VOICE_DIRS = {
+    # espeak-ng 的语言定义在 lang 目录，voices 目录只有变体
+    'espeak': [
+        '/usr/share/espeak-ng-data/voices',
+        '/usr/share/espeak-ng-data/lang',
+        '/usr/lib/x86_64-linux-gnu/espeak-ng-data/voices',
+        '/usr/lib/x86_64-linux-gnu/espeak-ng-data/lang',
+        '/usr/lib/aarch64-linux-gnu/espeak-ng-data/voices',
+        '/usr/lib/aarch64-linux-gnu/espeak-ng-data/lang',
+        '/usr/share/espeak-data/voices',
+        '/usr/local/share/espeak-ng-data/voices',
+        '/usr/local/share/espeak-ng-data/lang',
+    ],
+    'nsss': [
+        '/System/Library/Speech/Voices',
+        '/Library/Speech/Voices',
+        os.path.expanduser('~/Library/Speech/Voices'),
+    ],
+}
+_VOICE_DIRS['avspeech'] = _VOICE_DIRS['nsss']
+
+_SAPI_KEYS = [
+    r'SOFTWARE\Microsoft\Speech\Voices\Tokens',
+    r'SOFTWARE\Microsoft\Speech_OneCore\Voices\Tokens',
+]
+
+_CJK_LANGUAGE_PREFIXES = ('zh', 'cmn', 'yue', 'hak', 'nan', 'wuu')
+
+
+def voice_fingerprint(driver_name):
+    """计算已安装语音集合的指纹，无法判断时返回 None"""
+    parts = []
+    if driver_name == 'sapi5' and sys.platform == 'win32':
+        import winreg
+        for key_path in _SAPI_KEYS:
+            try:
+                with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path) as key:
+                    subkeys, _, modified = winreg.QueryInfoKey(key)
+                    parts.append(f"{key_path}:{subkeys}:{modified}")
+            except OSError:
+                continue
+    else:
+        for path in _VOICE_DIRS.get(driver_name, []):
+            try:
+                parts.append(f"{path}:{os.stat(path).st_mtime_ns}")
+            except OSError:
+                continue
+    return '|'.join(parts) if parts else None
+
+
+def _text(value):
+    """驱动返回的字段可能是 bytes，统一转换为字符串"""
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='ignore').lstrip('\x05')
+    return value
+
+
+def is_chinese_voice(voice):
+    """判断是否为中文（普通话/粤语等）语音"""
+    if "Chinese" in voice.name or "Chinese" in voice.id or "Mandarin" in voice.name:
+        return True
+    for lang in voice.languages or []:
+        if str(lang).lower().replace('_', '-').startswith(_CJK_LANGUAGE_PREFIXES):
+            return True
+    return False
+
+
+class VoiceRegistry:
+    """语音注册表
+
+    语音只枚举一次，并按 id、名称、语言建立索引，另外单独维护中文语音索引；
+    枚举结果按驱动和平台缓存到磁盘，只有已安装的语音发生变化时才重新枚举。
+    无法计算指纹时不能判断语音是否变化，缓存超过 UNVERIFIED_MAX_AGE 秒后重新枚举。
+    """
+
+    def __init__(self, driver_name=None, cache_file=CACHE_FILE):
+        self._driver_name = driver_name
+        self.cache_file = cache_file
+        self.loaded = False
+        self._set_voices([])
+
+    @property
+    def driver_name(self):
+        """未指定驱动时使用平台默认驱动（用到时才导入 pyttsx3）"""
+        if self._driver_name is None:
+            from pyttsx3.engine import default_engine_by_sys_platform
+            self._driver_name = default_engine_by_sys_platform()
+        return self._driver_name
+
+    @property
+    def cache_key(self):
+        import platform
+        return f"{self.driver_name}|{platform.system()}|{platform.release()}"
+
+    def _set_voices(self, voices):
+        """重建内存索引"""
+        self.voices = voices
+        self.by_id = {}
+        self.chinese = []
+        for voice in voices:
+            self.by_id[voice.id] = voice
+            if is_chinese_voice(voice):
+                self.chinese.append(voice)
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, fingerprint):
+        cache = self._read_cache()
+        cache[self.cache_key] = {
+            'fingerprint': fingerprint,
+            'saved_at': time.time(),
+            'voices': [
+                {'id': v.id, 'name': v.name, 'languages': v.languages, 'gender': v.gender, 'age': v.age}
+                for v in self.voices
+            ],
+        }
+        try:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False, indent=4)
+        except OSError as e:
+            echo(f"保存语音缓存出错：{e}")
+
+    def load(self, engine_getter):
+        """加载语音列表，优先使用内存和磁盘缓存，engine_getter 仅在需要枚举时调用"""
+        if self.loaded:
+            return self.voices
+        fingerprint = voice_fingerprint(self.driver_name)
+        entry = self._read_cache().get(self.cache_key)
+        if entry and self._entry_valid(entry, fingerprint):
+            from pyttsx3.voice import Voice
+            try:
+                self._set_voices([
+                    Voice(v['id'], v['name'], v.get('languages') or [], v.get('gender'), v.get('age'))
+                    for v in entry['voices']
+                ])
+                self.loaded = True
+                return self.voices
+            except (KeyError, TypeError):
+                pass
+        return self.refresh(engine_getter, fingerprint)
+
+    @staticmethod
+    def _entry_valid(entry, fingerprint):
+        """指纹一致时缓存有效；指纹为 None（无法判断）时只在未过期时使用"""
+        if entry.get('fingerprint') != fingerprint:
+            return False
+        if fingerprint is None:
+            saved_at = entry.get('saved_at')
+            return isinstance(saved_at, (int, float)) and 0 <= time.time() - saved_at < UNVERIFIED_MAX_AGE
+        return True
+
+    def refresh(self, engine_getter, fingerprint=None):
+        """通过驱动重新枚举语音并更新缓存"""
+        if fingerprint is None:
+            fingerprint = voice_fingerprint(self.driver_name)
+        engine = engine_getter()
+        from pyttsx3.voice import Voice
+        voices = []
+        for voice in engine.getProperty('voices') or []:
+            languages = [_text(lang) for lang in (voice.languages or [])]
+            voices.append(Voice(_text(voice.id), _text(voice.name) or '', languages, voice.gender, voice.age))
+        self._set_voices(voices)
+        self.loaded = True
+        self._write_cache(fingerprint)
+        return self.voices
+
+    def invalidate(self):
+        """使缓存失效，下次 load 时重新枚举"""
+        self.loaded = False
+        cache = self._read_cache()
+        if cache.pop(self.cache_key, None) is not None:
+            try:
+                with open(self.cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(cache, f, ensure_ascii=False, indent=4)
+            except OSError:
+                pass
+
+    def get(self, voice_id):
+        """按 id 查找语音"""
+        return self.by_id.get(voice_id)
+
+    def chinese_voice(self):
+        """返回第一个中文语音，没有时返回 None"""
+        return self.chinese[0] if self.chinese else None
@@ -0,0 +1,163 @@
+import os
+import struct
+import wave
+
+# 每次复制的帧数，保证内存占用与文件大小无关
+COPY_FRAMES = 64 * 1024
+_MAX_RIFF = 0xFFFFFFFF
+# 预留给 ds64 的 JUNK 块大小（输出超过 4GB 时改写为 RF64）
+_DS64_SIZE = 28
+
+
+class WavFormatError(ValueError):
+    """待拼接的 WAV 采样格式不一致"""
+
+
+def block_label(index, total, text=None):
+    """与 display_text_block 相同的块编号，附带前 50 个字的摘要"""
+    label = f"第 {index + 1}/{total} 块"
+    if text:
+        label += "：" + text[:50] + ("..." if len(text) > 50 else "")
+    return label
+
+
+def _chunk(fourcc, payload):
+    """构造 RIFF 子块，奇数长度补齐一个字节"""
+    data = fourcc + struct.pack('<I', len(payload)) + payload
+    if len(payload) % 2:
+        data += b'\x00'
+    return data
+
+
+def _cue_chunks(markers):
+    """生成 cue 块和 LIST/adtl 标签块，markers 为 [(采样位置, 标签)]"""
+    if not markers:
+        return b''
+    cue = struct.pack('<I', len(markers))
+    labels = b''
+    for cue_id, (position, label) in enumerate(markers, 1):
+        cue += struct.pack('<II4sIII', cue_id, position, b'data', 0, 0, position)
+        labels += _chunk(b'labl', struct.pack('<I', cue_id) + label.encode('utf-8') + b'\x00')
+    return _chunk(b'cue ', cue) + _chunk(b'LIST', b'adtl' + labels)
+
+
+def concat_wavs(input_paths, output_path, silence_ms=500, labels=None):
+    """把多个 WAV 以流式方式拼接为一个文件
+
+    块与块之间插入 silence_ms 毫秒静音，并在每块开始处写入 cue/LIST 章节标记；
+    所有输入的声道数、采样宽度和采样率必须一致，否则抛出 WavFormatError。
+    输出超过 4GB 时自动写为 RF64。返回 (总帧数, 采样率)。
+    """
+    params = None
+    markers = []
+    frames_written = 0
+    tmp_path = output_path + '.part'
+    try:
+        with open(tmp_path, 'wb') as out:
+            for i, path in enumerate(input_paths):
+                with wave.open(path, 'rb') as w:
+                    current = (w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getcomptype())
+                    if params is None:
+                        params = current
+                        nchannels, sampwidth, framerate, _ = params
+                        frame_size = nchannels * sampwidth
+                        # 8 位 PCM 的静音值为 0x80，其余为 0
+                        silence_frame = (b'\x80' if sampwidth == 1 else b'\x00' * sampwidth) * nchannels
+                        silence = silence_frame * int(framerate * silence_ms / 1000)
+                        data_start = _write_header(out, nchannels, sampwidth, framerate)
+                    elif current != params:
+                        raise WavFormatError(f"'{path}' 的采样格式 {current[:3]} 与 {params[:3]} 不一致")
+                    if i > 0 and silence:
+                        out.write(silence)
+                        frames_written += len(silence) // frame_size
+                    label = labels[i] if labels and i < len(labels) else block_label(i, len(input_paths))
+                    markers.append((frames_written, label))
+                    while True:
+                        data = w.readframes(COPY_FRAMES)
+                        if not data:
+                            break
+                        out.write(data)
+                        frames_written += len(data) // frame_size
+            if params is None:
+                raise WavFormatError("没有可拼接的音频")
+            data_size = out.tell() - data_start
+            if data_size % 2:
+                out.write(b'\x00')
+            out.write(_cue_chunks(markers))
+            _finish_header(out, data_start, data_size, frames_written)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, output_path)
+    return frames_written, params[2]
+
+
+def _write_header(out, nchannels, sampwidth, framerate):
+    """写入 RIFF/WAVE 头（大小字段稍后回填），返回音频数据起始偏移"""
+    out.write(b'RIFF' + struct.pack('<I', 0) + b'WAVE')
+    out.write(_chunk(b'JUNK', b'\x00' * _DS64_SIZE))
+    fmt = struct.pack('<HHIIHH', 1, nchannels, framerate,
+                      framerate * nchannels * sampwidth, nchannels * sampwidth, sampwidth * 8)
+    out.write(_chunk(b'fmt ', fmt))
+    out.write(b'data' + struct.pack('<I', 0))
+    return out.tell()
+
+
+def _finish_header(out, data_start, data_size, frames):
+    """回填 RIFF 和 data 的大小，超过 4GB 时改写为 RF64"""
+    riff_size = out.tell() - 8
+    if riff_size <= _MAX_RIFF and data_size <= _MAX_RIFF:
+        out.seek(4)
+        out.write(struct.pack('<I', riff_size))
+        out.seek(data_start - 4)
+        out.write(struct.pack('<I', data_size))
+        return
+    out.seek(0)
+    out.write(b'RF64' + struct.pack('<I', _MAX_RIFF) + b'WAVE')
+    out.write(b'ds64' + struct.pack('<IQQQI', _DS64_SIZE, riff_size, data_size, frames, 0))
+    out.seek(data_start - 4)
+    out.write(struct.pack('<I', _MAX_RIFF))
+
+
+def read_markers(path):
+    """读取 WAV 中的 cue 章节标记，返回 [(采样位置, 标签)]"""
+    positions = {}
+    labels = {}
+    with open(path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff not in (b'RIFF', b'RF64') or wave_id != b'WAVE':
+            raise WavFormatError(f"'{path}' 不是 WAV 文件")
+        data_size64 = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            fourcc, size = struct.unpack('<4sI', header)
+            if fourcc == b'ds64':
+                payload = f.read(size)
+                data_size64 = struct.unpack('<Q', payload[8:16])[0]
+                continue
+            if fourcc == b'data' and size == _MAX_RIFF and data_size64 is not None:
+                size = data_size64
+            if fourcc == b'cue ':
+                payload = f.read(size)
+                count, = struct.unpack('<I', payload[:4])
+                for n in range(count):
+                    cue_id, position = struct.unpack('<II', payload[4 + n * 24:12 + n * 24])
+                    positions[cue_id] = position
+            elif fourcc == b'LIST':
+                payload = f.read(size)
+                pos = 4 if payload[:4] == b'adtl' else len(payload)
+                while pos + 8 <= len(payload):
+                    sub, sub_size = struct.unpack('<4sI', payload[pos:pos + 8])
+                    body = payload[pos + 8:pos + 8 + sub_size]
+                    if sub == b'labl':
+                        cue_id, = struct.unpack('<I', body[:4])
+                        labels[cue_id] = body[4:].rstrip(b'\x00').decode('utf-8', errors='replace')
+                    pos += 8 + sub_size + (sub_size % 2)
+            else:
+                f.seek(size, os.SEEK_CUR)
+            if size % 2:
+                f.seek(1, os.SEEK_CUR)
+    return [(positions[k], labels.get(k, '')) for k in sorted(positions)]